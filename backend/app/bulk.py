@@ -0,0 +1,114 @@
+"""
+Bulk Helpers
+Per-row validation and result bookkeeping shared by the /bulk and
+/batch-get routes
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Type
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from app.config import settings
+from app.models import BatchGetRequest, BulkItemResult, BulkRequest, BulkResult
+
+OP_ORDER = {'create': 0, 'replace': 1, 'delete': 2}
+
+def describe_errors(error: ValidationError) -> str:
+    """A validation error as one line: `field.path: message; ...`"""
+    return '; '.join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+async def run_bulk(
+    request: BulkRequest,
+    create_model: Type[BaseModel],
+    model: Type[BaseModel],
+    build_item: Callable[[BaseModel], Dict[str, Any]],
+    write: Callable[[List[Dict[str, Any]], List[str]], Awaitable[Set[str]]]
+) -> BulkResult:
+    """
+    Validate every row, write the valid ones in one batch, report per row
+
+    - `create` rows are validated with `create_model` and turned into new
+      items (with fresh ids) by `build_item`
+    - `replace` rows are validated with the full `model` and overwrite the
+      stored item wholesale
+    - `delete` ids are removed unconditionally (BatchWriteItem cannot check
+      existence)
+
+    `write(put_items, delete_ids)` returns the ids it could not write.
+    """
+    total = len(request.create) + len(request.replace) + len(request.delete)
+    if total > settings.MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bulk request has {total} rows; the limit is {settings.MAX_BULK_ITEMS}"
+        )
+
+    results: List[BulkItemResult] = []
+    accepted: List[BulkItemResult] = []
+    put_items: List[Dict[str, Any]] = []
+    delete_ids: List[str] = []
+    seen_ids: Set[str] = set()
+
+    def reject(op: str, index: int, error: str, item_id: Optional[str] = None):
+        results.append(BulkItemResult(op=op, index=index, id=item_id, status='invalid', error=error))
+
+    for index, row in enumerate(request.create):
+        try:
+            item = build_item(create_model.model_validate(row))
+        except ValidationError as e:
+            reject('create', index, describe_errors(e))
+            continue
+        seen_ids.add(item['id'])
+        put_items.append(item)
+        accepted.append(BulkItemResult(op='create', index=index, id=item['id'], status='ok'))
+
+    for index, row in enumerate(request.replace):
+        try:
+            item = model.model_validate(row).model_dump()
+        except ValidationError as e:
+            reject('replace', index, describe_errors(e), row.get('id') if isinstance(row, dict) else None)
+            continue
+        if item['id'] in seen_ids:
+            reject('replace', index, "Duplicate id in bulk request", item['id'])
+            continue
+        seen_ids.add(item['id'])
+        put_items.append(item)
+        accepted.append(BulkItemResult(op='replace', index=index, id=item['id'], status='ok'))
+
+    for index, item_id in enumerate(request.delete):
+        if item_id in seen_ids:
+            reject('delete', index, "Duplicate id in bulk request", item_id)
+            continue
+        seen_ids.add(item_id)
+        delete_ids.append(item_id)
+        accepted.append(BulkItemResult(op='delete', index=index, id=item_id, status='ok'))
+
+    failed_ids = await write(put_items, delete_ids) if accepted else set()
+    for result in accepted:
+        if result.id in failed_ids:
+            result.status = 'failed'
+            result.error = "Unprocessed after retries (throughput exceeded)"
+    results.extend(accepted)
+    results.sort(key=lambda r: (OP_ORDER[r.op], r.index))
+
+    succeeded = sum(1 for r in results if r.status == 'ok')
+    return BulkResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+async def run_batch_get(
+    request: BatchGetRequest,
+    fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    Fetch `request.ids` with `fetch(ids) -> {id: item}` and return them in
+    request order, shaped as a BatchGetResult for fast_json
+    """
+    if len(request.ids) > settings.MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch get has {len(request.ids)} ids; the limit is {settings.MAX_BULK_ITEMS}"
+        )
+    found = await fetch(request.ids) if request.ids else {}
+    items = [found[item_id] for item_id in request.ids if item_id in found]
+    missing = [item_id for item_id in dict.fromkeys(request.ids) if item_id not in found]
+    return {'items': items, 'missing': missing}
@@ -0,0 +1,166 @@
+"""
+Entity Cache
+Bounded LRU with a per-entry TTL, keyed by (table, id). With
+CACHE_BACKEND=socket each worker's cache sits in front of the cache
+server's, which every worker shares.
+"""
+import copy
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from app.cluster import ClusterError, cluster
+from app.config import settings
+from app.metrics import record_cache_lookup
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss"""
+        value = self.lookup(key)
+        record_cache_lookup(value is not None)
+        return value
+
+    async def fetch(self, key: Hashable) -> Optional[Any]:
+        """`get`, behind the interface SharedCache also offers"""
+        return self.get(key)
+
+    async def fetch_many(self, keys: List[Hashable]) -> List[Optional[Any]]:
+        return [self.get(key) for key in keys]
+
+    def lookup(self, key: Hashable) -> Optional[Any]:
+        """`get` without counting the lookup in the request metrics"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        return copy.deepcopy(entry[1]) if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a copy of `value`, evicting the least recently used entry if full"""
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+class SharedCache:
+    """
+    Two-level entity cache for a worker cluster: this worker's TTLCache in
+    front of the cache server's, so one worker's miss fills the cache for
+    all of them
+
+    Sets and invalidations also go to the server, which tells the other
+    workers to drop their local copy, so no worker keeps serving an entity
+    another one has rewritten. While the server is unreachable this is the
+    local level alone, and it starts over empty on reconnect, since
+    invalidations sent meanwhile never arrived.
+    """
+
+    def __init__(self, local: TTLCache):
+        self.local = local
+        self.shared_hits = 0
+        cluster.on('invalidate', local.invalidate)
+        cluster.on_connect(lambda snapshot: local.clear())
+
+    async def fetch(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value (local level first), or None on a miss"""
+        return (await self.fetch_many([key]))[0]
+
+    async def fetch_many(self, keys: List[Hashable]) -> List[Optional[Any]]:
+        """`fetch` for many keys, with one round trip to the cache server for the local misses"""
+        values = [self.local.lookup(key) for key in keys]
+        missing = [position for position, value in enumerate(values) if value is None]
+        if missing and cluster.connected:
+            try:
+                found = await cluster.request('get', [keys[position] for position in missing])
+            except ClusterError:
+                found = []
+            for position, data in zip(missing, found):
+                if data is not None:
+                    values[position] = pickle.loads(data)
+                    self.local.set(keys[position], values[position])
+                    self.shared_hits += 1
+        for value in values:
+            record_cache_lookup(value is not None)
+        return values
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.local.max_entries <= 0:
+            return
+        self.local.set(key, value)
+        if cluster.connected:
+            cluster.send('set', key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def invalidate(self, key: Hashable) -> None:
+        self.local.invalidate(key)
+        cluster.send('invalidate', key)
+
+    def clear(self) -> None:
+        """Drop every entry of the local level"""
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Local level counters, plus the server's when it can be reached"""
+        stats = {**self.local.stats(), 'sharedHits': self.shared_hits}
+        if cluster.connected:
+            try:
+                stats['shared'] = cluster.call('stats')['cache']
+            except ClusterError:
+                pass
+        return stats
+
+def _entity_cache():
+    local = TTLCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    return SharedCache(local) if settings.CACHE_BACKEND == 'socket' else local
+
+# Shared by every DynamoDBRepository
+entity_cache = _entity_cache()
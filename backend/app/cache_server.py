@@ -0,0 +1,146 @@
+"""
+Cache Server
+The state workers share when CACHE_BACKEND=socket (see app/cluster.py):
+a TTLCache of pickled entities, the table change markers, the change
+event sequence, and the workers' latest metrics. One thread per
+connection; everything a worker must see in order (invalidations,
+markers, events, search updates) is broadcast under one lock, so every
+worker sees the same order.
+
+`python -m app.serve` starts one itself. To share one between several
+servers, or with a development server, run it on its own:
+
+    CACHE_ADDRESS=/tmp/ncc-cache.sock CACHE_AUTHKEY=change-me python -m app.cache_server
+"""
+import logging
+import os
+import pickle
+import stat
+import threading
+import time
+import uuid
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+from typing import Any, Dict, Tuple
+from app.cache import TTLCache
+from app.cluster import Address, parse_address
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Requests answered with a reply; every other request is one-way
+REPLIES = {'get', 'mark', 'collect', 'stats'}
+
+class CacheServer:
+    def __init__(self, address: Address, authkey: bytes):
+        if isinstance(address, str) and os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            os.unlink(address)  # left behind by a server that did not shut down
+        self.listener = Listener(address, authkey=authkey)
+        # Numbering restarts with the server, so ETags and resume tokens carry its epoch
+        self.epoch = uuid.uuid4().hex[:8]
+        self.started = time.time()
+        self.cache = TTLCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+        self._markers: Dict[str, Tuple[int, float]] = {}
+        self._sequence = 0
+        self._reports: Dict[str, Dict[int, Any]] = {}
+        self._subscribers: Dict[Connection, int] = {}
+        self._lock = threading.RLock()
+
+    def serve_forever(self) -> None:
+        logger.info("Cache server listening on %s", self.listener.address)
+        while True:
+            try:
+                connection = self.listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError) as e:
+                logger.warning("Rejected a connection: %s", e)
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: Connection) -> None:
+        """Answer one worker connection until it closes"""
+        try:
+            _, worker, subscribe = connection.recv()
+            if subscribe:
+                with self._lock:
+                    connection.send(('snapshot', self._snapshot()))
+                    self._subscribers[connection] = worker
+            while True:
+                op, *args = connection.recv()
+                reply = self._handle(worker, op, args)
+                if op in REPLIES:
+                    connection.send(reply)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._subscribers.pop(connection, None)
+            connection.close()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Where the numbering stands, for a worker that is (re)joining"""
+        return {
+            'epoch': self.epoch,
+            'started': self.started,
+            'markers': dict(self._markers),
+            'sequence': self._sequence,
+        }
+
+    def _broadcast(self, message: Tuple, exclude: int = 0) -> None:
+        """Send `message` to every subscribed worker but `exclude`, pickled once"""
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            for connection, worker in list(self._subscribers.items()):
+                if worker == exclude:
+                    continue
+                try:
+                    connection.send_bytes(data)
+                except OSError:
+                    del self._subscribers[connection]
+
+    def _handle(self, worker: int, op: str, args: list) -> Any:
+        if op == 'get':
+            return [self.cache.lookup(key) for key in args[0]]
+        if op == 'set':
+            key, data = args
+            self.cache.set(key, data)
+            self._broadcast(('invalidate', key), exclude=worker)
+        elif op == 'invalidate':
+            self.cache.invalidate(args[0])
+            self._broadcast(('invalidate', args[0]), exclude=worker)
+        elif op == 'mark':
+            with self._lock:
+                generation, _ = self._markers.get(args[0], (0, self.started))
+                marker = self._markers[args[0]] = (generation + 1, time.time())
+                self._broadcast(('mark', args[0], *marker))
+            return marker
+        elif op == 'event':
+            with self._lock:
+                self._sequence += 1
+                self._broadcast(('event', self._sequence, *args))
+        elif op == 'search':
+            self._broadcast(('search', *args), exclude=worker)
+        elif op == 'report':
+            name, snapshot = args
+            with self._lock:
+                self._reports.setdefault(name, {})[worker] = snapshot
+        elif op == 'collect':
+            with self._lock:
+                return dict(self._reports.get(args[0], {}))
+        elif op == 'stats':
+            return self.stats()
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'workers': len(set(self._subscribers.values())),
+                'sequence': self._sequence,
+                'cache': self.cache.stats(),
+            }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not settings.CACHE_ADDRESS or not settings.CACHE_AUTHKEY:
+        raise SystemExit("Set CACHE_ADDRESS and CACHE_AUTHKEY")
+    CacheServer(parse_address(settings.CACHE_ADDRESS), settings.CACHE_AUTHKEY.encode()).serve_forever()
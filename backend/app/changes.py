@@ -0,0 +1,136 @@
+"""
+Table Change Markers
+Per-table generation counters bumped after every write through the
+repository layer. List and detail routes derive ETag / Last-Modified from
+them and answer conditional GETs with 304 without reading DynamoDB.
+
+In a worker cluster the cache server numbers the generations and hands
+out the epoch, so every worker derives the same ETags. Otherwise (or
+while the server is unreachable) each process counts alone under an
+epoch of its own, so its ETags never match another process's.
+"""
+import os
+import threading
+import time
+import uuid
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from fastapi import Request, Response
+from app.cluster import ClusterError, cluster
+from app.concurrency import make_etag
+
+class ChangeTracker:
+    """Thread-safe (generation, last-modified) marker per table"""
+
+    def __init__(self):
+        # Changes made before this process started are unknown, so markers
+        # start at the start time and ETags carry a per-process epoch
+        self.started = time.time()
+        self._new_epoch()
+        self._markers: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        # Forked workers count apart unless they join the cache server
+        os.register_at_fork(after_in_child=self._new_epoch)
+        cluster.on('mark', self._advance)
+        cluster.on_connect(self._adopt)
+        cluster.on_disconnect(self._new_epoch)
+
+    def _new_epoch(self) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+
+    async def mark(self, table_name: str) -> None:
+        """Record that `table_name` changed (call after the write completes)"""
+        if cluster.connected:
+            try:
+                self._advance(table_name, *await cluster.request('mark', table_name))
+                return
+            except ClusterError:
+                pass  # now on an epoch of this process's own
+        with self._lock:
+            generation, _ = self._markers.get(table_name, (0, self.started))
+            self._markers[table_name] = (generation + 1, time.time())
+
+    def _advance(self, table_name: str, generation: int, modified: float) -> None:
+        """Take a marker numbered by the cache server (the reply and the broadcast may arrive in either order)"""
+        with self._lock:
+            if generation > self._markers.get(table_name, (0, self.started))[0]:
+                self._markers[table_name] = (generation, modified)
+
+    def _adopt(self, snapshot: Dict) -> None:
+        """Switch to the cache server's numbering"""
+        with self._lock:
+            self.epoch = snapshot['epoch']
+            self.started = snapshot['started']
+            self._markers = dict(snapshot['markers'])
+
+    def marker(self, table_name: str) -> Tuple[int, float]:
+        """Current (generation, last-modified timestamp) of a table"""
+        with self._lock:
+            return self._markers.get(table_name, (0, self.started))
+
+change_tracker = ChangeTracker()
+
+def list_etag(table_name: str, request: Request) -> Tuple[str, float]:
+    """Weak ETag and Last-Modified for a list response, scoped to its path and query string"""
+    generation, modified = change_tracker.marker(table_name)
+    scope = zlib.crc32(f'{request.url.path}?{request.url.query}'.encode())
+    return f'W/"{change_tracker.epoch}-{generation}-{scope:08x}"', modified
+
+def validators(etag: str, last_modified: float) -> Dict[str, str]:
+    """Response headers that let clients revalidate instead of re-downloading"""
+    return {
+        'ETag': etag,
+        'Last-Modified': formatdate(last_modified, usegmt=True),
+        'Cache-Control': 'no-cache',
+    }
+
+def _opaque(tag: str) -> str:
+    """If-None-Match uses weak comparison: W/"x" matches "x" """
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when there is no
+    If-None-Match (RFC 9110 precedence)
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(',')}
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """Empty 304 carrying the same validators"""
+    return Response(status_code=304, headers=headers)
+
+def conditional_list(table_name: str, request: Request) -> Tuple[Optional[Response], Dict[str, str]]:
+    """
+    Validators for a list route, plus a ready 304 when the client's copy is
+    current; read the marker before reading DynamoDB so a concurrent write
+    can only make the ETag older, never newer, than the data
+    """
+    etag, modified = list_etag(table_name, request)
+    headers = validators(etag, modified)
+    if is_not_modified(request, etag, modified):
+        return not_modified(headers), headers
+    return None, headers
+
+def conditional_item(table_name: str, request: Request, version: Optional[int]) -> Tuple[Optional[Response], Dict[str, str]]:
+    """Validators for a single item (its version ETag), plus a ready 304 when the client's copy is current"""
+    _, modified = change_tracker.marker(table_name)
+    etag = make_etag(version)
+    headers = validators(etag, modified)
+    if is_not_modified(request, etag, modified):
+        return not_modified(headers), headers
+    return None, headers
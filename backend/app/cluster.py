@@ -0,0 +1,240 @@
+"""
+Worker Cluster Client
+How the worker processes of `python -m app.serve` share state through the
+cache server (app/cache_server.py) when CACHE_BACKEND=socket:
+
+- the second level of the entity cache (app/cache.py)
+- table change markers, numbered by the server so every worker hands out
+  the same ETags (app/changes.py)
+- change events, numbered by the server so a resume token works on any
+  worker (app/events.py)
+- search index updates (app/search.py) and metrics (app/metrics.py)
+
+Each worker sends requests on one connection and receives the server's
+broadcasts on a second, in the order the server made them, handing each
+to the handler its module registered. While the server cannot be reached
+`connected` is False and those modules fall back to their in-process
+state; the worker keeps reconnecting and, once back, drops anything that
+may have gone stale while it was away.
+
+Connections use `multiprocessing.connection`: messages are pickled, and
+both ends prove they hold CACHE_AUTHKEY before anything is read. Keep the
+server on a Unix socket or a loopback address.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Address = Union[str, Tuple[str, int]]
+
+# Pause between attempts to reach the cache server
+RECONNECT_SECONDS = 1.0
+
+def parse_address(address: str) -> Address:
+    """'host:port' is TCP, anything else a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return (host, int(port))
+    return address
+
+class ClusterError(Exception):
+    """The cache server could not be reached"""
+
+class ClusterClient:
+    """
+    One worker's connections to the cache server
+
+    Not connected in a single process (CACHE_BACKEND=local), before
+    `start` and while the server is unreachable. Broadcast handlers
+    registered with `on` run on the receiving thread, one at a time.
+    Async code waits for replies with `request` (on a worker thread);
+    `send` never waits for one.
+    """
+
+    def __init__(self):
+        self.worker = os.getpid()
+        self.connected = False
+        self._requests: Optional[Connection] = None
+        self._subscription: Optional[Connection] = None
+        self._lock = threading.Lock()  # the connections and `connected`
+        # One request/reply round trip at a time; each message is written whole
+        self._call_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._handlers: Dict[str, Callable[..., None]] = {}
+        self._connect_handlers: List[Callable[[Dict[str, Any]], None]] = []
+        self._disconnect_handlers: List[Callable[[], None]] = []
+        self._reporters: Dict[str, Callable[[], Any]] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._unreachable = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CACHE_BACKEND == 'socket'
+
+    # ----- registration (at import time) -----
+
+    def on(self, kind: str, handler: Callable[..., None]) -> None:
+        """Call `handler(*args)` for every ('kind', *args) broadcast"""
+        self._handlers[kind] = handler
+
+    def on_connect(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `handler(snapshot)` on every (re)connect, before any broadcast that follows it"""
+        self._connect_handlers.append(handler)
+
+    def on_disconnect(self, handler: Callable[[], None]) -> None:
+        self._disconnect_handlers.append(handler)
+
+    def report(self, name: str, snapshot: Callable[[], Any]) -> None:
+        """Send `snapshot()` to the server every CACHE_REPORT_SECONDS, for `collect(name)` in any worker"""
+        self._reporters[name] = snapshot
+
+    # ----- lifecycle -----
+
+    def start(self) -> None:
+        """Connect when CACHE_BACKEND=socket, then keep receiving (and reconnecting) on a background thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        if not settings.CACHE_ADDRESS or not settings.CACHE_AUTHKEY:
+            logger.error("CACHE_BACKEND=socket needs CACHE_ADDRESS and CACHE_AUTHKEY; using in-process state")
+            return
+        self.worker = os.getpid()
+        self._stopping.clear()
+        self._connect()
+        self._thread = threading.Thread(target=self._run, name='cluster', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        # A last report, so nothing this worker counted is lost when it exits
+        self._send_reports()
+        self._stopping.set()
+        self._close()
+        self._thread.join(RECONNECT_SECONDS)
+        self._thread = None
+
+    def _connect(self) -> bool:
+        address = parse_address(settings.CACHE_ADDRESS)
+        authkey = settings.CACHE_AUTHKEY.encode()
+        try:
+            subscription = Client(address, authkey=authkey)
+            subscription.send(('hello', self.worker, True))
+            _, snapshot = subscription.recv()
+            requests = Client(address, authkey=authkey)
+            requests.send(('hello', self.worker, False))
+        except (OSError, EOFError, AuthenticationError) as e:
+            if not self._unreachable:
+                logger.warning("Cannot reach the cache server at %s (%s); retrying", settings.CACHE_ADDRESS, e)
+                self._unreachable = True
+            return False
+        self._unreachable = False
+        for handler in self._connect_handlers:
+            handler(snapshot)
+        with self._lock:
+            self._requests, self._subscription = requests, subscription
+            self.connected = True
+        logger.info("Worker %d joined the cache server at %s", self.worker, settings.CACHE_ADDRESS)
+        return True
+
+    def _close(self) -> bool:
+        """Drop both connections; True if they were open"""
+        with self._lock:
+            was_connected = self.connected
+            self.connected = False
+            connections = (self._requests, self._subscription)
+            self._requests = self._subscription = None
+        for connection in connections:
+            if connection is not None:
+                connection.close()
+        return was_connected
+
+    def _lost(self, error: BaseException) -> None:
+        if self._close() and not self._stopping.is_set():
+            logger.warning("Lost the cache server (%r); using in-process state until it is back", error)
+            for handler in self._disconnect_handlers:
+                handler()
+
+    def _run(self) -> None:
+        """Apply broadcasts in order, send reports on schedule, reconnect when the server goes away"""
+        next_report = time.monotonic()
+        while not self._stopping.is_set():
+            subscription = self._subscription
+            if subscription is None:
+                if not self._connect():
+                    self._stopping.wait(RECONNECT_SECONDS)
+                continue
+            if time.monotonic() >= next_report:
+                self._send_reports()
+                next_report = time.monotonic() + settings.CACHE_REPORT_SECONDS
+            try:
+                if not subscription.poll(max(0.0, next_report - time.monotonic())):
+                    continue
+                kind, *args = subscription.recv()
+            except (OSError, EOFError) as e:
+                self._lost(e)
+                continue
+            handler = self._handlers.get(kind)
+            if handler is None:
+                continue
+            try:
+                handler(*args)
+            except Exception:
+                logger.exception("Error applying %s broadcast", kind)
+
+    def _send_reports(self) -> None:
+        for name, snapshot in self._reporters.items():
+            self.send('report', name, snapshot())
+
+    # ----- requests -----
+
+    def call(self, op: str, *args: Any) -> Any:
+        """Send a request and wait for its reply; raises ClusterError when the server is unreachable"""
+        try:
+            with self._call_lock:
+                requests = self._requests
+                if requests is None:
+                    raise ClusterError("not connected to the cache server")
+                with self._send_lock:
+                    requests.send((op, *args))
+                if not requests.poll(settings.CACHE_TIMEOUT_SECONDS):
+                    raise TimeoutError(f"no reply to {op} within {settings.CACHE_TIMEOUT_SECONDS}s")
+                return requests.recv()
+        except (OSError, EOFError) as e:
+            self._lost(e)
+            raise ClusterError(str(e)) from e
+
+    async def request(self, op: str, *args: Any) -> Any:
+        """`call` from async code: the round trip runs on a worker thread, so the event loop never waits on the socket"""
+        return await asyncio.to_thread(self.call, op, *args)
+
+    def send(self, op: str, *args: Any) -> bool:
+        """
+        Send a request that has no reply; False if it could not be sent.
+        Does not wait for a `call` in flight, so it is safe on the event loop.
+        """
+        try:
+            with self._send_lock:
+                requests = self._requests
+                if requests is None:
+                    return False
+                requests.send((op, *args))
+                return True
+        except (OSError, EOFError) as e:
+            self._lost(e)
+            return False
+
+    def collect(self, name: str) -> Dict[int, Any]:
+        """The latest `report(name)` snapshot of every worker, by pid (workers that exited included)"""
+        return self.call('collect', name)
+
+# Shared by every module that keeps per-process state
+cluster = ClusterClient()
@@ -0,0 +1,122 @@
+"""
+Response Compression
+Brotli or gzip for JSON, CSV and text responses, whichever the client
+prefers (brotli only when the `brotli` package is installed). Streamed
+bodies are flushed chunk by chunk so they keep streaming. Responses that
+are small, already encoded (gzipped exports) or Server-Sent Events pass
+through untouched.
+"""
+import zlib
+from typing import Callable, Dict, Optional, Sequence
+from starlette.datastructures import Headers, MutableHeaders
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+Encoder = Callable[[bytes, bool], bytes]
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+NEVER_COMPRESSED = ('text/event-stream',)
+
+def _gzip_encoder() -> Encoder:
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def encode(data: bytes, final: bool) -> bytes:
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    return encode
+
+def _brotli_encoder() -> Encoder:
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def encode(data: bytes, final: bool) -> bytes:
+        return compressor.process(data) + (compressor.finish() if final else compressor.flush())
+    return encode
+
+# In order of preference when the client rates them equally
+ENCODERS: Dict[str, Callable[[], Encoder]] = {'gzip': _gzip_encoder}
+if brotli is not None:
+    ENCODERS = {'br': _brotli_encoder, **ENCODERS}
+
+def preferred_encoding(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """The `available` coding the client rates highest (q > 0), or None"""
+    ratings: Dict[str, float] = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            ratings[name.strip().lower()] = quality
+    wildcard = ratings.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for name in available:
+        quality = ratings.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get('content-type', '')
+    return (
+        'content-encoding' not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(NEVER_COMPRESSED)
+    )
+
+class CompressionMiddleware:
+    """ASGI middleware compressing response bodies of at least `minimum_size` bytes"""
+
+    def __init__(self, app, minimum_size: int = settings.COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if scope['type'] == 'http':
+            encoding = preferred_encoding(Headers(scope=scope).get('accept-encoding', ''), list(ENCODERS))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        start = None
+        encode: Optional[Encoder] = None
+
+        async def send_compressed(message):
+            nonlocal start, encode
+            if message['type'] == 'http.response.start':
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if start is not None:
+                headers = MutableHeaders(raw=start['headers'])
+                if _compressible(headers):
+                    headers.add_vary_header('Accept-Encoding')
+                    if more_body or len(body) >= self.minimum_size:
+                        encode = ENCODERS[encoding]()
+                        headers['Content-Encoding'] = encoding
+                        if 'content-length' in headers:
+                            del headers['content-length']
+                        if not more_body:
+                            body = encode(body, True)
+                            headers['Content-Length'] = str(len(body))
+                            encode = None
+                            message = {**message, 'body': body}
+                await send(start)
+                start = None
+            if encode is not None:
+                message = {**message, 'body': encode(body, not more_body)}
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,47 @@
+"""
+Optimistic Concurrency Helpers
+Every item carries a `version` that the repository bumps on each write.
+HTTP exposes it as a strong ETag; If-Match turns writes into
+compare-and-set operations that fail with 412
+"""
+from typing import List, Optional
+from fastapi import Header, HTTPException
+
+class VersionConflict(Exception):
+    """A conditional write found a different version than the client expected"""
+
+    def __init__(self, item_id: str):
+        super().__init__(f"{item_id} has been modified")
+        self.item_id = item_id
+
+def make_etag(version: Optional[int]) -> str:
+    """Strong ETag for an item version (items written before versioning are 0)"""
+    return f'"{version or 0}"'
+
+def if_match(
+    if_match: Optional[str] = Header(None, description="ETag(s) from a previous read; the write fails with 412 if the item changed since")
+) -> Optional[List[int]]:
+    """
+    Parse If-Match into the versions a write may overwrite
+
+    Returns None when the header is absent or `*` (any existing item).
+    Weak tags never match (If-Match uses strong comparison), so a header
+    with no usable tag fails straight away.
+    """
+    if if_match is None or if_match.strip() == '*':
+        return None
+    versions = []
+    for tag in if_match.split(','):
+        tag = tag.strip()
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    if not versions:
+        raise HTTPException(status_code=412, detail="If-Match does not match the current version")
+    return versions
+
+def precondition_failed(error: VersionConflict) -> HTTPException:
+    """412 for a write whose If-Match no longer holds"""
+    return HTTPException(
+        status_code=412,
+        detail=f"{error.item_id} has been modified; re-read it and retry with the new ETag"
+    )
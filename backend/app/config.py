@@ -14,7 +14,81 @@ class Settings:
     
     # DynamoDB
     DYNAMODB_TABLE: str = os.getenv('DYNAMODB_TABLE', 'NccServers')
-    
+
+    # Storage backend: 'dynamodb', or 'memory' for the in-process stand-in
+    # (app/memory_store.py) with a simulated round trip per call
+    DB_BACKEND: str = os.getenv('DB_BACKEND', 'dynamodb')
+    MEMORY_LATENCY_MS: float = float(os.getenv('MEMORY_LATENCY_MS', '0'))
+
+    # Size of the thread pool that runs blocking boto3 calls (0 = inline)
+    DB_EXECUTOR_WORKERS: int = int(os.getenv('DB_EXECUTOR_WORKERS', '32'))
+
+    # Shared boto3 connection pool and retry policy
+    DB_MAX_POOL_CONNECTIONS: int = int(os.getenv('DB_MAX_POOL_CONNECTIONS', '64'))
+    DB_MAX_ATTEMPTS: int = int(os.getenv('DB_MAX_ATTEMPTS', '5'))
+    DB_CONNECT_TIMEOUT: float = float(os.getenv('DB_CONNECT_TIMEOUT', '2'))
+    DB_READ_TIMEOUT: float = float(os.getenv('DB_READ_TIMEOUT', '5'))
+
+    # Pagination
+    DEFAULT_PAGE_SIZE: int = int(os.getenv('DEFAULT_PAGE_SIZE', '100'))
+    MAX_PAGE_SIZE: int = int(os.getenv('MAX_PAGE_SIZE', '1000'))
+
+    # Bulk writes
+    MAX_BULK_ITEMS: int = int(os.getenv('MAX_BULK_ITEMS', '1000'))
+    BATCH_MAX_RETRIES: int = int(os.getenv('BATCH_MAX_RETRIES', '5'))
+
+    # Full-table scans (exports, search index build): parallel segments, and
+    # read capacity units per second they may consume per table (0 = unlimited)
+    SCAN_SEGMENTS: int = int(os.getenv('SCAN_SEGMENTS', '8'))
+    SCAN_MAX_READ_UNITS: float = float(os.getenv('SCAN_MAX_READ_UNITS', '0'))
+
+    # Bulk imports: validation processes (0 = validate in the API process),
+    # rows per chunk, chunks written concurrently, write capacity units per
+    # second (0 = unlimited), how many rejects a response lists and the
+    # largest body an API import accepts (after gzip decoding)
+    IMPORT_WORKERS: int = int(os.getenv('IMPORT_WORKERS', '2'))
+    IMPORT_CHUNK_SIZE: int = int(os.getenv('IMPORT_CHUNK_SIZE', '500'))
+    IMPORT_CONCURRENCY: int = int(os.getenv('IMPORT_CONCURRENCY', '4'))
+    IMPORT_MAX_WRITE_UNITS: float = float(os.getenv('IMPORT_MAX_WRITE_UNITS', '0'))
+    IMPORT_MAX_REPORTED_REJECTS: int = int(os.getenv('IMPORT_MAX_REPORTED_REJECTS', '100'))
+    IMPORT_MAX_BYTES: int = int(os.getenv('IMPORT_MAX_BYTES', str(512 * 1024 * 1024)))
+
+    # Entity cache in front of get_item (0 entries disables it)
+    CACHE_MAX_ENTRIES: int = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+    CACHE_TTL_SECONDS: float = float(os.getenv('CACHE_TTL_SECONDS', '60'))
+
+    # Production server (python -m app.serve): worker processes (0 = one per CPU)
+    WORKERS: int = int(os.getenv('WORKERS', '0'))
+
+    # What workers share: 'local' (each process keeps its own cache, change
+    # markers, events and search index) or 'socket' (the cache server in
+    # app/cache_server.py at CACHE_ADDRESS, a Unix socket path or host:port;
+    # app.serve starts one itself when it is unset). CACHE_AUTHKEY must match
+    # on both ends. Workers give up on a call after CACHE_TIMEOUT_SECONDS and
+    # send their metrics every CACHE_REPORT_SECONDS.
+    CACHE_BACKEND: str = os.getenv('CACHE_BACKEND', 'local')
+    CACHE_ADDRESS: str = os.getenv('CACHE_ADDRESS', '')
+    CACHE_AUTHKEY: str = os.getenv('CACHE_AUTHKEY', '')
+    CACHE_TIMEOUT_SECONDS: float = float(os.getenv('CACHE_TIMEOUT_SECONDS', '0.5'))
+    CACHE_REPORT_SECONDS: float = float(os.getenv('CACHE_REPORT_SECONDS', '5'))
+
+    # Change events (GET /events): where they come from ('writes' or 'streams'),
+    # how many are kept for resuming, and how often idle streams get a heartbeat
+    EVENTS_SOURCE: str = os.getenv('EVENTS_SOURCE', 'writes')
+    EVENTS_LOG_SIZE: int = int(os.getenv('EVENTS_LOG_SIZE', '10000'))
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+    EVENTS_RETRY_MS: int = int(os.getenv('EVENTS_RETRY_MS', '3000'))
+    EVENTS_MAX_SUBSCRIBERS: int = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', '10000'))
+
+    # Response compression: bodies from this size are sent brotli (when the
+    # brotli package is installed) or gzip encoded, at these levels
+    COMPRESSION_MIN_BYTES: int = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+    # Logging (errors go to stderr; request metrics are at GET /metrics)
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+
     # API Configuration
     API_V1_PREFIX: str = '/api/v1'
     PROJECT_NAME: str = 'NCC Server Management API'
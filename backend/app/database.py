@@ -1,42 +1,707 @@
 """
 DynamoDB Database Utilities
+One pooled boto3 resource (or the in-memory stand-in, DB_BACKEND=memory)
+shared by a generic, model-parameterised repository per table (plus child
+repositories for one-to-many data)
 """
+import asyncio
 import boto3
-from boto3.dynamodb.conditions import Key, Attr
-from typing import List, Optional, Dict, Any
+import heapq
+import logging
+from decimal import Decimal
+from enum import Enum
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Type
 from app.config import settings
-from app.models import Server
-
-class DynamoDBClient:
-    """DynamoDB client wrapper"""
-    
-    def __init__(self):
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            region_name=settings.AWS_DEFAULT_REGION,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+from app.cache import entity_cache
+from app.changes import change_tracker
+from app.concurrency import VersionConflict
+from app.events import CREATED, DELETED, UPDATED, record_change
+from app.db_helper import (
+    TABLE_INDEXES, CapacityLimiter, IndexSpec, add_projection, batch_get, batch_write, build_filter, dynamodb_call,
+    dynamodb_to_python, enum_values, is_condition_failure, numeric_schema, parallel_scan, plan_query,
+    python_to_dynamodb, rankable, sort_index, sort_rank, write_condition
+)
+from app.memory_store import MemoryDynamoDB
+from app.pagination import InvalidCursor
+from app.search import search_index
+from app.summary import STATS_TABLE, TABLE_SUMMARIES
+
+logger = logging.getLogger(__name__)
+
+# Shared connection pool; keep it at least as large as the executor so
+# worker threads never queue for a connection
+boto_config = Config(
+    max_pool_connections=settings.DB_MAX_POOL_CONNECTIONS,
+    retries={'mode': 'adaptive', 'max_attempts': settings.DB_MAX_ATTEMPTS},
+    connect_timeout=settings.DB_CONNECT_TIMEOUT,
+    read_timeout=settings.DB_READ_TIMEOUT,
+    tcp_keepalive=True
+)
+
+def connect():
+    """The DynamoDB resource for DB_BACKEND: boto3, or the in-memory stand-in"""
+    if settings.DB_BACKEND == 'memory':
+        return MemoryDynamoDB(settings.MEMORY_LATENCY_MS / 1000)
+    if settings.DB_BACKEND != 'dynamodb':
+        raise ValueError(f"Unknown DB_BACKEND: {settings.DB_BACKEND} (expected dynamodb or memory)")
+    return boto3.resource(
+        'dynamodb',
+        region_name=settings.AWS_DEFAULT_REGION,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
+        config=boto_config
+    )
+
+dynamodb = connect()
+
+# One counters item per table, see app/summary.py
+stats_table = dynamodb.Table(STATS_TABLE)
+
+async def read_summaries(table_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Summaries of several tables in one BatchGetItem"""
+    try:
+        found = await batch_get(stats_table, table_names)
+    except ClientError as e:
+        logger.error("Error reading summaries: %s", e)
+        raise
+    return {
+        name: TABLE_SUMMARIES[name].summarize(dynamodb_to_python(found.get(name)))
+        for name in table_names
+    }
+
+class DynamoDBRepository:
+    """
+    Data access for one table
+
+    Items are exchanged in API shape (what `model` describes). Subclasses
+    override `to_item` / `from_item` when the stored layout differs.
+
+    Every write sets or bumps the item's `version`; updates and deletes
+    accept the versions the caller expects and raise VersionConflict when
+    the stored item has moved on. Every write attempt also marks the table
+    as changed (after the call returns) for conditional GETs. Successful
+    writes also update the search index and publish a change event, and
+    tables with a SummarySpec get their counters adjusted from the old and
+    new item images.
+    """
+
+    def __init__(self, table_name: str, model: Type[BaseModel]):
+        self.table_name = table_name
+        self.model = model
+        self.table = dynamodb.Table(table_name)
+        self.indexes = TABLE_INDEXES.get(table_name, [])
+        self.schema = numeric_schema(model)
+        self.summary = TABLE_SUMMARIES.get(table_name)
+        # Shared by every full scan of this table, so concurrent scans split the budget
+        self.scan_limiter = CapacityLimiter(settings.SCAN_MAX_READ_UNITS)
+
+    def to_item(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert API-shaped data (whole or partial) to the stored layout"""
+        return self.schema.to_dynamodb(data)
+
+    def from_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a stored item to API shape (in place; raw items are not reused)"""
+        return self.schema.to_python(item)
+
+    def removed_attributes(self, updates: Dict[str, Any]) -> List[str]:
+        """Stored attributes a partial update must REMOVE (derived attributes whose source was cleared)"""
+        return []
+
+    def stored_attributes(self, fields: Tuple[str, ...]) -> List[str]:
+        """Stored attributes behind API fields, for a ProjectionExpression"""
+        return list(fields)
+
+    def _projected(self, params: Dict[str, Any], fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+        if fields:
+            add_projection(params, self.stored_attributes(fields))
+        return params
+
+    def _cache_key(self, key: Dict[str, str]) -> Tuple[str, str]:
+        return (self.table_name, key['id'])
+
+    @property
+    def key_names(self) -> Tuple[str, ...]:
+        """Attributes of the primary key"""
+        return ('id',)
+
+    def key_of(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Primary key of an item"""
+        return {'id': item['id']}
+
+    def _index_of(self, params: Dict[str, Any]) -> Optional[IndexSpec]:
+        """The index a planned read uses, if any"""
+        return next((index for index in self.indexes if index.name == params.get('IndexName')), None)
+
+    def _resume(self, params: Dict[str, Any], start_key: Optional[Dict[str, Any]], pinned: Dict[str, Any]) -> None:
+        """
+        Resume a read from a client's cursor: it must hold exactly the key
+        attributes the read returns in its LastEvaluatedKey (the primary
+        key, plus the index keys on an index), and the `pinned` hash key
+        value, or DynamoDB would reject it; raises InvalidCursor
+        """
+        if not start_key:
+            return
+        expected = set(self.key_names)
+        index = self._index_of(params)
+        if index:
+            expected.update(name for name in (index.hash_key, index.range_key) if name)
+        well_formed = set(start_key) == expected and all(
+            isinstance(value, (str, Decimal)) and value != '' for value in start_key.values()
         )
-        self.table = self.dynamodb.Table(settings.DYNAMODB_TABLE)
-    
-    def _serialize_server(self, server_dict: Dict[str, Any]) -> Dict[str, Any]:
-        """Convert server model to DynamoDB format"""
-        # Flatten specs
-        serialized = {**server_dict}
-        if 'specs' in serialized and isinstance(serialized['specs'], dict):
-            serialized['specs_cpu'] = serialized['specs']['cpu']
-            serialized['specs_ram'] = serialized['specs']['ram']
-            serialized['specs_storage'] = serialized['specs']['storage']
-            del serialized['specs']
-        return serialized
-    
-    def _deserialize_server(self, item: Dict[str, Any]) -> Dict[str, Any]:
-        """Convert DynamoDB item to server model format"""
-        if not item:
+        if not well_formed or any(start_key[name] != python_to_dynamodb(value) for name, value in pinned.items()):
+            raise InvalidCursor("Invalid cursor: it does not belong to this list")
+        params['ExclusiveStartKey'] = start_key
+
+    async def _record_summary(self, changes: List[Tuple[Optional[Dict], Optional[Dict]]]) -> None:
+        """
+        Apply the counter delta of (old, new) item pairs to the stats item
+        with one atomic ADD; failures are logged, not raised, since the
+        write itself succeeded (scripts/rebuild_summaries.py repairs drift)
+        """
+        if not self.summary:
+            return
+        delta = self.summary.delta(changes)
+        if not delta:
+            return
+        names = {f"#c{i}": name for i, name in enumerate(delta)}
+        values = {f":c{i}": python_to_dynamodb(value) for i, value in enumerate(delta.values())}
+        try:
+            await dynamodb_call(
+                stats_table, 'update_item',
+                Key={'id': self.table_name},
+                UpdateExpression="ADD " + ", ".join(f"#c{i} :c{i}" for i in range(len(delta))),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            logger.error("Error updating summary of %s: %s", self.table_name, e)
+
+    async def get_summary(self) -> Dict[str, Any]:
+        """Precomputed counts and sums for this table (one GetItem)"""
+        try:
+            response = await dynamodb_call(stats_table, 'get_item', Key={'id': self.table_name})
+        except ClientError as e:
+            logger.error("Error reading summary: %s", e)
+            raise
+        return self.summary.summarize(dynamodb_to_python(response.get('Item')))
+
+    async def get_item(self, key: Dict[str, str]) -> Optional[Dict]:
+        """Get a single item by key, served from the entity cache when fresh"""
+        cached = await entity_cache.fetch(self._cache_key(key))
+        if cached is not None:
+            return cached
+        try:
+            response = await dynamodb_call(self.table, 'get_item', Key=key)
+            if 'Item' in response:
+                item = self.from_item(response['Item'])
+                entity_cache.set(self._cache_key(key), item)
+                return item
+            return None
+        except ClientError as e:
+            logger.error("Error getting item: %s", e)
+            raise
+
+    async def scan(self, filter_expression=None, expression_values=None) -> List[Dict]:
+        """Scan table with optional filter (parallel segments, unordered)"""
+        params = {}
+        if filter_expression and expression_values:
+            params['FilterExpression'] = filter_expression
+            params['ExpressionAttributeValues'] = python_to_dynamodb(expression_values)
+        items = []
+        async for page in self.scan_pages(params):
+            items.extend(page)
+        return items
+
+    async def scan_pages(
+        self,
+        params: Optional[Dict[str, Any]] = None,
+        segments: Optional[int] = None
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Yield the whole table a scan page (up to 1 MB) at a time, in no
+        particular order; SCAN_SEGMENTS segments are read in parallel and
+        only a few pages are held at once
+        """
+        try:
+            async for page in parallel_scan(
+                self.table,
+                segments or settings.SCAN_SEGMENTS,
+                params,
+                self.scan_limiter
+            ):
+                yield [self.from_item(item) for item in page]
+        except ClientError as e:
+            logger.error("Error scanning table: %s", e)
+            raise
+
+    async def list_page(
+        self,
+        limit: int,
+        start_key: Optional[Dict[str, Any]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False
+    ) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """
+        Read a single page, via a GSI when the filters allow; returns the
+        items and the LastEvaluatedKey (the key to resume from). With
+        `fields`, only those are read; with `order_by`, see sorted_page.
+        """
+        if order_by:
+            return await self.sorted_page(limit, start_key, filters, fields, order_by, descending)
+        try:
+            operation, params = plan_query(self.indexes, filters)
+            self._projected(params, fields)
+            params['Limit'] = limit
+            index = self._index_of(params)
+            self._resume(params, start_key, {index.hash_key: filters[index.hash_key]} if index else {})
+
+            response = await dynamodb_call(self.table, operation, **params)
+            items = [self.from_item(item) for item in response.get('Items', [])]
+            return items, response.get('LastEvaluatedKey')
+        except ClientError as e:
+            logger.error("Error reading table page: %s", e)
+            raise
+
+    async def sorted_page(
+        self,
+        limit: int,
+        start_key: Optional[Dict[str, Any]],
+        filters: Optional[Dict[str, Any]],
+        fields: Optional[Tuple[str, ...]],
+        order_by: str,
+        descending: bool
+    ) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """
+        Read one page in `order_by` order (ties by id)
+
+        An index whose range key is `order_by` serves it: one query when the
+        filters pin its hash key, otherwise one query per hash value (an enum
+        field) merged, each reading little more than a page. Without such an
+        index, every item the filters select is read and only the best page
+        is kept in a bounded heap. Except on the single query, the returned
+        key holds the last item's value and id rather than a LastEvaluatedKey.
+        """
+        remaining = {k: v for k, v in (filters or {}).items() if v is not None}
+        if fields:
+            fields = tuple(dict.fromkeys(fields + (order_by,)))
+        index = sort_index(self.indexes, order_by)
+        field = self.model.model_fields.get(order_by)
+        # Sparse indexes leave out items without the attribute, so optional fields are sorted by heap
+        if index and not (field and field.is_required()):
+            index = None
+        try:
+            if index and index.hash_key in remaining:
+                hash_value = remaining.pop(index.hash_key)
+                params = {
+                    'IndexName': index.name,
+                    'KeyConditionExpression': Key(index.hash_key).eq(python_to_dynamodb(hash_value)),
+                    'ScanIndexForward': not descending,
+                    'Limit': limit
+                }
+                condition = build_filter(remaining)
+                if condition is not None:
+                    params['FilterExpression'] = condition
+                self._resume(params, start_key, {index.hash_key: hash_value})
+                response = await dynamodb_call(self.table, 'query', **self._projected(params, fields))
+                items = [self.from_item(item) for item in response.get('Items', [])]
+                return items, response.get('LastEvaluatedKey')
+
+            after = self._sort_position(start_key, order_by, descending) if start_key else None
+            partitions = enum_values(self.model, index.hash_key) if index else None
+            if partitions is not None:
+                items, more = await self._merge_partitions(
+                    index, partitions, remaining, fields, order_by, descending, after, limit
+                )
+            else:
+                items, more = await self._top_k(filters, fields, order_by, descending, after, limit)
+        except ClientError as e:
+            logger.error("Error reading sorted page: %s", e)
+            raise
+        if not (more and items):
+            return items, None
+        return items, {'orderBy': order_by, 'value': items[-1].get(order_by), 'id': items[-1]['id']}
+
+    def _sort_position(self, start_key: Dict[str, Any], order_by: str, descending: bool) -> Tuple[Any, ...]:
+        """The rank an `order_by` cursor resumes after; raises InvalidCursor for any other cursor"""
+        start = dynamodb_to_python(start_key)
+        if (
+            set(start) != {'orderBy', 'value', 'id'} or start['orderBy'] != order_by
+            or not isinstance(start['id'], str) or not rankable(self.model, order_by, start['value'])
+        ):
+            raise InvalidCursor(f"Invalid cursor: it does not belong to order_by={order_by}")
+        return sort_rank({order_by: start['value'], 'id': start['id']}, order_by, descending)
+
+    @staticmethod
+    def _beyond(rank: Tuple[Any, ...], after: Optional[Tuple[Any, ...]], descending: bool) -> bool:
+        return after is None or (rank < after if descending else rank > after)
+
+    async def _partition_run(
+        self,
+        index: IndexSpec,
+        hash_value: Any,
+        remaining: Dict[str, Any],
+        fields: Optional[Tuple[str, ...]],
+        order_by: str,
+        descending: bool,
+        after: Optional[Tuple[Any, ...]],
+        limit: int
+    ) -> Tuple[List[Dict], bool]:
+        """
+        The first `limit` items of one index partition past `after`, plus any
+        tied with the last of them (the index does not order ties by id);
+        returns them sorted and whether the partition was read to the end
+        """
+        condition = Key(index.hash_key).eq(python_to_dynamodb(hash_value))
+        if after is not None and after[0] == 0:
+            bound = python_to_dynamodb(after[1])
+            condition &= Key(index.range_key).lte(bound) if descending else Key(index.range_key).gte(bound)
+        params = {
+            'IndexName': index.name,
+            'KeyConditionExpression': condition,
+            'ScanIndexForward': not descending,
+            # One more than a page shows whether the last item has ties to read
+            'Limit': limit + 1
+        }
+        remaining_filter = build_filter(remaining)
+        if remaining_filter is not None:
+            params['FilterExpression'] = remaining_filter
+        self._projected(params, fields)
+        kept: List[Dict] = []
+        while True:
+            response = await dynamodb_call(self.table, 'query', **params)
+            for raw in response.get('Items', []):
+                item = self.from_item(raw)
+                if self._beyond(sort_rank(item, order_by, descending), after, descending):
+                    kept.append(item)
+            exhausted = 'LastEvaluatedKey' not in response
+            if exhausted or (len(kept) > limit and kept[-1][order_by] != kept[limit - 1][order_by]):
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        kept.sort(key=lambda item: sort_rank(item, order_by, descending), reverse=descending)
+        return kept, exhausted
+
+    async def _merge_partitions(
+        self,
+        index: IndexSpec,
+        partitions: List[Any],
+        remaining: Dict[str, Any],
+        fields: Optional[Tuple[str, ...]],
+        order_by: str,
+        descending: bool,
+        after: Optional[Tuple[Any, ...]],
+        limit: int
+    ) -> Tuple[List[Dict], bool]:
+        """Query every partition of `index` in parallel and merge the sorted runs; returns a page and whether more follow"""
+        runs = await asyncio.gather(*(
+            self._partition_run(index, value, remaining, fields, order_by, descending, after, limit)
+            for value in partitions
+        ))
+        merged = list(heapq.merge(
+            *(items for items, _ in runs),
+            key=lambda item: sort_rank(item, order_by, descending),
+            reverse=descending
+        ))
+        return merged[:limit], len(merged) > limit or not all(exhausted for _, exhausted in runs)
+
+    async def _query_pages(self, params: Dict[str, Any]) -> AsyncIterator[List[Dict]]:
+        while True:
+            response = await dynamodb_call(self.table, 'query', **params)
+            yield [self.from_item(item) for item in response.get('Items', [])]
+            if 'LastEvaluatedKey' not in response:
+                return
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    async def _top_k(
+        self,
+        filters: Optional[Dict[str, Any]],
+        fields: Optional[Tuple[str, ...]],
+        order_by: str,
+        descending: bool,
+        after: Optional[Tuple[Any, ...]],
+        limit: int
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Read everything the filters select (an index query when they allow,
+        else a parallel scan) keeping only the best `limit` + 1 items past
+        `after`; returns a page and whether more follow
+        """
+        operation, params = plan_query(self.indexes, filters)
+        self._projected(params, fields)
+        pages = self.scan_pages(params) if operation == 'scan' else self._query_pages(params)
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        best: List[Dict] = []
+        async for page in pages:
+            candidates = [item for item in page if self._beyond(sort_rank(item, order_by, descending), after, descending)]
+            if candidates:
+                best = pick(limit + 1, best + candidates, key=lambda item: sort_rank(item, order_by, descending))
+        return best[:limit], len(best) > limit
+
+    async def put_item(self, item: Dict) -> Dict:
+        """Put a new item into the table, stamping it as version 1"""
+        try:
+            item['version'] = 1
+            await dynamodb_call(self.table, 'put_item', Item=self.to_item(item))
+            entity_cache.set(self._cache_key(item), item)
+            search_index.update(self.table_name, [item])
+            record_change(self.table_name, CREATED, self.key_of(item), item)
+            await self._record_summary([(None, item)])
+            return item
+        except ClientError as e:
+            logger.error("Error putting item: %s", e)
+            raise
+        finally:
+            await change_tracker.mark(self.table_name)
+
+    async def update_item(
+        self,
+        key: Dict[str, str],
+        updates: Dict,
+        expected_versions: Optional[List[int]] = None
+    ) -> Optional[Dict]:
+        """
+        Update an existing item in one conditional write and bump its version
+
+        Returns None if the item does not exist; raises VersionConflict if
+        `expected_versions` is given and the stored version is not among them.
+        """
+        # Build update expression over the stored layout
+        stored = self.to_item(updates)
+        stored.pop('version', None)
+        removed = self.removed_attributes(updates)
+        if not stored and not removed:
+            item = await self.get_item(key)
+            if item and expected_versions is not None and item.get('version', 0) not in expected_versions:
+                raise VersionConflict(key['id'])
             return item
-        
-        # Reconstruct specs
-        deserialized = {**item}
+        try:
+            condition, expr_names, expr_values = write_condition(expected_versions)
+            update_expr = "SET " + ", ".join([f"#{k} = :{k}" for k in stored.keys()]) if stored else ""
+            if removed:
+                update_expr += " REMOVE " + ", ".join(f"#{k}" for k in removed)
+            update_expr += " ADD #version :one"
+            expr_names.update({f"#{k}": k for k in list(stored) + removed})
+            expr_names['#version'] = 'version'
+            expr_values.update({f":{k}": v for k, v in stored.items()})
+            expr_values[':one'] = 1
+
+            response = await dynamodb_call(
+                self.table, 'update_item',
+                Key=key,
+                UpdateExpression=update_expr,
+                ConditionExpression=condition,
+                ExpressionAttributeNames=expr_names,
+                ExpressionAttributeValues=expr_values,
+                ReturnValues="ALL_OLD",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )
+            # SET replaces attributes wholesale, so the new image is the old
+            # one overlaid with `stored`; the old one feeds the summary delta
+            previous = response['Attributes']
+            current = {**previous, **stored, 'version': previous.get('version', 0) + 1}
+            for name in removed:
+                current.pop(name, None)
+            updated = self.from_item(current)
+            entity_cache.set(self._cache_key(key), updated)
+            search_index.update(self.table_name, [updated])
+            record_change(self.table_name, UPDATED, key, updated)
+            if self.summary:
+                await self._record_summary([(self.from_item(previous), updated)])
+            return updated
+        except ClientError as e:
+            entity_cache.invalidate(self._cache_key(key))
+            if is_condition_failure(e):
+                # The old item comes back only when it exists, i.e. the version check failed
+                if 'Item' in e.response:
+                    raise VersionConflict(key['id'])
+                return None
+            logger.error("Error updating item: %s", e)
+            raise
+        finally:
+            await change_tracker.mark(self.table_name)
+
+    async def delete_item(self, key: Dict[str, str], expected_versions: Optional[List[int]] = None) -> bool:
+        """
+        Delete an existing item in one conditional write
+
+        Returns False if the item does not exist; raises VersionConflict if
+        `expected_versions` is given and the stored version is not among them.
+        """
+        try:
+            condition, expr_names, expr_values = write_condition(expected_versions)
+            params = {'ConditionExpression': condition, 'ExpressionAttributeNames': expr_names}
+            if expr_values:
+                params['ExpressionAttributeValues'] = expr_values
+            response = await dynamodb_call(
+                self.table, 'delete_item',
+                Key=key,
+                ReturnValues="ALL_OLD",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                **params
+            )
+            search_index.remove(self.table_name, [key['id']])
+            if 'Attributes' in response:
+                record_change(self.table_name, DELETED, key)
+            if self.summary and 'Attributes' in response:
+                await self._record_summary([(self.from_item(response['Attributes']), None)])
+            return True
+        except ClientError as e:
+            if is_condition_failure(e):
+                if 'Item' in e.response:
+                    raise VersionConflict(key['id'])
+                return False
+            logger.error("Error deleting item: %s", e)
+            raise
+        finally:
+            entity_cache.invalidate(self._cache_key(key))
+            await change_tracker.mark(self.table_name)
+
+    async def batch_get(self, ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many items by id, cache first; returns the items found, keyed by id"""
+        found = {}
+        misses = []
+        unique = list(dict.fromkeys(ids))
+        cached_items = await entity_cache.fetch_many([(self.table_name, item_id) for item_id in unique])
+        for item_id, cached in zip(unique, cached_items):
+            if cached is not None:
+                found[item_id] = cached
+            else:
+                misses.append(item_id)
+        if not misses:
+            return found
+        try:
+            fetched = await batch_get(self.table, misses)
+        except ClientError as e:
+            logger.error("Error batch getting items: %s", e)
+            raise
+        for item_id, raw in fetched.items():
+            item = self.from_item(raw)
+            entity_cache.set((self.table_name, item_id), item)
+            found[item_id] = item
+        return found
+
+    async def batch_write(self, put_items: List[Dict], delete_ids: List[str]) -> Set[str]:
+        """
+        Bulk put/delete via BatchWriteItem; returns the ids that could not be written
+
+        BatchWriteItem cannot be conditional, so puts read the current
+        versions first (cache, then BatchGetItem) and write the next one.
+        The same read supplies the old images for the summary delta, so
+        deletes are read too when the table keeps a summary.
+        """
+        read_ids = [item['id'] for item in put_items] + (delete_ids if self.summary else [])
+        current = await self.batch_get(read_ids) if read_ids else {}
+        put_items = [
+            {**item, 'version': current.get(item['id'], {}).get('version', 0) + 1}
+            for item in put_items
+        ]
+        for item_id in [item['id'] for item in put_items] + delete_ids:
+            entity_cache.invalidate((self.table_name, item_id))
+        try:
+            failed = await batch_write(
+                self.table,
+                [self.to_item(item) for item in put_items],
+                [{'id': item_id} for item_id in delete_ids]
+            )
+        except ClientError as e:
+            logger.error("Error batch writing items: %s", e)
+            raise
+        finally:
+            await change_tracker.mark(self.table_name)
+        for item in put_items:
+            if item['id'] not in failed:
+                entity_cache.set(self._cache_key(item), item)
+        search_index.update(self.table_name, [item for item in put_items if item['id'] not in failed])
+        search_index.remove(self.table_name, [item_id for item_id in delete_ids if item_id not in failed])
+        for item in put_items:
+            if item['id'] not in failed:
+                record_change(self.table_name, UPDATED if item['id'] in current else CREATED, self.key_of(item), item)
+        for item_id in delete_ids:
+            if item_id not in failed:
+                record_change(self.table_name, DELETED, {'id': item_id})
+        changes = [(current.get(item['id']), item) for item in put_items if item['id'] not in failed]
+        changes += [(current.get(item_id), None) for item_id in delete_ids if item_id not in failed]
+        await self._record_summary(changes)
+        return failed
+
+    async def query_range(
+        self,
+        index: IndexSpec,
+        hash_value: Any,
+        low: Any,
+        high: Any,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict]:
+        """Every item of one index partition whose range key lies in [low, high], in range-key order"""
+        try:
+            params = self._projected({
+                'IndexName': index.name,
+                'KeyConditionExpression': Key(index.hash_key).eq(hash_value) & Key(index.range_key).between(low, high)
+            }, fields)
+            items = []
+            while True:
+                response = await dynamodb_call(self.table, 'query', **params)
+                items.extend(self.from_item(item) for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return items
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error("Error querying index range: %s", e)
+            raise
+
+    async def query_by_gsi(self, index_name: str, key_condition_expression, expression_values: Dict) -> List[Dict]:
+        """Query using a Global Secondary Index"""
+        try:
+            response = await dynamodb_call(
+                self.table, 'query',
+                IndexName=index_name,
+                KeyConditionExpression=key_condition_expression,
+                ExpressionAttributeValues=python_to_dynamodb(expression_values)
+            )
+            items = response.get('Items', [])
+
+            # Handle pagination
+            while 'LastEvaluatedKey' in response:
+                response = await dynamodb_call(
+                    self.table, 'query',
+                    IndexName=index_name,
+                    KeyConditionExpression=key_condition_expression,
+                    ExpressionAttributeValues=python_to_dynamodb(expression_values),
+                    ExclusiveStartKey=response['LastEvaluatedKey']
+                )
+                items.extend(response.get('Items', []))
+
+            return [self.from_item(item) for item in items]
+        except ClientError as e:
+            logger.error("Error querying GSI: %s", e)
+            raise
+
+class ServerRepository(DynamoDBRepository):
+    """NccServers stores `specs` flattened into specs_cpu / specs_ram / specs_storage"""
+
+    def to_item(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Servers never store nulls; a null in a partial update is ignored
+        serialized = {k: v for k, v in data.items() if v is not None}
+        if isinstance(serialized.get('specs'), dict):
+            specs = serialized.pop('specs')
+            serialized['specs_cpu'] = specs['cpu']
+            serialized['specs_ram'] = specs['ram']
+            serialized['specs_storage'] = specs['storage']
+        return self.schema.to_dynamodb(serialized)
+
+    def stored_attributes(self, fields: Tuple[str, ...]) -> List[str]:
+        attributes = [name for name in fields if name != 'specs']
+        if 'specs' in fields:
+            attributes += ['specs_cpu', 'specs_ram', 'specs_storage']
+        return attributes
+
+    def from_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        deserialized = self.schema.to_python(item)
         if 'specs_cpu' in deserialized:
             deserialized['specs'] = {
                 'cpu': deserialized.pop('specs_cpu', ''),
@@ -44,111 +709,140 @@ class DynamoDBClient:
                 'storage': deserialized.pop('specs_storage', '')
             }
         return deserialized
-    
-    async def get_server(self, server_id: str) -> Optional[Server]:
-        """Get a server by ID"""
-        try:
-            response = self.table.get_item(Key={'id': server_id})
-            item = response.get('Item')
-            if item:
-                return Server(**self._deserialize_server(item))
+
+class DomainRepository(DynamoDBRepository):
+    """
+    NccDomains also stores the certificate's `ssl.status` / `ssl.validTo`
+    as top-level sslStatus / sslValidTo, the keys of GSI_SslExpiry, so
+    certificate expiry can be range-queried like expiryDate. Index keys
+    cannot be empty strings, so a certificate without a status or validTo
+    date stays out of the index.
+    """
+
+    @staticmethod
+    def _ssl_keys(ssl: Any) -> Optional[Tuple[str, str]]:
+        """(sslStatus, sslValidTo) for a certificate that can be indexed, else None"""
+        if not isinstance(ssl, dict):
             return None
-        except Exception as e:
-            print(f"Error getting server: {e}")
-            raise
-    
-    async def list_servers(
+        status = ssl.get('status')
+        status = status.value if isinstance(status, Enum) else status
+        valid_to = ssl.get('validTo')
+        return (status, valid_to) if status and valid_to else None
+
+    def to_item(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        serialized = self.schema.to_dynamodb(data)
+        keys = self._ssl_keys(data.get('ssl'))
+        if keys:
+            serialized['sslStatus'], serialized['sslValidTo'] = keys
+        return serialized
+
+    def from_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        item.pop('sslStatus', None)
+        item.pop('sslValidTo', None)
+        return self.schema.to_python(item)
+
+    def removed_attributes(self, updates: Dict[str, Any]) -> List[str]:
+        # Clearing the certificate, or one without a validTo date, drops the
+        # domain from GSI_SslExpiry
+        return ['sslStatus', 'sslValidTo'] if 'ssl' in updates and not self._ssl_keys(updates['ssl']) else []
+
+class ChildRepository(DynamoDBRepository):
+    """
+    Items owned by a parent item, keyed by (`parent_key`, id)
+
+    Each child is its own item, so adding, editing or removing one never
+    rewrites its siblings, and a parent's children are read a page at a
+    time with a single-partition query.
+    """
+
+    def __init__(self, table_name: str, model: Type[BaseModel], parent_key: str):
+        super().__init__(table_name, model)
+        self.parent_key = parent_key
+
+    def _cache_key(self, key: Dict[str, str]) -> Tuple[str, str, str]:
+        return (self.table_name, key[self.parent_key], key['id'])
+
+    @property
+    def key_names(self) -> Tuple[str, ...]:
+        return (self.parent_key, 'id')
+
+    def key_of(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {self.parent_key: item[self.parent_key], 'id': item['id']}
+
+    async def list_children(
         self,
-        status: Optional[str] = None,
-        category: Optional[str] = None
-    ) -> List[Server]:
-        """List all servers with optional filtering"""
-        try:
-            # Use GSI if filtering by status or category
-            if status:
-                response = self.table.query(
-                    IndexName='GSI_Status',
-                    KeyConditionExpression=Key('status').eq(status)
-                )
-            elif category:
-                response = self.table.query(
-                    IndexName='GSI_Category',
-                    KeyConditionExpression=Key('category').eq(category)
-                )
-            else:
-                # Full scan if no filters
-                response = self.table.scan()
-            
-            items = response.get('Items', [])
-            return [Server(**self._deserialize_server(item)) for item in items]
-        except Exception as e:
-            print(f"Error listing servers: {e}")
-            raise
-    
-    async def create_server(self, server: Server) -> Server:
-        """Create a new server"""
-        try:
-            server_dict = server.model_dump()
-            serialized = self._serialize_server(server_dict)
-            
-            self.table.put_item(Item=serialized)
-            return server
-        except Exception as e:
-            print(f"Error creating server: {e}")
-            raise
-    
-    async def update_server(self, server_id: str, updates: Dict[str, Any]) -> Optional[Server]:
-        """Update an existing server"""
-        try:
-            # Build update expression
-            update_expr = "SET "
-            expr_attr_values = {}
-            expr_attr_names = {}
-            
-            for key, value in updates.items():
-                if value is not None:
-                    if key == 'specs':
-                        # Handle specs separately
-                        expr_attr_names['#specs_cpu'] = 'specs_cpu'
-                        expr_attr_names['#specs_ram'] = 'specs_ram'
-                        expr_attr_names['#specs_storage'] = 'specs_storage'
-                        expr_attr_values[':specs_cpu'] = value['cpu']
-                        expr_attr_values[':specs_ram'] = value['ram']
-                        expr_attr_values[':specs_storage'] = value['storage']
-                        update_expr += "#specs_cpu = :specs_cpu, #specs_ram = :specs_ram, #specs_storage = :specs_storage, "
-                    else:
-                        attr_name = f"#{key}"
-                        attr_value = f":{key}"
-                        expr_attr_names[attr_name] = key
-                        expr_attr_values[attr_value] = value
-                        update_expr += f"{attr_name} = {attr_value}, "
-            
-            update_expr = update_expr.rstrip(', ')
-            
-            response = self.table.update_item(
-                Key={'id': server_id},
-                UpdateExpression=update_expr,
-                ExpressionAttributeNames=expr_attr_names,
-                ExpressionAttributeValues=expr_attr_values,
-                ReturnValues='ALL_NEW'
-            )
-            
-            updated_item = response.get('Attributes')
-            if updated_item:
-                return Server(**self._deserialize_server(updated_item))
-            return None
-        except Exception as e:
-            print(f"Error updating server: {e}")
+        parent_id: str,
+        limit: int,
+        start_key: Optional[Dict[str, Any]] = None,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """Read one page of a parent's children (only `fields`, if given); returns the items and the LastEvaluatedKey"""
+        try:
+            params = self._projected({'KeyConditionExpression': Key(self.parent_key).eq(parent_id), 'Limit': limit}, fields)
+            self._resume(params, start_key, {self.parent_key: parent_id})
+            response = await dynamodb_call(self.table, 'query', **params)
+            items = [self.from_item(item) for item in response.get('Items', [])]
+            return items, response.get('LastEvaluatedKey')
+        except ClientError as e:
+            logger.error("Error listing child items: %s", e)
             raise
-    
-    async def delete_server(self, server_id: str) -> bool:
-        """Delete a server"""
+
+    async def children_of(self, parent_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Every child of each parent, by parent id (one query per parent, in parallel)"""
+        async def children(parent_id: str) -> List[Dict]:
+            items = []
+            async for page in self._query_pages({'KeyConditionExpression': Key(self.parent_key).eq(parent_id)}):
+                items.extend(page)
+            return items
         try:
-            self.table.delete_item(Key={'id': server_id})
-            return True
-        except Exception as e:
-            print(f"Error deleting server: {e}")
+            found = await asyncio.gather(*(children(parent_id) for parent_id in parent_ids))
+        except ClientError as e:
+            logger.error("Error reading child items: %s", e)
+            raise
+        return dict(zip(parent_ids, found))
+
+    async def put_children(self, parent_id: str, items: List[Dict]) -> Set[str]:
+        """Create many children of one parent via BatchWriteItem; returns the ids that could not be written"""
+        items = [{**item, self.parent_key: parent_id, 'version': 1} for item in items]
+        try:
+            failed = await batch_write(self.table, [self.to_item(item) for item in items], [])
+        except ClientError as e:
+            logger.error("Error batch writing child items: %s", e)
             raise
+        finally:
+            await change_tracker.mark(self.table_name)
+        for item in items:
+            if item['id'] not in failed:
+                entity_cache.set(self._cache_key(item), item)
+                record_change(self.table_name, CREATED, self.key_of(item), item)
+        return failed
 
-# Singleton instance
-db_client = DynamoDBClient()
+    async def delete_children(self, parent_id: str) -> int:
+        """Remove every child of a parent, a page of keys at a time; returns how many were deleted"""
+        deleted = 0
+        params = {
+            'KeyConditionExpression': Key(self.parent_key).eq(parent_id),
+            'ProjectionExpression': '#parent, #id',
+            'ExpressionAttributeNames': {'#parent': self.parent_key, '#id': 'id'}
+        }
+        try:
+            while True:
+                response = await dynamodb_call(self.table, 'query', **params)
+                keys = response.get('Items', [])
+                for key in keys:
+                    entity_cache.invalidate(self._cache_key(key))
+                if keys:
+                    failed = await batch_write(self.table, [], keys)
+                    if failed:
+                        raise RuntimeError(f"Could not delete {len(failed)} child items of {parent_id}")
+                    for key in keys:
+                        record_change(self.table_name, DELETED, key)
+                    deleted += len(keys)
+                if 'LastEvaluatedKey' not in response:
+                    return deleted
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error("Error deleting child items: %s", e)
+            raise
+        finally:
+            await change_tracker.mark(self.table_name)
@@ -1,18 +1,38 @@
 """
 DynamoDB Helper Functions
+Type conversion, query planning, the instrumented call wrapper, batch and
+parallel scan primitives used by the repository layer in app/database.py
 """
-import boto3
-import os
-from typing import List, Dict, Any, Optional
+import asyncio
+import time
+from functools import lru_cache
+from typing import List, Dict, Any, AsyncIterator, Optional, Set, Tuple, Type, Union, get_args, get_origin
 from decimal import Decimal
+from enum import Enum
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from app.config import settings
+from app.executor import run_sync
+from app.metrics import record_dynamodb_call, record_dynamodb_error
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb',
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'ap-south-2'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
+async def dynamodb_call(table, operation: str, **params) -> Dict[str, Any]:
+    """
+    Run one DynamoDB call on the thread pool and record it in the metrics
+
+    `operation` is a Table method, or a client method for the batch_*
+    calls. The call asks for its ConsumedCapacity unless told otherwise.
+    """
+    params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+    target = table.meta.client if operation.startswith('batch_') else table
+    started = time.perf_counter()
+    try:
+        response = await run_sync(getattr(target, operation), **params)
+    except ClientError as e:
+        record_dynamodb_error(table.name, operation, e.response.get('Error', {}).get('Code', 'Unknown'), time.perf_counter() - started)
+        raise
+    record_dynamodb_call(table.name, operation, response, time.perf_counter() - started)
+    return response
 
 def python_to_dynamodb(obj: Any) -> Any:
     """Convert Python objects to DynamoDB compatible format"""
@@ -34,104 +54,365 @@ def dynamodb_to_python(obj: Any) -> Any:
         return [dynamodb_to_python(item) for item in obj]
     return obj
 
-class DynamoDBHelper:
-    """Helper class for DynamoDB operations"""
-    
-    def __init__(self, table_name: str):
-        self.table = dynamodb.Table(table_name)
+def _unwrap(annotation: Any) -> Tuple[Any, bool]:
+    """Strip Optional[...] and List[...]; returns the inner type and whether it was a list"""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None, False
+        annotation = args[0]
+    if get_origin(annotation) in (list, List):
+        return get_args(annotation)[0], True
+    return annotation, False
+
+class NumericSchema:
+    """
+    Where a model keeps its numeric attributes
+
+    Lets items be converted field by field instead of rebuilding every
+    nested dict and list: reads turn exactly these Decimals into int/float
+    in place, writes copy only the path down to a float.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.numbers: Dict[str, type] = {}  # field -> int or float
+        self.floats: List[str] = []
+        self.nested: Dict[str, Tuple['NumericSchema', bool]] = {}  # field -> (schema, is_list)
+
+        for name, field in model.model_fields.items():
+            inner, is_list = _unwrap(field.annotation)
+            if inner in (int, float) and not is_list:
+                self.numbers[name] = inner
+                if inner is float:
+                    self.floats.append(name)
+            elif isinstance(inner, type) and issubclass(inner, BaseModel):
+                schema = numeric_schema(inner)
+                if schema.numbers or schema.nested:
+                    self.nested[name] = (schema, is_list)
+        self.has_floats = bool(self.floats) or any(schema.has_floats for schema, _ in self.nested.values())
+
+    def to_python(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a stored item's numeric attributes from Decimal, in place"""
+        for name, kind in self.numbers.items():
+            value = item.get(name)
+            if isinstance(value, Decimal):
+                item[name] = kind(value)
+        for name, (schema, is_list) in self.nested.items():
+            value = item.get(name)
+            if is_list and isinstance(value, list):
+                for element in value:
+                    if isinstance(element, dict):
+                        schema.to_python(element)
+            elif isinstance(value, dict):
+                schema.to_python(value)
+        return item
+
+    def to_dynamodb(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Shallow copy of `data` with float attributes as Decimal; other values are shared"""
+        item = dict(data)
+        for name in self.floats:
+            value = item.get(name)
+            if isinstance(value, float):
+                item[name] = Decimal(str(value))
+        for name, (schema, is_list) in self.nested.items():
+            if not schema.has_floats:
+                continue
+            value = item.get(name)
+            if is_list and isinstance(value, list):
+                item[name] = [schema.to_dynamodb(e) if isinstance(e, dict) else e for e in value]
+            elif isinstance(value, dict):
+                item[name] = schema.to_dynamodb(value)
+        return item
+
+@lru_cache(maxsize=None)
+def numeric_schema(model: Type[BaseModel]) -> NumericSchema:
+    """Build (once) the NumericSchema of a model"""
+    return NumericSchema(model)
+
+def is_condition_failure(error: Exception) -> bool:
+    """True when a conditional write was rejected"""
+    return (
+        isinstance(error, ClientError)
+        and error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+    )
+
+def write_condition(expected_versions: Optional[List[int]] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """
+    ConditionExpression for a write to an existing item
+
+    With `expected_versions` the stored `version` must also be one of them
+    (version 0 means the item predates versioning and has none).
+    Returns the expression plus its attribute names and values.
+    """
+    names = {'#id': 'id'}
+    values: Dict[str, Any] = {}
+    condition = "attribute_exists(#id)"
+    if expected_versions is not None:
+        names['#version'] = 'version'
+        checks = []
+        for i, version in enumerate(expected_versions):
+            if version:
+                values[f':expected{i}'] = version
+                checks.append(f"#version = :expected{i}")
+            else:
+                checks.append("attribute_not_exists(#version)")
+        condition += " AND (" + " OR ".join(checks) + ")"
+    return condition, names, values
+
+def build_filter(filters: Optional[Dict[str, Any]]):
+    """AND together equality conditions, skipping unset values"""
+    condition = None
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        clause = Attr(name).eq(python_to_dynamodb(value))
+        condition = clause if condition is None else condition & clause
+    return condition
+
+class IndexSpec:
+    """A Global Secondary Index the query planner may use"""
     
-    def get_item(self, key: Dict[str, str]) -> Optional[Dict]:
-        """Get a single item by key"""
-        try:
-            response = self.table.get_item(Key=key)
-            if 'Item' in response:
-                return dynamodb_to_python(response['Item'])
-            return None
-        except ClientError as e:
-            print(f"Error getting item: {e}")
-            raise
+    def __init__(self, name: str, hash_key: str, range_key: Optional[str] = None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+
+# GSIs provisioned by scripts/create_table.py, most selective first.
+# Free-form attributes (registrar, provider, language) split a table into
+# more partitions than the small status/type enums, so they are preferred.
+TABLE_INDEXES: Dict[str, List[IndexSpec]] = {
+    'NccServers': [
+        IndexSpec('GSI_Status', 'status'),
+        IndexSpec('GSI_Category', 'category', 'name'),
+    ],
+    'NccDomains': [
+        IndexSpec('GSI_Registrar', 'registrar'),
+        IndexSpec('GSI_Status', 'status', 'expiryDate'),
+        IndexSpec('GSI_SslExpiry', 'sslStatus', 'sslValidTo'),
+    ],
+    'NccEmails': [
+        IndexSpec('GSI_Provider', 'provider'),
+        IndexSpec('GSI_Status', 'status'),
+    ],
+    'NccRepositories': [
+        IndexSpec('GSI_Language', 'language'),
+        IndexSpec('GSI_Provider', 'provider'),
+    ],
+    'NccStorage': [
+        IndexSpec('GSI_Provider', 'provider'),
+        IndexSpec('GSI_Type', 'type'),
+    ],
+}
+
+def plan_query(indexes: List[IndexSpec], filters: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Choose how to read a filtered list
     
-    def scan(self, filter_expression=None, expression_values=None) -> List[Dict]:
-        """Scan table with optional filter"""
-        try:
-            params = {}
-            if filter_expression and expression_values:
-                params['FilterExpression'] = filter_expression
-                params['ExpressionAttributeValues'] = python_to_dynamodb(expression_values)
-            
-            response = self.table.scan(**params)
-            items = response.get('Items', [])
-            
-            # Handle pagination
-            while 'LastEvaluatedKey' in response:
-                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
-                response = self.table.scan(**params)
-                items.extend(response.get('Items', []))
-            
-            return [dynamodb_to_python(item) for item in items]
-        except ClientError as e:
-            print(f"Error scanning table: {e}")
-            raise
+    Returns ('query', params) against the first index whose hash key is
+    filtered on, or ('scan', params) when none applies. Remaining filters
+    become a FilterExpression either way.
+    """
+    remaining = {k: v for k, v in (filters or {}).items() if v is not None}
+    params: Dict[str, Any] = {}
+    operation = 'scan'
     
-    def put_item(self, item: Dict) -> Dict:
-        """Put an item into the table"""
-        try:
-            converted_item = python_to_dynamodb(item)
-            self.table.put_item(Item=converted_item)
-            return item
-        except ClientError as e:
-            print(f"Error putting item: {e}")
-            raise
+    for index in indexes:
+        if index.hash_key in remaining:
+            value = python_to_dynamodb(remaining.pop(index.hash_key))
+            params['IndexName'] = index.name
+            params['KeyConditionExpression'] = Key(index.hash_key).eq(value)
+            operation = 'query'
+            break
     
-    def update_item(self, key: Dict[str, str], updates: Dict) -> Dict:
-        """Update an item"""
-        try:
-            # Build update expression
-            update_expr = "SET " + ", ".join([f"#{k} = :{k}" for k in updates.keys()])
-            expr_names = {f"#{k}": k for k in updates.keys()}
-            expr_values = {f":{k}": python_to_dynamodb(v) for k, v in updates.items()}
-            
-            response = self.table.update_item(
-                Key=key,
-                UpdateExpression=update_expr,
-                ExpressionAttributeNames=expr_names,
-                ExpressionAttributeValues=expr_values,
-                ReturnValues="ALL_NEW"
-            )
-            return dynamodb_to_python(response['Attributes'])
-        except ClientError as e:
-            print(f"Error updating item: {e}")
-            raise
+    condition = build_filter(remaining)
+    if condition is not None:
+        params['FilterExpression'] = condition
+    return operation, params
+
+def add_projection(params: Dict[str, Any], attributes: List[str]) -> None:
+    """Read only `attributes`; placeholders sidestep reserved words such as name and status"""
+    names = {f"#p{i}": attribute for i, attribute in enumerate(attributes)}
+    params['ProjectionExpression'] = ', '.join(names)
+    params.setdefault('ExpressionAttributeNames', {}).update(names)
+
+def sortable_fields(model: Type[BaseModel]) -> List[str]:
+    """Scalar fields (strings, numbers, booleans, enums) a list can be ordered by"""
+    fields = []
+    for name, field in model.model_fields.items():
+        inner, is_list = _unwrap(field.annotation)
+        if not is_list and isinstance(inner, type) and issubclass(inner, (str, int, float)):
+            fields.append(name)
+    return fields
+
+def enum_values(model: Type[BaseModel], name: str) -> Optional[List[Any]]:
+    """Every value of an enum field, or None if `name` is not one"""
+    field = model.model_fields.get(name)
+    inner = _unwrap(field.annotation)[0] if field else None
+    if isinstance(inner, type) and issubclass(inner, Enum):
+        return [member.value for member in inner]
+    return None
+
+def sort_index(indexes: List[IndexSpec], order_by: str) -> Optional[IndexSpec]:
+    """The first index kept in `order_by` order (its range key), if any"""
+    return next((index for index in indexes if index.range_key == order_by), None)
+
+def rankable(model: Type[BaseModel], name: str, value: Any) -> bool:
+    """Whether `value` (from a cursor, say) compares with the values of `model`'s sortable field `name`"""
+    inner, _ = _unwrap(model.model_fields[name].annotation)
+    return value is None or isinstance(value, str if issubclass(inner, str) else (int, float))
+
+def sort_rank(item: Dict[str, Any], order_by: str, descending: bool) -> Tuple[Any, ...]:
+    """Sort key for `order_by`, ties broken by id; items without the attribute come last either way"""
+    value = item.get(order_by)
+    if value is None:
+        return (-1 if descending else 1, '', item['id'])
+    return (0, value, item['id'])
+
+BATCH_WRITE_SIZE = 25
+
+async def _write_chunk(table, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """BatchWriteItem one chunk, retrying UnprocessedItems; returns what never got written"""
+    pending = requests
+    for attempt in range(settings.BATCH_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(min(0.05 * 2 ** (attempt - 1), 2.0))
+        response = await dynamodb_call(table, 'batch_write_item', RequestItems={table.name: pending})
+        pending = response.get('UnprocessedItems', {}).get(table.name, [])
+        if not pending:
+            break
+    return pending
+
+async def batch_write(table, put_items: List[Dict], delete_keys: List[Dict[str, str]]) -> Set[str]:
+    """
+    Write items in 25-request BatchWriteItem chunks, in parallel
     
-    def delete_item(self, key: Dict[str, str]) -> None:
-        """Delete an item"""
-        try:
-            self.table.delete_item(Key=key)
-        except ClientError as e:
-            print(f"Error deleting item: {e}")
-            raise
+    Items must already be in DynamoDB format. Returns the ids of requests
+    that were still unprocessed after BATCH_MAX_RETRIES retries.
+    """
+    requests = [{'PutRequest': {'Item': item}} for item in put_items]
+    requests += [{'DeleteRequest': {'Key': key}} for key in delete_keys]
+    chunks = [requests[i:i + BATCH_WRITE_SIZE] for i in range(0, len(requests), BATCH_WRITE_SIZE)]
     
-    def query_by_gsi(self, index_name: str, key_condition_expression, expression_values: Dict) -> List[Dict]:
-        """Query using a Global Secondary Index"""
+    failed = set()
+    for leftovers in await asyncio.gather(*(_write_chunk(table, chunk) for chunk in chunks)):
+        for request in leftovers:
+            if 'PutRequest' in request:
+                failed.add(request['PutRequest']['Item']['id'])
+            else:
+                failed.add(request['DeleteRequest']['Key']['id'])
+    return failed
+
+BATCH_GET_SIZE = 100
+
+async def _get_chunk(table, keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """BatchGetItem one chunk, retrying UnprocessedKeys"""
+    items = []
+    pending = {'Keys': keys}
+    for attempt in range(settings.BATCH_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(min(0.05 * 2 ** (attempt - 1), 2.0))
+        response = await dynamodb_call(table, 'batch_get_item', RequestItems={table.name: pending})
+        items.extend(response.get('Responses', {}).get(table.name, []))
+        pending = response.get('UnprocessedKeys', {}).get(table.name)
+        if not pending or not pending.get('Keys'):
+            return items
+    raise RuntimeError(f"BatchGetItem left {len(pending['Keys'])} keys unprocessed after retries")
+
+async def batch_get(table, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch items by id in parallel 100-key BatchGetItem calls; returns raw items by id"""
+    keys = [{'id': item_id} for item_id in dict.fromkeys(ids)]
+    chunks = [keys[i:i + BATCH_GET_SIZE] for i in range(0, len(keys), BATCH_GET_SIZE)]
+    found = {}
+    for items in await asyncio.gather(*(_get_chunk(table, chunk) for chunk in chunks)):
+        for item in items:
+            found[item['id']] = item
+    return found
+
+class CapacityLimiter:
+    """
+    Token bucket over consumed read capacity units per second
+
+    Each call spends what DynamoDB reports it consumed, which can take the
+    bucket below zero; the next call then waits until it has refilled.
+    Runs on the event loop, so no locking. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, units_per_second: float):
+        self.rate = units_per_second
+        self._tokens = units_per_second
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def wait(self) -> None:
+        """Wait until the bucket is no longer in debt"""
+        if self.rate <= 0:
+            return
+        self._refill()
+        while self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+            self._refill()
+
+    def spend(self, units: float) -> None:
+        if self.rate > 0:
+            self._refill()
+            self._tokens -= units
+
+_SEGMENT_DONE = object()
+
+async def parallel_scan(
+    table,
+    segments: int,
+    params: Optional[Dict[str, Any]] = None,
+    limiter: Optional[CapacityLimiter] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Scan a whole table as `segments` concurrent Segment / TotalSegments scans
+
+    Yields raw pages in completion order, not key order. At most `segments`
+    pages wait for the consumer, so a slow consumer throttles the scan
+    rather than growing memory. With a `limiter`, every page request waits
+    for capacity and spends what it consumed. Closing the generator early
+    cancels the outstanding segments.
+    """
+    segments = max(segments, 1)
+    pages: asyncio.Queue = asyncio.Queue(maxsize=segments)
+
+    async def scan_segment(segment: int) -> None:
+        scan_params = dict(params or {})
+        if segments > 1:
+            scan_params.update(Segment=segment, TotalSegments=segments)
         try:
-            response = self.table.query(
-                IndexName=index_name,
-                KeyConditionExpression=key_condition_expression,
-                ExpressionAttributeValues=python_to_dynamodb(expression_values)
-            )
-            items = response.get('Items', [])
-            
-            # Handle pagination
-            while 'LastEvaluatedKey' in response:
-                response = self.table.query(
-                    IndexName=index_name,
-                    KeyConditionExpression=key_condition_expression,
-                    ExpressionAttributeValues=python_to_dynamodb(expression_values),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-            
-            return [dynamodb_to_python(item) for item in items]
-        except ClientError as e:
-            print(f"Error querying GSI: {e}")
-            raise
+            while True:
+                if limiter:
+                    await limiter.wait()
+                response = await dynamodb_call(table, 'scan', **scan_params)
+                if limiter:
+                    limiter.spend(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+                await pages.put(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except Exception as e:
+            await pages.put(e)
+            return
+        await pages.put(_SEGMENT_DONE)
+
+    tasks = [asyncio.create_task(scan_segment(segment)) for segment in range(segments)]
+    try:
+        remaining = segments
+        while remaining:
+            page = await pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,292 @@
+"""
+Change Events
+Create / update / delete events for every resource, kept in a bounded,
+sequence-numbered log that GET /events streams to subscribers as
+Server-Sent Events. Each event is encoded once and shared by every
+subscriber, and idle subscribers only wait on one shared wake-up, so a
+worker can hold thousands of open streams.
+
+Events come from the repository layer's write paths by default
+(EVENTS_SOURCE=writes). With EVENTS_SOURCE=streams the repositories stay
+quiet and a DynamoDB Streams consumer feeds `publish_stream_record`
+instead, which also covers writes made outside this process.
+
+In a worker cluster every event goes through the cache server, which
+numbers it and sends it to every worker, so each worker's log holds the
+same events under the same resume tokens.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Set, Tuple
+from boto3.dynamodb.types import TypeDeserializer
+from pydantic_core import to_json
+from app.cluster import cluster
+from app.config import settings
+
+# Resource name each table's events are published under
+TABLE_RESOURCES: Dict[str, str] = {
+    'NccServers': 'servers',
+    'NccDomains': 'domains',
+    'NccDnsRecords': 'dns',
+    'NccEmails': 'emails',
+    'NccRepositories': 'repositories',
+    'NccStorage': 'storage',
+}
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+# DynamoDB Streams eventName -> event type
+STREAM_EVENT_TYPES = {'INSERT': CREATED, 'MODIFY': UPDATED, 'REMOVE': DELETED}
+
+_deserializer = TypeDeserializer()
+
+class EventLog:
+    """
+    Thread-safe ring buffer of encoded SSE frames
+
+    Sequence numbers are contiguous, so a subscriber's position is a single
+    integer and catching up is a slice of the buffer. Resume tokens carry
+    an epoch (the process's own, or the cache server's in a cluster): a
+    token from another epoch (or one older than the buffer) cannot be
+    resumed, and the subscriber is told to reload.
+    """
+
+    def __init__(self, capacity: int):
+        self._new_epoch()
+        self._frames: Deque[Tuple[int, str, bytes]] = deque(maxlen=capacity)  # (seq, resource, frame)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self.subscribers = 0
+        os.register_at_fork(after_in_child=self._new_epoch)
+        cluster.on('event', self.receive)
+        cluster.on_connect(self._adopt)
+        cluster.on_disconnect(self._lost_cluster)
+
+    def _new_epoch(self) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def token(self, seq: int) -> str:
+        return f'{self.epoch}-{seq}'
+
+    # ----- publishing -----
+
+    def publish(self, table_name: str, kind: str, key: Dict[str, Any], item: Optional[Dict[str, Any]] = None) -> None:
+        """Append one event; `key` is the item's primary key, `item` its new API-shaped image"""
+        resource = TABLE_RESOURCES.get(table_name)
+        if resource is None:
+            return
+        payload = {'type': kind, 'resource': resource, **key}
+        if item is not None:
+            payload['item'] = item
+        data = to_json(payload)
+        # In a cluster it comes back numbered, to every worker
+        if cluster.send('event', resource, kind, data):
+            return
+        with self._lock:
+            self._append(self._seq + 1, resource, kind, data)
+        self._notify()
+
+    def receive(self, seq: int, resource: str, kind: str, data: bytes) -> None:
+        """Append an event numbered by the cache server"""
+        with self._lock:
+            self._append(seq, resource, kind, data)
+        self._notify()
+
+    def _append(self, seq: int, resource: str, kind: str, data: bytes) -> None:
+        """Callers hold the lock"""
+        if seq != self._seq + 1:
+            # Missed some: nothing before this one can be resumed from
+            self._frames.clear()
+        self._seq = seq
+        frame = b'id: %s\nevent: %s\ndata: %s\n\n' % (self.token(seq).encode(), kind.encode(), data)
+        self._frames.append((seq, resource, frame))
+
+    def _adopt(self, snapshot: Dict[str, Any]) -> None:
+        """Switch to the cache server's numbering; open streams start over with a reset"""
+        with self._lock:
+            if snapshot['epoch'] == self.epoch and snapshot['sequence'] == self._seq:
+                return
+            self.epoch = snapshot['epoch']
+            self._seq = snapshot['sequence']
+            self._frames.clear()
+        self._notify()
+
+    def _lost_cluster(self) -> None:
+        """Number events alone until the cache server is back"""
+        with self._lock:
+            self._new_epoch()
+        self._notify()
+
+    def publish_stream_record(self, table_name: str, record: Dict[str, Any], from_item: Callable[[Dict], Dict]) -> None:
+        """
+        Publish one DynamoDB Streams record (view type NEW_AND_OLD_IMAGES or
+        NEW_IMAGE); `from_item` is the table's repository `from_item`
+        """
+        kind = STREAM_EVENT_TYPES.get(record.get('eventName'))
+        if kind is None:
+            return
+        change = record['dynamodb']
+        key = {name: _deserializer.deserialize(value) for name, value in change['Keys'].items()}
+        item = None
+        if kind != DELETED and 'NewImage' in change:
+            image = {name: _deserializer.deserialize(value) for name, value in change['NewImage'].items()}
+            item = from_item(image)
+        self.publish(table_name, kind, key, item)
+
+    def _notify(self) -> None:
+        """Wake every waiting subscriber (from the event loop or any other thread)"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # No subscriber has waited yet, or their loop is gone: nobody to wake
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wake()
+        else:
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    # ----- subscribing -----
+
+    def subscribe(self) -> Optional[Callable[[], None]]:
+        """
+        Reserve a subscriber slot; returns its release (safe to call more
+        than once), or None when all EVENTS_MAX_SUBSCRIBERS are taken
+        """
+        with self._lock:
+            if self.subscribers >= settings.EVENTS_MAX_SUBSCRIBERS:
+                return None
+            self.subscribers += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self.subscribers -= 1
+        return release
+
+    def resume_point(self, token: Optional[str]) -> Optional[int]:
+        """
+        Sequence number to continue after: the latest for no token, None
+        when the token cannot be resumed (foreign epoch, malformed, or
+        older than the buffer)
+        """
+        with self._lock:
+            if not token:
+                return self._seq
+            epoch, _, seq = token.rpartition('-')
+            if epoch != self.epoch or not seq.isdigit():
+                return None
+            seq = int(seq)
+            oldest = self._frames[0][0] if self._frames else self._seq + 1
+            if seq > self._seq or seq < oldest - 1:
+                return None
+            return seq
+
+    def read(self, after: int, resources: Optional[Set[str]]) -> Tuple[Optional[List[bytes]], int]:
+        """
+        Frames after sequence `after` (for `resources`, or all) and the new
+        position; None instead of frames when some have already been dropped
+        """
+        with self._lock:
+            if after >= self._seq:
+                return [], after
+            start = len(self._frames) - (self._seq - after)
+            if start < 0:
+                return None, self._seq
+            frames = [
+                frame for _, resource, frame in itertools.islice(self._frames, start, None)
+                if resources is None or resource in resources
+            ]
+            return frames, self._seq
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """Wait until there are events after `after`; False on timeout"""
+        with self._lock:
+            if self._seq > after:
+                return True
+        self._loop = asyncio.get_running_loop()
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _reset(self, position: int) -> bytes:
+        return b'id: %s\nevent: reset\ndata: {}\n\n' % self.token(position).encode()
+
+    async def stream(
+        self,
+        resources: Optional[Set[str]],
+        token: Optional[str],
+        release: Callable[[], None]
+    ) -> AsyncIterator[bytes]:
+        """
+        SSE frames for one subscriber, resuming after `token` when possible;
+        `release` (from `subscribe`) frees its slot when the stream ends
+
+        An unresumable token yields a `reset` event first, as does falling
+        behind the buffer: the client has missed events and should reload
+        before applying further ones.
+        Heartbeats carry the current position as their id, so a filtered
+        subscriber's resume token keeps up even when none of its resources
+        change.
+        """
+        try:
+            yield b'retry: %d\n\n' % settings.EVENTS_RETRY_MS
+            epoch = self.epoch
+            position = self.resume_point(token)
+            if position is None:
+                position = self.resume_point(None)
+                yield self._reset(position)
+            while True:
+                if self.epoch != epoch:
+                    # Renumbered (joined or lost the cache server): the position means nothing now
+                    epoch = self.epoch
+                    position = self.resume_point(None)
+                    yield self._reset(position)
+                    continue
+                frames, position = self.read(position, resources)
+                if frames is None:
+                    # Fell further behind than the buffer holds
+                    yield self._reset(position)
+                elif frames:
+                    yield b''.join(frames)
+                elif not await self.wait(position, settings.EVENTS_HEARTBEAT_SECONDS) and self.epoch == epoch:
+                    yield b'id: %s\n: keep-alive\n\n' % self.token(position).encode()
+        finally:
+            release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Log position and subscriber count, for sizing and health checks"""
+        with self._lock:
+            return {
+                'sequence': self._seq,
+                'buffered': len(self._frames),
+                'subscribers': self.subscribers,
+                'source': settings.EVENTS_SOURCE,
+            }
+
+event_log = EventLog(settings.EVENTS_LOG_SIZE)
+
+def record_change(table_name: str, kind: str, key: Dict[str, Any], item: Optional[Dict[str, Any]] = None) -> None:
+    """Write-path hook: publish unless events come from DynamoDB Streams"""
+    if settings.EVENTS_SOURCE == 'writes':
+        event_log.publish(table_name, kind, key, item)
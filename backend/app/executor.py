@@ -0,0 +1,31 @@
+"""
+Thread Pool Executor for Blocking DynamoDB Calls
+boto3 is synchronous, so every call is handed off to a bounded pool
+instead of running on the event loop.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from app.config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def configure_executor(max_workers: int) -> None:
+    """Replace the DynamoDB thread pool (0 runs calls inline on the event loop)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix='dynamodb'
+    ) if max_workers > 0 else None
+
+async def run_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking function on the DynamoDB thread pool"""
+    if _executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+configure_executor(settings.DB_EXECUTOR_WORKERS)
@@ -0,0 +1,126 @@
+"""
+Streaming Exports
+Whole-table dumps as NDJSON or CSV, encoded one scan page at a time and
+gzipped on the fly when the client accepts it, so memory stays flat
+however large the table grows
+"""
+import csv
+import io
+import typing
+import zlib
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from app.compression import preferred_encoding
+from app.models import ExportFormat
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: 'application/x-ndjson',
+    ExportFormat.csv: 'text/csv; charset=utf-8',
+}
+
+def _submodel(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The BaseModel behind `X` or `Optional[X]`, if any (a list of them stays one JSON cell)"""
+    if typing.get_origin(annotation) is list:
+        return None
+    candidates = [annotation] + [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    for candidate in candidates:
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+def csv_columns(model: Type[BaseModel]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """(header, path) per column: `id` first, nested models flattened to `parent.child`"""
+    columns = []
+    for name, field in model.model_fields.items():
+        nested = _submodel(field.annotation)
+        if nested:
+            columns.extend((f'{name}.{child}', (name, child)) for child in nested.model_fields)
+        else:
+            columns.append((name, (name,)))
+    columns.sort(key=lambda column: column[0] != 'id')
+    return columns
+
+def _cell(item: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value: Any = item
+    for part in path:
+        if not isinstance(value, dict):
+            return ''
+        value = value.get(part)
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, dict)):
+        # JSON keeps lists and maps unambiguous (and importable again)
+        return to_json(value).decode()
+    return value
+
+def ndjson_lines(items: Iterable[Dict[str, Any]]) -> bytes:
+    return b''.join(to_json(item) + b'\n' for item in items)
+
+def csv_lines(rows: Iterable[List[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue().encode()
+
+# Adds related data (a domain's DNS records) to a scan page's items in place
+Expand = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+async def _pages(repository: Any, expand: Optional[Expand]) -> AsyncIterator[List[Dict[str, Any]]]:
+    async for page in repository.scan_pages():
+        if expand:
+            await expand(page)
+        yield page
+
+async def export_chunks(
+    repository: Any,
+    export_format: ExportFormat,
+    model: Optional[Type[BaseModel]] = None,
+    expand: Optional[Expand] = None
+) -> AsyncIterator[bytes]:
+    """One encoded chunk per scan page (plus the CSV header); `model` (default: the repository's) sets the CSV columns"""
+    if export_format == ExportFormat.csv:
+        columns = csv_columns(model or repository.model)
+        yield csv_lines([[header for header, _ in columns]])
+        async for page in _pages(repository, expand):
+            yield csv_lines([_cell(item, path) for _, path in columns] for item in page)
+    else:
+        async for page in _pages(repository, expand):
+            yield ndjson_lines(page)
+
+async def gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress a chunk stream into one gzip member"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip (an explicit q=0 refuses it)"""
+    return preferred_encoding(request.headers.get('accept-encoding', ''), ['gzip']) == 'gzip'
+
+def export_response(
+    repository: Any,
+    resource: str,
+    export_format: ExportFormat,
+    request: Request,
+    model: Optional[Type[BaseModel]] = None,
+    expand: Optional[Expand] = None
+) -> StreamingResponse:
+    """Stream every item of `repository` as an attachment named after `resource` and today's date"""
+    chunks = export_chunks(repository, export_format, model, expand)
+    filename = f"{resource}-{datetime.now(timezone.utc).date().isoformat()}.{export_format.value}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"', 'Vary': 'Accept-Encoding'}
+    if accepts_gzip(request):
+        chunks = gzipped(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[export_format], headers=headers)
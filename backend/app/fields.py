@@ -0,0 +1,51 @@
+"""
+Sparse Fieldsets
+`fields=name,status,expiryDate` on list routes: only those attributes are
+read (a DynamoDB ProjectionExpression) and serialized. `id` is always
+returned. Responses validate against an all-optional copy of the model,
+one per resource, and are cut down with pydantic's `include`.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, create_model
+
+Fields = Optional[Tuple[str, ...]]
+
+def fields_param(model: Type[BaseModel]) -> Callable[..., Fields]:
+    """FastAPI dependency resolving `fields` against `model` (None = every field)"""
+    names = list(model.model_fields)
+
+    def resolve(
+        fields: Optional[str] = Query(
+            None,
+            description=f"Comma-separated attributes to return (id is always included): {', '.join(names)}"
+        )
+    ) -> Fields:
+        if not fields:
+            return None
+        requested = {name.strip() for name in fields.split(',') if name.strip()}
+        unknown = requested - set(names)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return tuple(name for name in names if name in requested or name == 'id')
+    return resolve
+
+@lru_cache(maxsize=None)
+def _partial(model: Type[BaseModel]) -> Type[BaseModel]:
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (Optional[field.annotation], None) for name, field in model.model_fields.items()}
+    )
+
+def sparse_model(model: Type[BaseModel], fields: Fields) -> Type[BaseModel]:
+    """`model` itself, or with `fields` a copy whose fields are all optional"""
+    return _partial(model) if fields else model
+
+def page_include(fields: Fields) -> Optional[Dict[str, Any]]:
+    """`include` for a Page of sparse items"""
+    return {'items': {'__all__': set(fields)}, 'next_cursor': True} if fields else None
+
+def list_include(fields: Fields) -> Optional[Dict[str, Any]]:
+    """`include` for a plain list of sparse items"""
+    return {'__all__': set(fields)} if fields else None
@@ -0,0 +1,266 @@
+"""
+Bulk Import Pipeline
+Loads NDJSON or CSV inventory files (the formats /export writes) a chunk
+of rows at a time:
+
+    read (thread pool) -> validate (process pool) -> write (bounded concurrency,
+    capacity-limited) -> commit (rejects, checkpoint)
+
+Only `concurrency` chunks are in flight, so a slow table throttles reading
+instead of growing memory. Chunks finish out of order but are committed in
+order: the checkpoint is the last row of the longest fully written prefix,
+and rejects are emitted exactly once. Rows without an id get ids derived
+from the job id and row number, so re-running rows after a crash
+overwrites them instead of duplicating them.
+"""
+import asyncio
+import csv
+import hashlib
+import io
+import itertools
+import json
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, IO, Iterator, List, Optional, Set, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from pydantic_core import to_json
+from app.bulk import describe_errors
+from app.db_helper import CapacityLimiter
+from app.executor import run_sync
+from app.models import ExportFormat
+
+Row = Tuple[int, Any]  # (1-based row number, raw line or CSV cells)
+
+UNPROCESSED = "Unprocessed after retries (throughput exceeded)"
+
+class ImportSpec:
+    """How one resource's rows become items, and how a batch of them is written"""
+
+    def __init__(
+        self,
+        resource: str,
+        create_model: Type[BaseModel],
+        model: Type[BaseModel],
+        build: Callable[[BaseModel], Dict[str, Any]],
+        write: Callable[[List[Dict[str, Any]], List[str]], Awaitable[Set[str]]]
+    ):
+        self.resource = resource
+        self.create_model = create_model
+        self.model = model
+        self.build = build
+        self.write = write
+
+class ImportTotals:
+    """Running counts of an import; `checkpoint` is the last committed row"""
+
+    def __init__(self, checkpoint: int = 0):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.failed = 0
+        self.checkpoint = checkpoint
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+# ----- reading -----
+
+def iter_rows(source: IO[bytes], export_format: ExportFormat, skip: int = 0) -> Tuple[Optional[List[str]], Iterator[Row]]:
+    """CSV header (None for NDJSON) and the data rows after row `skip`, numbered from 1"""
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    if export_format == ExportFormat.csv:
+        reader = csv.reader(text)
+        header = next(reader, None) or []
+        rows = ((number, cells) for number, cells in enumerate(reader, 1) if any(cells))
+    else:
+        header = None
+        rows = ((number, line) for number, line in enumerate(text, 1) if line.strip())
+    return header, ((number, raw) for number, raw in rows if number > skip)
+
+def _cell(value: str) -> Any:
+    """CSV cells hold strings; lists and objects are JSON (as /export writes them)"""
+    if value[:1] in '[{':
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_row(export_format: ExportFormat, header: Optional[List[str]], raw: Any) -> Dict[str, Any]:
+    """One raw row as a dict; CSV columns named `parent.child` nest, empty cells are left out"""
+    if export_format == ExportFormat.ndjson:
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("Row is not a JSON object")
+        return data
+    if len(raw) > len(header):
+        raise ValueError(f"Row has {len(raw)} cells but the header has {len(header)}")
+    data: Dict[str, Any] = {}
+    for name, value in zip(header, raw):
+        if value == '':
+            continue
+        *parents, leaf = name.split('.')
+        target = data
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = _cell(value)
+    return data
+
+# ----- validation (runs in worker processes) -----
+
+def _stable_ids(value: Any, seed: str) -> None:
+    """Replace generated ids (the item's and nested ones, e.g. initial DNS records) with ids derived from `seed`"""
+    if isinstance(value, dict):
+        if isinstance(value.get('id'), str):
+            prefix = value['id'].split('-', 1)[0]
+            value['id'] = f"{prefix}-{hashlib.sha1(seed.encode()).hexdigest()[:12]}"
+        for name, child in value.items():
+            if isinstance(child, list):
+                for index, element in enumerate(child):
+                    _stable_ids(element, f'{seed}:{name}:{index}')
+
+def validate_rows(
+    create_model: Type[BaseModel],
+    model: Type[BaseModel],
+    build: Callable[[BaseModel], Dict[str, Any]],
+    job: str,
+    export_format: ExportFormat,
+    header: Optional[List[str]],
+    rows: List[Row]
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, str]], float]:
+    """
+    Validate a chunk: rows with an id replace that item (`model`), rows
+    without one are created (`create_model`, then `build`). Returns the
+    (row, item) pairs, the (row, error) rejects, and the write capacity
+    units the items need. Arguments are pickled to worker processes, so
+    `build` must be a module-level function.
+    """
+    items = []
+    rejects = []
+    units = 0.0
+    for number, raw in rows:
+        try:
+            data = parse_row(export_format, header, raw)
+            if data.get('id'):
+                item = model.model_validate(data).model_dump()
+            else:
+                item = build(create_model.model_validate(data))
+                _stable_ids(item, f'{job}:{number}')
+        except ValidationError as e:
+            rejects.append((number, describe_errors(e)))
+            continue
+        except ValueError as e:
+            rejects.append((number, str(e)))
+            continue
+        items.append((number, item))
+        units += len(to_json(item)) // 1024 + 1
+    return items, rejects, units
+
+# ----- pipeline -----
+
+def _chunks(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+async def run_import(
+    spec: ImportSpec,
+    export_format: ExportFormat,
+    header: Optional[List[str]],
+    rows: Iterator[Row],
+    *,
+    job: str,
+    totals: ImportTotals,
+    executor: Optional[Executor] = None,
+    chunk_size: int = 500,
+    concurrency: int = 4,
+    limiter: Optional[CapacityLimiter] = None,
+    dry_run: bool = False,
+    on_commit: Optional[Callable[[List[Tuple[int, str, Any]], ImportTotals], None]] = None
+) -> ImportTotals:
+    """
+    Import `rows` into `spec`'s table; returns `totals`, updated
+
+    `executor` validates chunks (a process pool; None validates inline).
+    `on_commit(rejects, totals)` is called each time the committed prefix
+    grows, with its newly committed (row, error, raw) rejects, invalid and
+    unwritten rows alike. A failing write stops the import after the
+    chunks in flight settle, then re-raises; `totals.checkpoint` then
+    marks where to resume.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    finished: Dict[int, Tuple[int, int, List[Tuple[int, str, Any]]]] = {}
+    errors: List[Exception] = []
+    tasks: Set[asyncio.Task] = set()
+    next_commit = 0
+
+    async def process(index: int, chunk: List[Row]) -> None:
+        try:
+            arguments = (spec.create_model, spec.model, spec.build, job, export_format, header, chunk)
+            if executor is None:
+                items, rejects, units = validate_rows(*arguments)
+            else:
+                items, rejects, units = await loop.run_in_executor(executor, validate_rows, *arguments)
+            failed: Set[str] = set()
+            if items and not dry_run:
+                if limiter:
+                    await limiter.wait()
+                failed = await spec.write([item for _, item in items], [])
+                if limiter:
+                    limiter.spend(units)
+            raw = dict(chunk)
+            problems = [(number, error, raw[number]) for number, error in rejects]
+            problems += [(number, UNPROCESSED, raw[number]) for number, item in items if item['id'] in failed]
+            problems.sort(key=lambda problem: problem[0])
+            finished[index] = (chunk[-1][0], len(chunk), problems)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            slots.release()
+
+    def commit() -> None:
+        nonlocal next_commit
+        while next_commit in finished:
+            last_row, count, problems = finished.pop(next_commit)
+            next_commit += 1
+            unwritten = sum(1 for _, error, _ in problems if error == UNPROCESSED)
+            totals.read += count
+            totals.failed += unwritten
+            totals.rejected += len(problems) - unwritten
+            totals.imported += count - len(problems)
+            totals.checkpoint = last_row
+            if on_commit:
+                on_commit(problems, totals)
+
+    chunks = _chunks(rows, chunk_size)
+    try:
+        for index in itertools.count():
+            # Reading and parsing rows is blocking file work: keep it off the event loop
+            chunk = await run_sync(next, chunks, None)
+            if chunk is None:
+                break
+            await slots.acquire()
+            commit()
+            if errors:
+                slots.release()
+                break
+            task = asyncio.create_task(process(index, chunk))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        commit()
+    except BaseException:
+        # Reading failed or we were cancelled: stop the chunks in flight
+        for task in list(tasks):
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    if errors:
+        raise errors[0]
+    return totals
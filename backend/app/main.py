@@ -2,10 +2,37 @@
 NCC Server Management API - Main Application
 FastAPI backend for server, domain, and infrastructure management
 """
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import settings
-from app.routers import servers, domains, emails, repositories, storage
+from app.cache import entity_cache
+from app.cluster import cluster
+from app.compression import CompressionMiddleware
+from app.events import event_log
+from app.metrics import MetricsMiddleware, render as render_metrics
+from app.search import search_index
+from app.routers import servers, domains, emails, repositories, storage, summary, search, events, imports
+
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Join the cache server (CACHE_BACKEND=socket) and start building the
+    search index in the background (/search waits for it); stop import
+    workers and leave the cache server on shutdown
+    """
+    cluster.start()
+    search_index.start(search.REPOSITORIES)
+    yield
+    imports.shutdown_validation_pool()
+    cluster.stop()
 
 # Initialize FastAPI application
 app = FastAPI(
@@ -13,7 +40,8 @@ app = FastAPI(
     version=settings.VERSION,
     description="Backend API for NCC infrastructure management",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -23,14 +51,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
+# Brotli / gzip response bodies
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so the latency it records covers the whole stack
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(servers.router, prefix=settings.API_V1_PREFIX)
 app.include_router(domains.router, prefix=settings.API_V1_PREFIX)
 app.include_router(emails.router, prefix=settings.API_V1_PREFIX)
 app.include_router(repositories.router, prefix=settings.API_V1_PREFIX)
 app.include_router(storage.router, prefix=settings.API_V1_PREFIX)
+app.include_router(summary.router, prefix=settings.API_V1_PREFIX)
+app.include_router(search.router, prefix=settings.API_V1_PREFIX)
+app.include_router(events.router, prefix=settings.API_V1_PREFIX)
+app.include_router(imports.router, prefix=settings.API_V1_PREFIX)
 
 @app.get("/")
 async def root():
@@ -46,6 +85,29 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Entity cache hit/miss/eviction counters"""
+    # A plain def runs on a worker thread: in a cluster this waits on the cache server
+    return entity_cache.stats()
+
+@app.get("/search/stats")
+async def search_stats():
+    """Search index size"""
+    return search_index.stats()
+
+@app.get("/events/stats")
+async def event_stats():
+    """Change event log position and subscriber count"""
+    return event_log.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Request latency, DynamoDB calls and capacity per route, in the Prometheus text format"""
+    # A plain def, like cache_stats: collecting the other workers' metrics waits on the cache server
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
+    # Development server; run `python -m app.serve` in production
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,662 @@
+"""
+In-Memory DynamoDB Stand-in
+Implements the part of the boto3 DynamoDB resource API the repository
+layer uses: `Table(name)` with get/put/update/delete/query/scan, and
+`meta.client.batch_get_item` / `batch_write_item`. Tables are keyed like
+scripts/create_table.py creates them and keep the GSIs of
+app/db_helper.TABLE_INDEXES, so the query planner, expiry range queries
+and parallel scans run the same code paths as against DynamoDB.
+
+DynamoDB behaviour that the app relies on is kept: numbers come back as
+Decimal and floats are refused, pages stop at `Limit` items or 1 MB,
+indexes are sparse, conditional writes raise ConditionalCheckFailedException
+(with the old item when asked), and scans report consumed capacity.
+Select DB_BACKEND=memory to run the API without AWS; every call can also
+sleep a simulated round trip (MEMORY_LATENCY_MS) for benchmarks.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+import zlib
+from decimal import Decimal
+from enum import Enum
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from boto3.dynamodb.conditions import Attr, ConditionBase
+from botocore.exceptions import ClientError
+from app.db_helper import TABLE_INDEXES
+
+# (hash key, range key) of tables not keyed by `id` alone
+TABLE_KEYS: Dict[str, Tuple[str, Optional[str]]] = {
+    'NccDnsRecords': ('domainId', 'id'),
+}
+
+MAX_PAGE_BYTES = 1024 * 1024
+MAX_ITEM_BYTES = 400 * 1024
+
+PrimaryKey = Tuple[Any, ...]
+
+def _error(code: str, message: str, operation: str, **response) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}, **response}, operation)
+
+def _stored(value: Any) -> Any:
+    """A value as DynamoDB keeps it: numbers as Decimal, enums as their value, containers copied"""
+    if isinstance(value, Enum):
+        return _stored(value.value)
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        return {k: _stored(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_stored(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {_stored(v) for v in value}
+    raise TypeError(f"Unsupported type {type(value).__name__} for value {value!r}")
+
+def _copy(value: Any) -> Any:
+    """Copy of a stored value, so callers never share our containers"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+def _size(value: Any) -> int:
+    """Approximate DynamoDB item size in bytes"""
+    if isinstance(value, dict):
+        return 3 + sum(len(k) + _size(v) for k, v in value.items())
+    if isinstance(value, (list, set)):
+        return 3 + sum(_size(v) + 1 for v in value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, Decimal):
+        return len(str(value)) // 2 + 2
+    if isinstance(value, bytes):
+        return len(value)
+    return 1
+
+def _read_units(size: int) -> float:
+    """Eventually consistent read: half a unit per 4 KB"""
+    return math.ceil(size / 4096) / 2
+
+def _write_units(size: int) -> float:
+    """A unit per 1 KB of the larger of the old and new item, at least one"""
+    return max(math.ceil(size / 1024), 1)
+
+# ----- expressions -----
+
+def _resolve(path: str, names: Optional[Dict[str, str]]) -> List[str]:
+    """`#a.b` with ExpressionAttributeNames applied, split into parts"""
+    return [(names or {}).get(part, part) for part in path.split('.')]
+
+def _lookup(item: Dict[str, Any], parts: List[str]) -> Any:
+    value: Any = item
+    for part in parts:
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def _comparable(a: Any, b: Any) -> bool:
+    return a is not None and b is not None and (
+        type(a) is type(b) or (isinstance(a, Decimal) and isinstance(b, Decimal))
+    )
+
+def evaluate(condition: ConditionBase, item: Dict[str, Any]) -> bool:
+    """Evaluate a boto3 condition (Attr / Key, possibly combined) against an item"""
+    expression = condition.get_expression()
+    operator = expression['operator']
+    values = expression['values']
+    if operator == 'AND':
+        return evaluate(values[0], item) and evaluate(values[1], item)
+    if operator == 'OR':
+        return evaluate(values[0], item) or evaluate(values[1], item)
+    if operator == 'NOT':
+        return not evaluate(values[0], item)
+    current = _lookup(item, values[0].name.split('.'))
+    operands = [_stored(value) for value in values[1:]]
+    if operator == 'attribute_exists':
+        return current is not None
+    if operator == 'attribute_not_exists':
+        return current is None
+    if operator == 'begins_with':
+        return isinstance(current, str) and current.startswith(operands[0])
+    if operator == 'contains':
+        return isinstance(current, (str, list, set)) and operands[0] in current
+    if operator == 'IN':
+        return current in operands[0]
+    if operator == 'BETWEEN':
+        return _comparable(current, operands[0]) and operands[0] <= current <= operands[1]
+    if operator == '<>':
+        return current != operands[0]
+    if not _comparable(current, operands[0]):
+        return False
+    return {
+        '=': current == operands[0],
+        '<': current < operands[0],
+        '<=': current <= operands[0],
+        '>': current > operands[0],
+        '>=': current >= operands[0],
+    }[operator]
+
+_TOKEN = re.compile(r'\s*(<>|<=|>=|[=<>(),]|[#:]?[A-Za-z_][\w.#:]*)')
+
+class _ConditionParser:
+    """Parses condition strings (`attribute_exists(#id) AND #v = :v`) into boto3 conditions"""
+
+    FUNCTIONS = {
+        'attribute_exists': lambda attr: attr.exists(),
+        'attribute_not_exists': lambda attr: attr.not_exists(),
+        'begins_with': lambda attr, value: attr.begins_with(value),
+        'contains': lambda attr, value: attr.contains(value),
+    }
+    COMPARISONS = {'=': 'eq', '<>': 'ne', '<': 'lt', '<=': 'lte', '>': 'gt', '>=': 'gte'}
+
+    def __init__(self, text: str, names: Optional[Dict[str, str]], values: Optional[Dict[str, Any]]):
+        self.tokens = _TOKEN.findall(text)
+        if ''.join(self.tokens) != re.sub(r'\s+', '', text):
+            raise ValueError(f"Cannot parse expression: {text}")
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def parse(self) -> ConditionBase:
+        condition = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position]!r} in expression")
+        return condition
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self, expected: Optional[str] = None) -> str:
+        token = self._peek()
+        if token is None or (expected and token.upper() != expected):
+            raise ValueError(f"Expected {expected or 'more'} in expression, got {token!r}")
+        self.position += 1
+        return token
+
+    def _or(self) -> ConditionBase:
+        condition = self._and()
+        while (self._peek() or '').upper() == 'OR':
+            self._take()
+            condition = condition | self._and()
+        return condition
+
+    def _and(self) -> ConditionBase:
+        condition = self._not()
+        while (self._peek() or '').upper() == 'AND':
+            self._take()
+            condition = condition & self._not()
+        return condition
+
+    def _not(self) -> ConditionBase:
+        if (self._peek() or '').upper() == 'NOT':
+            self._take()
+            return ~self._not()
+        return self._primary()
+
+    def _attr(self) -> Attr:
+        return Attr('.'.join(_resolve(self._take(), self.names)))
+
+    def _value(self) -> Any:
+        token = self._take()
+        if token not in self.values:
+            raise ValueError(f"Undefined value {token} in expression")
+        return self.values[token]
+
+    def _primary(self) -> ConditionBase:
+        if self._peek() == '(':
+            self._take()
+            condition = self._or()
+            self._take(')')
+            return condition
+        if self._peek() in self.FUNCTIONS and self.tokens[self.position + 1:self.position + 2] == ['(']:
+            function = self.FUNCTIONS[self._take()]
+            self._take('(')
+            arguments = [self._attr()]
+            while self._peek() == ',':
+                self._take()
+                arguments.append(self._value())
+            self._take(')')
+            return function(*arguments)
+        attr = self._attr()
+        operator = self._take().upper()
+        if operator == 'BETWEEN':
+            low = self._value()
+            self._take('AND')
+            return attr.between(low, self._value())
+        if operator == 'IN':
+            self._take('(')
+            options = [self._value()]
+            while self._peek() == ',':
+                self._take()
+                options.append(self._value())
+            self._take(')')
+            return attr.is_in(options)
+        if operator not in self.COMPARISONS:
+            raise ValueError(f"Unsupported operator {operator} in expression")
+        return getattr(attr, self.COMPARISONS[operator])(self._value())
+
+def parse_condition(expression: Any, names: Optional[Dict[str, str]] = None, values: Optional[Dict[str, Any]] = None) -> Optional[ConditionBase]:
+    """A condition given as a boto3 condition object or an expression string"""
+    if expression is None or isinstance(expression, ConditionBase):
+        return expression
+    return _ConditionParser(expression, names, values).parse()
+
+_UPDATE_ACTION = re.compile(r'\b(SET|REMOVE|ADD|DELETE)\b', re.IGNORECASE)
+
+def apply_update(item: Dict[str, Any], expression: str, names: Optional[Dict[str, str]], values: Optional[Dict[str, Any]]) -> None:
+    """Apply an UpdateExpression (`SET #a = :a REMOVE #b ADD #n :one`) to an item, in place"""
+    values = values or {}
+    parts = _UPDATE_ACTION.split(expression)
+    if parts[0].strip():
+        raise ValueError(f"Invalid UpdateExpression: {expression}")
+    for action, clauses in zip(parts[1::2], parts[2::2]):
+        for clause in filter(None, (clause.strip() for clause in clauses.split(','))):
+            action = action.upper()
+            if action == 'SET':
+                path, _, value = (part.strip() for part in clause.partition('='))
+                if value not in values:
+                    raise ValueError(f"Unsupported SET clause: {clause}")
+                *parents, leaf = _resolve(path, names)
+                target = item
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = _stored(values[value])
+            elif action == 'REMOVE':
+                *parents, leaf = _resolve(clause, names)
+                parent = _lookup(item, parents) if parents else item
+                if isinstance(parent, dict):
+                    parent.pop(leaf, None)
+            else:
+                path, value = clause.split()
+                name = names.get(path, path) if names else path
+                operand = _stored(values[value])
+                current = item.get(name)
+                if action == 'ADD':
+                    item[name] = (current or set()) | operand if isinstance(operand, set) else (current or 0) + operand
+                elif isinstance(current, set):
+                    item[name] = current - operand
+
+def _project(item: Dict[str, Any], projection: Optional[str], names: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    if not projection:
+        return _copy(item)
+    attributes = [_resolve(path.strip(), names)[0] for path in projection.split(',')]
+    return {name: _copy(item[name]) for name in attributes if name in item}
+
+# ----- tables -----
+
+class _Partitions:
+    """
+    One index's items grouped by hash key, each group kept sorted by
+    (range key, primary key); groups are re-sorted lazily after writes
+    """
+
+    def __init__(self, hash_key: str, range_key: Optional[str]):
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.members: Dict[Any, Dict[PrimaryKey, Any]] = {}
+        self._sorted: Dict[Any, List[Tuple[Any, PrimaryKey]]] = {}
+
+    def entry(self, item: Optional[Dict[str, Any]]) -> Optional[Tuple[Any, Any]]:
+        """(hash value, range value) of an item, None if it is not in the (sparse) index"""
+        if item is None or item.get(self.hash_key) is None:
+            return None
+        if self.range_key is None:
+            return item[self.hash_key], ''
+        if item.get(self.range_key) is None:
+            return None
+        return item[self.hash_key], item[self.range_key]
+
+    def move(self, key: PrimaryKey, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        before, after = self.entry(old), self.entry(new)
+        if before == after:
+            return
+        if before is not None:
+            group = self.members[before[0]]
+            del group[key]
+            if not group:
+                del self.members[before[0]]
+            self._sorted.pop(before[0], None)
+        if after is not None:
+            self.members.setdefault(after[0], {})[key] = after[1]
+            self._sorted.pop(after[0], None)
+
+    def ordered(self, hash_value: Any) -> List[Tuple[Any, PrimaryKey]]:
+        if hash_value not in self._sorted:
+            group = self.members.get(hash_value, {})
+            self._sorted[hash_value] = sorted((sort, key) for key, sort in group.items())
+        return self._sorted[hash_value]
+
+class MemoryTable:
+    """One table: items by primary key, its GSIs, and the boto3 Table methods the app calls"""
+
+    def __init__(self, resource: 'MemoryDynamoDB', name: str):
+        self.resource = resource
+        self.name = name
+        self.table_name = name
+        self.meta = SimpleNamespace(client=resource.client)
+        self.hash_key, self.range_key = TABLE_KEYS.get(name, ('id', None))
+        self.key_names = [self.hash_key] + ([self.range_key] if self.range_key else [])
+        self.items: Dict[PrimaryKey, Dict[str, Any]] = {}
+        self.sizes: Dict[PrimaryKey, int] = {}
+        self.indexes: Dict[str, _Partitions] = {
+            index.name: _Partitions(index.hash_key, index.range_key) for index in TABLE_INDEXES.get(name, [])
+        }
+        if self.range_key:
+            # The table itself, for queries on the hash key
+            self.indexes[''] = _Partitions(self.hash_key, self.range_key)
+        self._segments: Dict[Tuple[int, int], List[PrimaryKey]] = {}
+        self._lock = threading.RLock()
+
+    # -- helpers --
+
+    def _key(self, key: Dict[str, Any], operation: str) -> PrimaryKey:
+        if set(key) != set(self.key_names) or any(not isinstance(key[name], str) or not key[name] for name in self.key_names):
+            raise _error('ValidationException', "The provided key element does not match the schema", operation)
+        return tuple(key[name] for name in self.key_names)
+
+    def _item_key(self, item: Dict[str, Any], operation: str) -> PrimaryKey:
+        return self._key({name: item.get(name) for name in self.key_names}, operation)
+
+    def key_of(self, key: PrimaryKey) -> Dict[str, Any]:
+        return dict(zip(self.key_names, key))
+
+    def _store(self, key: PrimaryKey, item: Optional[Dict[str, Any]], operation: str) -> float:
+        """Replace (or with None, delete) the item at `key`, keeping the indexes in step; returns the write units"""
+        old = self.items.get(key)
+        old_size = self.sizes.get(key, 0)
+        if item is not None:
+            size = _size(item)
+            if size > MAX_ITEM_BYTES:
+                raise _error('ValidationException', "Item size has exceeded the maximum allowed size", operation)
+            for partitions in self.indexes.values():
+                for name in filter(None, (partitions.hash_key, partitions.range_key)):
+                    if item.get(name) == '':
+                        raise _error('ValidationException', f"Empty string for index key attribute {name}", operation)
+            self.items[key] = item
+            self.sizes[key] = size
+        else:
+            self.items.pop(key, None)
+            self.sizes.pop(key, None)
+        if (old is None) != (item is None):
+            self._segments.clear()
+        for partitions in self.indexes.values():
+            partitions.move(key, old, item)
+        return _write_units(max(old_size, self.sizes.get(key, 0)))
+
+    def _check(self, condition: Any, names, values, current: Optional[Dict[str, Any]], operation: str, return_old: Optional[str]) -> None:
+        condition = parse_condition(condition, names, values)
+        if condition is not None and not evaluate(condition, current or {}):
+            extra = {'Item': _copy(current)} if return_old == 'ALL_OLD' and current is not None else {}
+            raise _error('ConditionalCheckFailedException', "The conditional request failed", operation, **extra)
+
+    @staticmethod
+    def _returned(mode: Optional[str], old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        image = old if mode == 'ALL_OLD' else new if mode == 'ALL_NEW' else None
+        return {'Attributes': _copy(image)} if image is not None else {}
+
+    def _consumed(self, kwargs: Dict[str, Any], units: float) -> Dict[str, Any]:
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            return {'ConsumedCapacity': {'TableName': self.name, 'CapacityUnits': units}}
+        return {}
+
+    def _segment(self, segment: int, total: int) -> List[PrimaryKey]:
+        # DynamoDB splits a scan by key hash; crc32 of the hash key stands in for it
+        if (segment, total) not in self._segments:
+            keys = sorted(self.items)
+            self._segments[(segment, total)] = (
+                keys if total == 1 else [key for key in keys if zlib.crc32(str(key[0]).encode()) % total == segment]
+            )
+        return self._segments[(segment, total)]
+
+    def _page(self, keys: List[PrimaryKey], start: int, limit: Optional[int]) -> Tuple[List[PrimaryKey], bool, int]:
+        """Keys of the page from `start` (up to `limit` items or 1 MB), whether more follow, and the bytes read"""
+        page, read = [], 0
+        for position in range(start, len(keys)):
+            if (limit and len(page) >= limit) or read >= MAX_PAGE_BYTES:
+                return page, True, read
+            page.append(keys[position])
+            read += self.sizes[keys[position]]
+        return page, False, read
+
+    def _result(self, keys: List[PrimaryKey], more: bool, read: int, last_key: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """The response for a page: filtered, projected, with LastEvaluatedKey and consumed capacity"""
+        names = kwargs.get('ExpressionAttributeNames')
+        condition = parse_condition(kwargs.get('FilterExpression'), names, kwargs.get('ExpressionAttributeValues'))
+        items = [self.items[key] for key in keys]
+        matched = [item for item in items if condition is None or evaluate(condition, item)]
+        response: Dict[str, Any] = {
+            'Items': [_project(item, kwargs.get('ProjectionExpression'), names) for item in matched],
+            'Count': len(matched),
+            'ScannedCount': len(items),
+        }
+        if more and last_key is not None:
+            response['LastEvaluatedKey'] = last_key
+        response.update(self._consumed(kwargs, _read_units(read)))
+        return response
+
+    # -- boto3 Table API --
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self.resource.sleep()
+        with self._lock:
+            key = self._key(Key, 'GetItem')
+            item = self.items.get(key)
+            consumed = self._consumed(kwargs, _read_units(max(self.sizes.get(key, 0), 1)))
+            if item is None:
+                return consumed
+            return {'Item': _project(item, kwargs.get('ProjectionExpression'), kwargs.get('ExpressionAttributeNames')), **consumed}
+
+    def put_item(self, Item: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self.resource.sleep()
+        item = _stored(Item)
+        with self._lock:
+            key = self._item_key(item, 'PutItem')
+            old = self.items.get(key)
+            self._check(kwargs.get('ConditionExpression'), kwargs.get('ExpressionAttributeNames'),
+                        kwargs.get('ExpressionAttributeValues'), old, 'PutItem', kwargs.get('ReturnValuesOnConditionCheckFailure'))
+            units = self._store(key, item, 'PutItem')
+            return {**self._returned(kwargs.get('ReturnValues'), old, None), **self._consumed(kwargs, units)}
+
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str, **kwargs) -> Dict[str, Any]:
+        self.resource.sleep()
+        names = kwargs.get('ExpressionAttributeNames')
+        values = kwargs.get('ExpressionAttributeValues')
+        with self._lock:
+            key = self._key(Key, 'UpdateItem')
+            old = self.items.get(key)
+            self._check(kwargs.get('ConditionExpression'), names, values, old, 'UpdateItem',
+                        kwargs.get('ReturnValuesOnConditionCheckFailure'))
+            new = _copy(old) if old is not None else _stored(Key)
+            try:
+                apply_update(new, UpdateExpression, names, values)
+            except (ValueError, KeyError, TypeError) as e:
+                raise _error('ValidationException', str(e), 'UpdateItem')
+            units = self._store(key, new, 'UpdateItem')
+            return {**self._returned(kwargs.get('ReturnValues'), old, new), **self._consumed(kwargs, units)}
+
+    def delete_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self.resource.sleep()
+        with self._lock:
+            key = self._key(Key, 'DeleteItem')
+            old = self.items.get(key)
+            self._check(kwargs.get('ConditionExpression'), kwargs.get('ExpressionAttributeNames'),
+                        kwargs.get('ExpressionAttributeValues'), old, 'DeleteItem', kwargs.get('ReturnValuesOnConditionCheckFailure'))
+            units = self._store(key, None, 'DeleteItem') if old is not None else _write_units(0)
+            return {**self._returned(kwargs.get('ReturnValues'), old, None), **self._consumed(kwargs, units)}
+
+    def scan(self, Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+             Segment: int = 0, TotalSegments: int = 1, **kwargs) -> Dict[str, Any]:
+        self.resource.sleep()
+        with self._lock:
+            keys = self._segment(Segment, TotalSegments)
+            start = bisect.bisect_right(keys, self._key(ExclusiveStartKey, 'Scan')) if ExclusiveStartKey else 0
+            page, more, read = self._page(keys, start, Limit)
+            return self._result(page, more, read, self.key_of(page[-1]) if page else None, kwargs)
+
+    def query(self, KeyConditionExpression: Any, IndexName: Optional[str] = None, Limit: Optional[int] = None,
+              ExclusiveStartKey: Optional[Dict[str, Any]] = None, ScanIndexForward: bool = True, **kwargs) -> Dict[str, Any]:
+        self.resource.sleep()
+        condition = parse_condition(KeyConditionExpression, kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues'))
+        with self._lock:
+            if IndexName is None and not self.range_key:
+                # Hash-only table: a query is a get
+                key = (self._hash_value(condition, self.hash_key),)
+                page, _, read = self._page([key] if key in self.items else [], 0, Limit)
+                return self._result(page, False, read, None, kwargs)
+            partitions = self.indexes.get(IndexName or '')
+            if partitions is None:
+                raise _error('ValidationException', f"The table does not have the specified index: {IndexName}", 'Query')
+            hash_value = self._hash_value(condition, partitions.hash_key)
+            entries = partitions.ordered(hash_value)
+            if partitions.range_key:
+                entries = self._range_slice(entries, condition, partitions.range_key)
+            if ExclusiveStartKey:
+                start = (ExclusiveStartKey.get(partitions.range_key, '') if partitions.range_key else '',
+                         self._item_key(ExclusiveStartKey, 'Query'))
+                if ScanIndexForward:
+                    entries = entries[bisect.bisect_right(entries, start):]
+                else:
+                    entries = entries[:bisect.bisect_left(entries, start)]
+            keys = [key for _, key in (entries if ScanIndexForward else reversed(entries))]
+            page, more, read = self._page(keys, 0, Limit)
+            last_key = None
+            if page:
+                item = self.items[page[-1]]
+                index_keys = filter(None, (partitions.hash_key, partitions.range_key))
+                last_key = {**self.key_of(page[-1]), **{name: item[name] for name in index_keys}}
+            return self._result(page, more, read, last_key, kwargs)
+
+    @staticmethod
+    def _range_slice(entries: List[Tuple[Any, PrimaryKey]], condition: ConditionBase, range_key: str) -> List[Tuple[Any, PrimaryKey]]:
+        """The (sorted) entries whose range key satisfies the key condition, found by bisection"""
+        expression = condition.get_expression()
+        parts = expression['values'] if expression['operator'] == 'AND' else [condition]
+        for part in parts:
+            expression = part.get_expression()
+            if expression['values'][0].name != range_key:
+                continue
+            operator = expression['operator']
+            values = [_stored(value) for value in expression['values'][1:]]
+
+            def left(value):
+                return bisect.bisect_left(entries, value, key=lambda entry: entry[0])
+
+            def right(value):
+                return bisect.bisect_right(entries, value, key=lambda entry: entry[0])
+            bounds = {
+                '=': lambda: (left(values[0]), right(values[0])),
+                '<': lambda: (0, left(values[0])),
+                '<=': lambda: (0, right(values[0])),
+                '>': lambda: (right(values[0]), len(entries)),
+                '>=': lambda: (left(values[0]), len(entries)),
+                'BETWEEN': lambda: (left(values[0]), right(values[1])),
+            }.get(operator)
+            if bounds is None:  # begins_with
+                return [entry for entry in entries if evaluate(part, {range_key: entry[0]})]
+            low, high = bounds()
+            return entries[low:high]
+        return entries
+
+    @staticmethod
+    def _hash_value(condition: ConditionBase, hash_key: str) -> Any:
+        """The value a key condition requires of `hash_key`"""
+        expression = condition.get_expression()
+        if expression['operator'] == 'AND':
+            for part in expression['values']:
+                try:
+                    return MemoryTable._hash_value(part, hash_key)
+                except ClientError:
+                    continue
+        elif expression['operator'] == '=' and expression['values'][0].name == hash_key:
+            return _stored(expression['values'][1])
+        raise _error('ValidationException', f"Query condition missed key schema element: {hash_key}", 'Query')
+
+class MemoryClient:
+    """The batch operations of the low-level client (on resource-style items)"""
+
+    def __init__(self, resource: 'MemoryDynamoDB'):
+        self.resource = resource
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        if sum(len(request['Keys']) for request in RequestItems.values()) > 100:
+            raise _error('ValidationException', "Too many items requested for the BatchGetItem call", 'BatchGetItem')
+        self.resource.sleep()
+        responses, consumed = {}, []
+        for name, request in RequestItems.items():
+            table = self.resource.Table(name)
+            with table._lock:
+                keys = [table._key(key, 'BatchGetItem') for key in request['Keys']]
+                responses[name] = [
+                    _project(table.items[key], request.get('ProjectionExpression'), request.get('ExpressionAttributeNames'))
+                    for key in keys if key in table.items
+                ]
+                units = sum(_read_units(max(table.sizes.get(key, 0), 1)) for key in keys)
+            consumed.append(table._consumed(kwargs, units).get('ConsumedCapacity'))
+        return {'Responses': responses, 'UnprocessedKeys': {}, **self._consumed(consumed)}
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]], **kwargs) -> Dict[str, Any]:
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise _error('ValidationException', "Too many items requested for the BatchWriteItem call", 'BatchWriteItem')
+        self.resource.sleep()
+        consumed = []
+        for name, requests in RequestItems.items():
+            table = self.resource.Table(name)
+            units = 0
+            with table._lock:
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = _stored(request['PutRequest']['Item'])
+                        units += table._store(table._item_key(item, 'BatchWriteItem'), item, 'BatchWriteItem')
+                    else:
+                        units += table._store(table._key(request['DeleteRequest']['Key'], 'BatchWriteItem'), None, 'BatchWriteItem')
+            consumed.append(table._consumed(kwargs, units).get('ConsumedCapacity'))
+        return {'UnprocessedItems': {}, **self._consumed(consumed)}
+
+    @staticmethod
+    def _consumed(entries: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Per-table ConsumedCapacity, when it was asked for"""
+        entries = [entry for entry in entries if entry]
+        return {'ConsumedCapacity': entries} if entries else {}
+
+class MemoryDynamoDB:
+    """Stand-in for `boto3.resource('dynamodb')`; tables exist as soon as they are named"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.client = MemoryClient(self)
+        self.meta = SimpleNamespace(client=self.client)
+        self._tables: Dict[str, MemoryTable] = {}
+        self._lock = threading.Lock()
+
+    def sleep(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def Table(self, name: str) -> MemoryTable:
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = MemoryTable(self, name)
+            return self._tables[name]
+
+    def clear(self) -> None:
+        """Empty every table"""
+        with self._lock:
+            tables = list(self._tables.values())
+        for table in tables:
+            with table._lock:
+                table.items.clear()
+                table.sizes.clear()
+                table._segments.clear()
+                for name, partitions in table.indexes.items():
+                    table.indexes[name] = _Partitions(partitions.hash_key, partitions.range_key)
@@ -0,0 +1,337 @@
+"""
+Prometheus Metrics
+Per-route request latency plus what each route costs in DynamoDB: calls,
+consumed capacity, items scanned versus returned, and entity cache hits.
+Rendered in the Prometheus text format at GET /metrics.
+
+The middleware gives every request a RequestStats (through a context
+variable, so the data layer needs no request object). DynamoDB calls and
+cache lookups add to it, and it is flushed into the shared metrics under
+the request's route template (`/api/v1/domains/{domain_id}`, so label
+cardinality stays bounded) when the response ends. Work outside any
+request (the search index build at startup) is recorded as `background`;
+work a request starts but that outlives it (a task it spawned) is still
+charged to its route.
+
+In a worker cluster each worker reports its metrics to the cache server
+every CACHE_REPORT_SECONDS, and whichever worker is scraped adds the
+others' latest reports to its own, so one scrape covers every worker.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.cluster import ClusterError, cluster
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if value == int(value) else repr(value)
+
+class Metric(ABC):
+    """A named family of label sets; subclasses store the values"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_text(self, values: LabelValues, extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    @abstractmethod
+    def state(self) -> Dict[LabelValues, Any]:
+        """A copy of the values, by label set"""
+
+    @staticmethod
+    @abstractmethod
+    def merge(states: Iterable[Dict[LabelValues, Any]]) -> Dict[LabelValues, Any]:
+        """Sum the states of several processes"""
+
+    @abstractmethod
+    def samples(self, state: Dict[LabelValues, Any]) -> List[str]:
+        """Sample lines in the text format, for a state"""
+
+    def render(self, others: Sequence[Dict[LabelValues, Any]] = ()) -> List[str]:
+        """This metric's lines, summed with `others` (states of other processes)"""
+        state = self.merge([self.state(), *others]) if others else self.state()
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}'] + self.samples(state)
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def state(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(states: Iterable[Dict[LabelValues, float]]) -> Dict[LabelValues, float]:
+        total: Dict[LabelValues, float] = {}
+        for state in states:
+            for labels, value in state.items():
+                total[labels] = total.get(labels, 0) + value
+        return total
+
+    def samples(self, state: Dict[LabelValues, float]) -> List[str]:
+        return [f'{self.name}{self._label_text(labels)} {_format(value)}' for labels, value in sorted(state.items())]
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float]):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * len(self.buckets)
+                self._sums[labels] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[labels] += value
+
+    def state(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        with self._lock:
+            return {labels: (list(counts), self._sums[labels]) for labels, counts in self._counts.items()}
+
+    @staticmethod
+    def merge(states: Iterable[Dict[LabelValues, Tuple[List[int], float]]]) -> Dict[LabelValues, Tuple[List[int], float]]:
+        total: Dict[LabelValues, Tuple[List[int], float]] = {}
+        for state in states:
+            for labels, (counts, value) in state.items():
+                if labels in total:
+                    merged, merged_sum = total[labels]
+                    total[labels] = ([a + b for a, b in zip(merged, counts)], merged_sum + value)
+                else:
+                    total[labels] = (list(counts), value)
+        return total
+
+    def samples(self, state: Dict[LabelValues, Tuple[List[int], float]]) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(state.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _format(bound) + '"'
+                lines.append(f'{self.name}_bucket{self._label_text(labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._label_text(labels)} {_format(total)}')
+            lines.append(f'{self.name}_count{self._label_text(labels)} {cumulative}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def add(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Every metric's state, by name"""
+        return {metric.name: metric.state() for metric in self.metrics}
+
+    def render(self, others: Sequence[Dict[str, Dict[LabelValues, Any]]] = ()) -> str:
+        """Every metric in the Prometheus text exposition format (0.0.4), summed with `others` (snapshots)"""
+        return '\n'.join(
+            line for metric in self.metrics
+            for line in metric.render([snapshot[metric.name] for snapshot in others if metric.name in snapshot])
+        ) + '\n'
+
+registry = Registry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+http_requests = registry.add(Counter(
+    'ncc_http_requests_total', "HTTP requests by route and status", ('method', 'route', 'status')))
+http_duration = registry.add(Histogram(
+    'ncc_http_request_duration_seconds', "Time to the end of the response body", ('method', 'route'), LATENCY_BUCKETS))
+request_calls = registry.add(Histogram(
+    'ncc_dynamodb_calls_per_request', "DynamoDB calls made by one request", ('method', 'route'), COUNT_BUCKETS))
+dynamodb_calls = registry.add(Counter(
+    'ncc_dynamodb_calls_total', "DynamoDB calls", ('route', 'table', 'operation')))
+dynamodb_errors = registry.add(Counter(
+    'ncc_dynamodb_errors_total', "DynamoDB calls that raised, by error code", ('route', 'table', 'operation', 'code')))
+dynamodb_duration = registry.add(Histogram(
+    'ncc_dynamodb_call_duration_seconds', "DynamoDB call time, thread pool wait included", ('table', 'operation'), CALL_BUCKETS))
+consumed_capacity = registry.add(Counter(
+    'ncc_dynamodb_consumed_capacity_units_total', "Capacity units DynamoDB reported consumed", ('route', 'table', 'capacity')))
+items_scanned = registry.add(Counter(
+    'ncc_dynamodb_items_scanned_total', "Items read by queries and scans, before filters", ('route', 'table', 'operation')))
+items_returned = registry.add(Counter(
+    'ncc_dynamodb_items_returned_total', "Items queries and scans returned, after filters", ('route', 'table', 'operation')))
+cache_lookups = registry.add(Counter(
+    'ncc_cache_lookups_total', "Entity cache lookups", ('route', 'result')))
+
+READ_OPERATIONS = {'get_item', 'batch_get_item', 'query', 'scan'}
+
+class RequestStats:
+    """What one request (or background job) has spent, flushed under its route"""
+
+    def __init__(self, route: Optional[str] = None):
+        self.route = route  # set when the request ends
+        # (table, operation) -> [calls, capacity units, scanned, returned]
+        self.calls: Dict[Tuple[str, str], List[float]] = {}
+        self.errors: Dict[Tuple[str, str, str], int] = {}
+        self.cache = [0, 0]  # hits, misses
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return self.route is not None
+
+    def call_count(self) -> int:
+        return int(sum(totals[0] for totals in self.calls.values())) + sum(self.errors.values())
+
+    def add_call(self, table: str, operation: str, units: float, scanned: int, returned: int) -> None:
+        with self._lock:
+            totals = self.calls.setdefault((table, operation), [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += units
+            totals[2] += scanned
+            totals[3] += returned
+        if self.closed:
+            self.flush()
+
+    def add_error(self, table: str, operation: str, code: str) -> None:
+        with self._lock:
+            self.errors[(table, operation, code)] = self.errors.get((table, operation, code), 0) + 1
+        if self.closed:
+            self.flush()
+
+    def add_cache_lookup(self, hit: bool) -> None:
+        with self._lock:
+            self.cache[0 if hit else 1] += 1
+        if self.closed:
+            self.flush()
+
+    def close(self, route: str) -> None:
+        self.route = route
+        self.flush()
+
+    def flush(self) -> None:
+        """Move what has accumulated into the shared metrics"""
+        with self._lock:
+            calls, self.calls = self.calls, {}
+            errors, self.errors = self.errors, {}
+            hits, misses = self.cache
+            self.cache = [0, 0]
+        route = self.route
+        for (table, operation), (count, units, scanned, returned) in calls.items():
+            dynamodb_calls.inc((route, table, operation), count)
+            if units:
+                kind = 'read' if operation in READ_OPERATIONS else 'write'
+                consumed_capacity.inc((route, table, kind), units)
+            if operation in ('query', 'scan'):
+                items_scanned.inc((route, table, operation), scanned)
+                items_returned.inc((route, table, operation), returned)
+        for (table, operation, code), count in errors.items():
+            dynamodb_errors.inc((route, table, operation, code), count)
+        if hits:
+            cache_lookups.inc((route, 'hit'), hits)
+        if misses:
+            cache_lookups.inc((route, 'miss'), misses)
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+_background = RequestStats('background')
+
+def current_stats() -> RequestStats:
+    return _current.get() or _background
+
+def _units(consumed: Any, table: str) -> float:
+    """Capacity units of one table in a ConsumedCapacity entry (a list for batch calls)"""
+    if isinstance(consumed, list):
+        return sum(entry.get('CapacityUnits', 0) for entry in consumed if entry.get('TableName', table) == table)
+    return (consumed or {}).get('CapacityUnits', 0)
+
+def record_dynamodb_call(table: str, operation: str, response: Dict[str, Any], seconds: float) -> None:
+    """Count a successful call, with the capacity and item counts from its response"""
+    dynamodb_duration.observe((table, operation), seconds)
+    current_stats().add_call(
+        table, operation,
+        float(_units(response.get('ConsumedCapacity'), table)),
+        response.get('ScannedCount', 0),
+        response.get('Count', 0)
+    )
+
+def record_dynamodb_error(table: str, operation: str, code: str, seconds: float) -> None:
+    dynamodb_duration.observe((table, operation), seconds)
+    current_stats().add_error(table, operation, code)
+
+def record_cache_lookup(hit: bool) -> None:
+    current_stats().add_cache_lookup(hit)
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request and flushing its RequestStats under the matched route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            route = scope.get('route')
+            template = getattr(route, 'path', None) or 'unmatched'
+            method = scope['method']
+            http_requests.inc((method, template, str(status)))
+            http_duration.observe((method, template), time.perf_counter() - started)
+            request_calls.observe((method, template), stats.call_count())
+            stats.close(template)
+
+cluster.report('metrics', registry.snapshot)
+
+def render() -> str:
+    """This process's metrics, plus the latest report of every other worker in a cluster"""
+    others = []
+    if cluster.connected:
+        try:
+            others = [snapshot for worker, snapshot in cluster.collect('metrics').items() if worker != cluster.worker]
+        except ClusterError:
+            pass
+    return registry.render(others)
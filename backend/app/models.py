@@ -2,9 +2,89 @@
 Pydantic Models for Server and Domain Management
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, Generic, List, Optional, TypeVar, Union
 from enum import Enum
 
+T = TypeVar('T')
+
+class Page(BaseModel, Generic[T]):
+    """One page of a list response"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+class BatchGetRequest(BaseModel):
+    """IDs to fetch in one call"""
+    ids: List[str]
+
+class BatchGetResult(BaseModel, Generic[T]):
+    """Items found, in request order, plus the IDs that do not exist"""
+    items: List[T]
+    missing: List[str] = []
+
+class BulkRequest(BaseModel):
+    """Mixed bulk write; rows are validated one by one so a bad row fails alone"""
+    create: List[Dict[str, Any]] = []
+    replace: List[Dict[str, Any]] = []
+    delete: List[str] = []
+
+class BulkItemResult(BaseModel):
+    """Outcome of one row of a bulk write"""
+    op: str  # create, replace, delete
+    index: int  # position within its op array
+    id: Optional[str] = None
+    status: str  # ok, invalid, failed
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    """Per-item outcome of a bulk write"""
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+class ResourceSummary(BaseModel):
+    """Precomputed counters for one resource"""
+    total: int = 0
+    counts: Dict[str, Dict[str, int]] = {}  # attribute -> value -> number of items
+    sums: Dict[str, Union[int, float]] = {}  # attribute -> total across items
+
+class SearchHit(BaseModel):
+    """One ranked search match; fetch the full item from its resource"""
+    resource: str  # servers, domains, emails, repositories, storage
+    id: str
+    title: str
+    subtitle: Optional[str] = None
+    score: float
+
+class SearchResult(BaseModel):
+    """Top matches plus how many items matched in total"""
+    items: List[SearchHit]
+    total: int
+
+class ExportFormat(str, Enum):
+    """Export file format"""
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+class SortDirection(str, Enum):
+    """List sort direction"""
+    asc = 'asc'
+    desc = 'desc'
+
+class ImportReject(BaseModel):
+    """An import row that was not written"""
+    row: int  # 1-based data row (CSV header excluded)
+    error: str
+
+class ImportResult(BaseModel):
+    """Outcome of an import; resume with the same `job` and skip=`checkpoint`"""
+    job: str
+    read: int
+    imported: int
+    rejected: int  # failed validation
+    failed: int  # valid but unwritten after retries
+    checkpoint: int  # last row of the committed prefix
+    rejects: List[ImportReject] = []  # the first ones only
+
 class ServerStatus(str, Enum):
     """Server operational status"""
     online = 'online'
@@ -60,6 +140,7 @@ class ServerUpdate(BaseModel):
 class Server(ServerBase):
     """Complete server model with ID"""
     id: str
+    version: int = 0  # bumped on every write; exposed as the ETag
 
     class Config:
         json_schema_extra = {
@@ -79,7 +160,8 @@ class Server(ServerBase):
                 "category": "production",
                 "responsibleTeam": "DevOps",
                 "lastPatchDate": "2023-10-15",
-                "tags": ["web", "api"]
+                "tags": ["web", "api"],
+                "version": 1
             }
         }
 
@@ -115,6 +197,21 @@ class DNSRecord(BaseModel):
     name: str
     value: str
     ttl: int
+    version: int = 0
+
+class DNSRecordCreate(BaseModel):
+    """Model for adding a DNS record"""
+    type: DNSRecordType
+    name: str
+    value: str
+    ttl: int
+
+class DNSRecordUpdate(BaseModel):
+    """Model for updating a DNS record"""
+    type: Optional[DNSRecordType] = None
+    name: Optional[str] = None
+    value: Optional[str] = None
+    ttl: Optional[int] = None
 
 class SSLInfo(BaseModel):
     """SSL Certificate information"""
@@ -133,12 +230,11 @@ class DomainBase(BaseModel):
     owner: str
     status: DomainStatus
     ssl: Optional[SSLInfo] = None
-    dnsRecords: List[DNSRecord] = []
     cost: Optional[float] = None
 
 class DomainCreate(DomainBase):
-    """Model for creating a new domain"""
-    pass
+    """Model for creating a new domain (initial DNS records are stored as their own items)"""
+    dnsRecords: List[DNSRecordCreate] = []
 
 class DomainUpdate(BaseModel):
     """Model for updating a domain (all fields optional)"""
@@ -150,26 +246,16 @@ class DomainUpdate(BaseModel):
     owner: Optional[str] = None
     status: Optional[DomainStatus] = None
     ssl: Optional[SSLInfo] = None
-    dnsRecords: Optional[List[DNSRecord]] = None
     cost: Optional[float] = None
 
 class Domain(DomainBase):
     """Complete domain model with ID"""
     id: str
+    version: int = 0
 
-class DNSRecordCreate(BaseModel):
-    """Model for adding a DNS record"""
-    type: DNSRecordType
-    name: str
-    value: str
-    ttl: int
-
-class DNSRecordUpdate(BaseModel):
-    """Model for updating a DNS record"""
-    type: Optional[DNSRecordType] = None
-    name: Optional[str] = None
-    value: Optional[str] = None
-    ttl: Optional[int] = None
+class DomainExport(Domain):
+    """A domain with its DNS records, as the domains export writes it and an import reads it back"""
+    dnsRecords: List[DNSRecord] = []
 
 # ===== Email Solution Models =====
 
@@ -191,6 +277,7 @@ class EmailAccount(BaseModel):
     quotaLimit: int  # in MB
     createdDate: str
     lastLogin: Optional[str] = None
+    version: int = 0
 
 class EmailCreate(BaseModel):
     """Model for creating email account"""
@@ -237,6 +324,7 @@ class Repository(BaseModel):
     lastCommit: Optional[str] = None
     branches: int = 1
     openIssues: int = 0
+    version: int = 0
 
 class RepositoryCreate(BaseModel):
     """Model for creating repository"""
@@ -276,6 +364,7 @@ class StorageBucket(BaseModel):
     capacityBytes: int
     createdDate: str
     isPublic: bool = False
+    version: int = 0
 
 class StorageCreate(BaseModel):
     """Model for creating storage"""
@@ -0,0 +1,77 @@
+"""
+Cursor Pagination Helpers
+Opaque cursors wrap DynamoDB's LastEvaluatedKey / ExclusiveStartKey.
+A cursor is only checked for shape here; the repository checks it holds
+the key of the table or index it resumes (InvalidCursor, a 400, if not)
+"""
+import base64
+import json
+from typing import Any, Callable, Dict, Optional, Type
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from app.config import settings
+from app.db_helper import dynamodb_to_python, python_to_dynamodb, sortable_fields
+from app.models import SortDirection
+
+class InvalidCursor(ValueError):
+    """A cursor that is malformed or does not resume the list it was passed to"""
+
+class PageParams:
+    """Resolved `limit` and `cursor` query parameters"""
+
+    def __init__(self, limit: int, start_key: Optional[Dict[str, Any]] = None):
+        self.limit = limit
+        self.start_key = start_key
+
+def encode_cursor(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Turn a LastEvaluatedKey into an opaque URL-safe token"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(dynamodb_to_python(last_evaluated_key), separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn a cursor token back into an ExclusiveStartKey"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    if not isinstance(key, dict) or not key:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return python_to_dynamodb(key)
+
+def invalid_cursor(error: InvalidCursor) -> HTTPException:
+    """400 for a cursor the list cannot resume from"""
+    return HTTPException(status_code=400, detail=str(error))
+
+def page_params(
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor")
+) -> PageParams:
+    """FastAPI dependency for paginated list routes"""
+    try:
+        start_key = decode_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
+    return PageParams(limit=limit, start_key=start_key)
+
+class SortParams:
+    """Resolved `order_by` and `direction` query parameters"""
+
+    def __init__(self, order_by: Optional[str] = None, descending: bool = False):
+        self.order_by = order_by
+        self.descending = descending
+
+def sort_params(model: Type[BaseModel]) -> Callable[..., SortParams]:
+    """FastAPI dependency for list routes that can be ordered by `model`'s scalar fields"""
+    sortable = sortable_fields(model)
+
+    def resolve(
+        order_by: Optional[str] = Query(None, description=f"Sort by one of: {', '.join(sortable)}"),
+        direction: SortDirection = Query(SortDirection.asc, description="asc or desc (with order_by)")
+    ) -> SortParams:
+        if order_by is not None and order_by not in sortable:
+            raise HTTPException(status_code=400, detail=f"Cannot order by {order_by}; sortable fields: {', '.join(sortable)}")
+        return SortParams(order_by, direction == SortDirection.desc)
+    return resolve
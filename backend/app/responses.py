@@ -0,0 +1,28 @@
+"""
+Fast Response Serialization
+Validate a payload once with a cached TypeAdapter and hand pydantic-core's
+JSON bytes straight to the client, bypassing FastAPI's second validation
+and jsonable_encoder pass. Routes keep `response_model` for the OpenAPI
+schema; returning a Response skips FastAPI's own serialization.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def get_adapter(response_type: Any) -> TypeAdapter:
+    """One TypeAdapter per response type (building them is expensive)"""
+    return TypeAdapter(response_type)
+
+def fast_json(
+    response_type: Any,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    include: Optional[Any] = None
+) -> Response:
+    """Validate `content` against `response_type` once and serialize it (or the `include`d part) to JSON bytes"""
+    adapter = get_adapter(response_type)
+    body = adapter.dump_json(adapter.validate_python(content), include=include)
+    return Response(content=body, status_code=status_code, headers=headers, media_type='application/json')
@@ -1,56 +1,249 @@
 """
 Domain & DNS Management API Routes
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from app.models import (
-    Domain, DomainCreate, DomainUpdate,
+    BatchGetRequest, BatchGetResult, BulkRequest, BulkResult, ExportFormat, ResourceSummary, Page,
+    Domain, DomainCreate, DomainExport, DomainStatus, DomainUpdate, SSLStatus,
     DNSRecord, DNSRecordCreate, DNSRecordUpdate
 )
-from app.db_helper import DynamoDBHelper
+from app.database import ChildRepository, DomainRepository
+from app.db_helper import IndexSpec
+from app.concurrency import VersionConflict, if_match, make_etag, precondition_failed
+from app.changes import conditional_item, conditional_list
+from app.bulk import run_batch_get, run_bulk
+from app.pagination import (
+    InvalidCursor, PageParams, SortParams, encode_cursor, invalid_cursor, page_params, sort_params
+)
+from app.export import export_response
+from app.fields import Fields, fields_param, list_include, page_include, sparse_model
+from app.responses import fast_json
+from datetime import datetime, timedelta, timezone
+import asyncio
+import heapq
+import re
 import uuid
 
 router = APIRouter(prefix='/domains', tags=['domains'])
-db = DynamoDBHelper('NccDomains')
+db = DomainRepository('NccDomains', Domain)
+dns_db = ChildRepository('NccDnsRecords', DNSRecord, 'domainId')
+
+# Range-keyed indexes behind the expiry routes
+EXPIRY_INDEX = next(index for index in db.indexes if index.name == 'GSI_Status')
+SSL_EXPIRY_INDEX = next(index for index in db.indexes if index.name == 'GSI_SslExpiry')
+MAX_EXPIRY_WINDOW_DAYS = 3660
+
+def _new_dns_record(record_data: DNSRecordCreate) -> dict:
+    """Assign a fresh ID to validated DNS record data"""
+    record = record_data.model_dump()
+    record['id'] = f"dns-{str(uuid.uuid4())[:8]}"
+    return record
+
+def _new_domain(domain_data: DomainCreate) -> dict:
+    """Assign fresh IDs to validated create data; initial DNS records stay under `dnsRecords`"""
+    domain_dict = domain_data.model_dump(exclude={'dnsRecords'})
+    domain_dict['id'] = f"dom-{str(uuid.uuid4())[:8]}"
+    domain_dict['dnsRecords'] = [_new_dns_record(record) for record in domain_data.dnsRecords]
+    return domain_dict
+
+async def _write_domains(put_items: List[Dict[str, Any]], delete_ids: List[str]) -> Set[str]:
+    """
+    Bulk write domains, moving their `dnsRecords` (initial ones, or an
+    imported export's) into NccDnsRecords and dropping deleted domains' records
+    """
+    records = {item['id']: item.pop('dnsRecords', []) for item in put_items}
+    failed = await db.batch_write(put_items, delete_ids)
+    with_records = [domain_id for domain_id, recs in records.items() if recs and domain_id not in failed]
+    unwritten = await asyncio.gather(
+        *(dns_db.put_children(domain_id, records[domain_id]) for domain_id in with_records)
+    )
+    await asyncio.gather(*(dns_db.delete_children(domain_id) for domain_id in delete_ids if domain_id not in failed))
+    # A domain whose records did not all land is reported as failed
+    failed.update(domain_id for domain_id, missed in zip(with_records, unwritten) if missed)
+    return failed
 
-@router.get('/', response_model=List[Domain])
+async def _embed_dns_records(domains: List[Dict[str, Any]]) -> None:
+    """Add each domain's DNS records under `dnsRecords`, as the export writes them"""
+    records = await dns_db.children_of([domain['id'] for domain in domains])
+    for domain in domains:
+        domain['dnsRecords'] = [
+            {name: value for name, value in record.items() if name != dns_db.parent_key}
+            for record in records[domain['id']]
+        ]
+
+def expiry_window(
+    within: str = Query('30d', description="Window from today: days ('30d' or '30') or weeks ('4w')"),
+    include_expired: bool = Query(False, description="Also return dates that have already passed")
+) -> Tuple[str, str]:
+    """Resolve the window to inclusive ISO date bounds (UTC)"""
+    match = re.fullmatch(r'(\d+)([dw]?)', within.strip().lower())
+    if not match:
+        raise HTTPException(status_code=400, detail=f"Invalid window: {within}")
+    days = int(match.group(1)) * (7 if match.group(2) == 'w' else 1)
+    if days > MAX_EXPIRY_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Window longer than {MAX_EXPIRY_WINDOW_DAYS} days")
+    today = datetime.now(timezone.utc).date()
+    start = '0000-01-01' if include_expired else today.isoformat()
+    return start, (today + timedelta(days=days)).isoformat()
+
+async def _expiring(
+    index: IndexSpec,
+    partitions: List[str],
+    window: Tuple[str, str],
+    date_field: str,
+    date_of: Callable[[dict], str],
+    fields: Fields = None
+) -> List[dict]:
+    """Range-query every partition of `index` in parallel and merge the (already sorted) results"""
+    low, high = window
+    if fields:
+        # The merge needs the date even when the response leaves it out
+        fields = tuple(dict.fromkeys(fields + (date_field,)))
+    results = await asyncio.gather(*(db.query_range(index, partition, low, high, fields) for partition in partitions))
+    return list(heapq.merge(*results, key=date_of))
+
+@router.get('/', response_model=Page[Domain])
 async def list_domains(
+    request: Request,
     status: Optional[str] = Query(None, description="Filter by status"),
-    registrar: Optional[str] = Query(None, description="Filter by registrar")
+    registrar: Optional[str] = Query(None, description="Filter by registrar"),
+    page: PageParams = Depends(page_params),
+    sort: SortParams = Depends(sort_params(Domain)),
+    fields: Fields = Depends(fields_param(Domain))
 ):
-    """List all domains with optional filtering"""
+    """List domains with optional filtering, one page at a time"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
     try:
-        domains = db.scan()
-        
-        # Apply client-side filters
-        if status:
-            domains = [d for d in domains if d.get('status') == status]
-        if registrar:
-            domains = [d for d in domains if d.get('registrar') == registrar]
-            
-        return domains
+        domains, last_key = await db.list_page(
+            page.limit, page.start_key,
+            filters={'status': status, 'registrar': registrar},
+            fields=fields,
+            order_by=sort.order_by,
+            descending=sort.descending
+        )
+        return fast_json(
+            Page[sparse_model(Domain, fields)],
+            {'items': domains, 'next_cursor': encode_cursor(last_key)},
+            headers=headers,
+            include=page_include(fields)
+        )
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching domains: {str(e)}")
 
 @router.post('/', response_model=Domain, status_code=201)
-async def create_domain(domain_data: DomainCreate):
+async def create_domain(domain_data: DomainCreate, response: Response):
     """Create a new domain"""
     try:
-        domain_id = f"dom-{str(uuid.uuid4())[:8]}"
-        domain_dict = domain_data.model_dump()
-        domain_dict['id'] = domain_id
-        db.put_item(domain_dict)
+        domain_dict = _new_domain(domain_data)
+        records = domain_dict.pop('dnsRecords')
+        await db.put_item(domain_dict)
+        if records and await dns_db.put_children(domain_dict['id'], records):
+            raise HTTPException(status_code=503, detail="Domain created but some DNS records were not written")
+        response.headers['ETag'] = make_etag(domain_dict.get('version'))
         return domain_dict
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating domain: {str(e)}")
 
+@router.post('/bulk', response_model=BulkResult)
+async def bulk_write_domains(request: BulkRequest):
+    """Create, replace and delete many domains in one call"""
+    try:
+        return await run_bulk(request, DomainCreate, Domain, _new_domain, _write_domains)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in bulk domain write: {str(e)}")
+
+@router.post('/batch-get', response_model=BatchGetResult[Domain])
+async def batch_get_domains(request: BatchGetRequest):
+    """Fetch many domains by ID, in request order"""
+    try:
+        return fast_json(BatchGetResult[Domain], await run_batch_get(request, db.batch_get))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching domains: {str(e)}")
+
+@router.get('/expiring', response_model=List[Domain])
+async def list_expiring_domains(
+    status: Optional[DomainStatus] = Query(None, description="Only this status (default: every status)"),
+    window: Tuple[str, str] = Depends(expiry_window),
+    fields: Fields = Depends(fields_param(Domain))
+):
+    """
+    Domains whose expiryDate falls within the window, soonest first
+    
+    One GSI_Status range query per status, so reads grow with the number
+    of hits rather than with the table.
+    """
+    try:
+        partitions = [status.value] if status else [value.value for value in DomainStatus]
+        domains = await _expiring(EXPIRY_INDEX, partitions, window, 'expiryDate', lambda domain: domain['expiryDate'], fields)
+        return fast_json(List[sparse_model(Domain, fields)], domains, include=list_include(fields))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching expiring domains: {str(e)}")
+
+@router.get('/ssl/expiring', response_model=List[Domain])
+async def list_expiring_certificates(
+    ssl_status: Optional[SSLStatus] = Query(None, description="Only this certificate status (default: every status)"),
+    window: Tuple[str, str] = Depends(expiry_window),
+    fields: Fields = Depends(fields_param(Domain))
+):
+    """
+    Domains whose SSL certificate's validTo falls within the window, soonest first
+    
+    Range queries on GSI_SslExpiry (sslStatus, sslValidTo), which only
+    holds domains that have a certificate.
+    """
+    try:
+        partitions = [ssl_status.value] if ssl_status else [value.value for value in SSLStatus]
+        domains = await _expiring(SSL_EXPIRY_INDEX, partitions, window, 'ssl', lambda domain: domain['ssl']['validTo'], fields)
+        return fast_json(List[sparse_model(Domain, fields)], domains, include=list_include(fields))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching expiring certificates: {str(e)}")
+
+@router.get('/summary', response_model=ResourceSummary)
+async def get_domain_summary(request: Request):
+    """
+    Domain counts by status and registrar, plus total cost
+    
+    Read from one precomputed stats item that every write keeps current,
+    so a dashboard never scans the table. Revalidates like the list route.
+    """
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
+    try:
+        return fast_json(ResourceSummary, await db.get_summary(), headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching domain summary: {str(e)}")
+
+@router.get('/export')
+async def export_domains(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson (one JSON object per line) or csv")
+):
+    """Stream every domain with its DNS records (`dnsRecords`) as NDJSON or CSV, gzipped when the client accepts it"""
+    return export_response(db, 'domains', format, request, DomainExport, _embed_dns_records)
+
 @router.get('/{domain_id}', response_model=Domain)
-async def get_domain(domain_id: str):
+async def get_domain(domain_id: str, request: Request, response: Response):
     """Get domain details by ID"""
     try:
-        domain = db.get_item({'id': domain_id})
+        domain = await db.get_item({'id': domain_id})
         if not domain:
             raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
+        unchanged, headers = conditional_item(db.table_name, request, domain.get('version'))
+        if unchanged:
+            return unchanged
+        response.headers.update(headers)
         return domain
     except HTTPException:
         raise
@@ -58,100 +251,125 @@ async def get_domain(domain_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching domain: {str(e)}")
 
 @router.put('/{domain_id}', response_model=Domain)
-async def update_domain(domain_id: str, domain_update: DomainUpdate):
-    """Update domain details"""
+async def update_domain(
+    domain_id: str,
+    domain_update: DomainUpdate,
+    response: Response,
+    expected: Optional[List[int]] = Depends(if_match)
+):
+    """Update domain details (only at the `If-Match` version, when given)"""
     try:
-        existing = db.get_item({'id': domain_id})
-        if not existing:
-            raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
-        
         updates = domain_update.model_dump(exclude_unset=True)
-        if not updates:
-            return existing
+        updated = await db.update_item({'id': domain_id}, updates, expected)
         
-        updated = db.update_item({'id': domain_id}, updates)
+        if not updated:
+            raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
+        response.headers['ETag'] = make_etag(updated.get('version'))
         return updated
     except HTTPException:
         raise
+    except VersionConflict as e:
+        raise precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating domain: {str(e)}")
 
 @router.delete('/{domain_id}', status_code=204)
-async def delete_domain(domain_id: str):
-    """Delete a domain"""
+async def delete_domain(domain_id: str, expected: Optional[List[int]] = Depends(if_match)):
+    """Delete a domain and its DNS records"""
     try:
-        existing = db.get_item({'id': domain_id})
-        if not existing:
+        if not await db.delete_item({'id': domain_id}, expected):
             raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
-        
-        db.delete_item({'id': domain_id})
+        await dns_db.delete_children(domain_id)
         return None
     except HTTPException:
         raise
+    except VersionConflict as e:
+        raise precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting domain: {str(e)}")
 
 # DNS Record Management
-@router.post('/{domain_id}/dns', response_model=Domain, status_code=201)
-async def add_dns_record(domain_id: str, record_data: DNSRecordCreate):
+# Records live in NccDnsRecords, one item per record keyed by (domainId, id)
+
+@router.get('/{domain_id}/dns', response_model=Page[DNSRecord])
+async def list_dns_records(
+    domain_id: str,
+    request: Request,
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fields_param(DNSRecord))
+):
+    """List a domain's DNS records, one page at a time"""
+    try:
+        if not await db.get_item({'id': domain_id}):
+            raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
+        unchanged, headers = conditional_list(dns_db.table_name, request)
+        if unchanged:
+            return unchanged
+        records, last_key = await dns_db.list_children(domain_id, page.limit, page.start_key, fields)
+        return fast_json(
+            Page[sparse_model(DNSRecord, fields)],
+            {'items': records, 'next_cursor': encode_cursor(last_key)},
+            headers=headers,
+            include=page_include(fields)
+        )
+    except HTTPException:
+        raise
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching DNS records: {str(e)}")
+
+@router.post('/{domain_id}/dns', response_model=DNSRecord, status_code=201)
+async def add_dns_record(domain_id: str, record_data: DNSRecordCreate, response: Response):
     """Add a DNS record to a domain"""
     try:
-        domain = db.get_item({'id': domain_id})
-        if not domain:
+        if not await db.get_item({'id': domain_id}):
             raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
         
-        record_id = f"dns-{str(uuid.uuid4())[:8]}"
-        new_record = record_data.model_dump()
-        new_record['id'] = record_id
-        
-        dns_records = domain.get('dnsRecords', [])
-        dns_records.append(new_record)
-        
-        updated = db.update_item({'id': domain_id}, {'dnsRecords': dns_records})
-        return updated
+        new_record = _new_dns_record(record_data)
+        new_record['domainId'] = domain_id
+        await dns_db.put_item(new_record)
+        response.headers['ETag'] = make_etag(new_record.get('version'))
+        return new_record
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding DNS record: {str(e)}")
 
-@router.put('/{domain_id}/dns/{record_id}', response_model=Domain)
-async def update_dns_record(domain_id: str, record_id: str, record_update: DNSRecordUpdate):
-    """Update a DNS record"""
+@router.put('/{domain_id}/dns/{record_id}', response_model=DNSRecord)
+async def update_dns_record(
+    domain_id: str,
+    record_id: str,
+    record_update: DNSRecordUpdate,
+    response: Response,
+    expected: Optional[List[int]] = Depends(if_match)
+):
+    """Update a DNS record (only at the `If-Match` version, when given)"""
     try:
-        domain = db.get_item({'id': domain_id})
-        if not domain:
-            raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
-        
-        dns_records = domain.get('dnsRecords', [])
-        record_index = next((i for i, r in enumerate(dns_records) if r['id'] == record_id), None)
-        
-        if record_index is None:
-            raise HTTPException(status_code=404, detail=f"DNS record {record_id} not found")
-        
         updates = record_update.model_dump(exclude_unset=True)
-        dns_records[record_index].update(updates)
+        updated = await dns_db.update_item({'domainId': domain_id, 'id': record_id}, updates, expected)
         
-        updated = db.update_item({'id': domain_id}, {'dnsRecords': dns_records})
+        if not updated:
+            raise HTTPException(status_code=404, detail=f"DNS record {record_id} not found")
+        response.headers['ETag'] = make_etag(updated.get('version'))
         return updated
     except HTTPException:
         raise
+    except VersionConflict as e:
+        raise precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating DNS record: {str(e)}")
 
-@router.delete('/{domain_id}/dns/{record_id}', response_model=Domain)
-async def delete_dns_record(domain_id: str, record_id: str):
+@router.delete('/{domain_id}/dns/{record_id}', status_code=204)
+async def delete_dns_record(domain_id: str, record_id: str, expected: Optional[List[int]] = Depends(if_match)):
     """Delete a DNS record"""
     try:
-        domain = db.get_item({'id': domain_id})
-        if not domain:
-            raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
-        
-        dns_records = domain.get('dnsRecords', [])
-        dns_records = [r for r in dns_records if r['id'] != record_id]
-        
-        updated = db.update_item({'id': domain_id}, {'dnsRecords': dns_records})
-        return updated
+        if not await dns_db.delete_item({'domainId': domain_id, 'id': record_id}, expected):
+            raise HTTPException(status_code=404, detail=f"DNS record {record_id} not found")
+        return None
     except HTTPException:
         raise
+    except VersionConflict as e:
+        raise precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting DNS record: {str(e)}")
@@ -1,71 +1,152 @@
 """
 Email Solution Management API Routes
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import List, Optional
-from app.models import EmailAccount, EmailCreate, EmailUpdate
-from app.db_helper import DynamoDBHelper
+from app.models import (
+    BatchGetRequest, BatchGetResult, BulkRequest, BulkResult, ExportFormat, ResourceSummary,
+    Page, EmailAccount, EmailCreate, EmailUpdate
+)
+from app.database import DynamoDBRepository
+from app.concurrency import VersionConflict, if_match, make_etag, precondition_failed
+from app.changes import conditional_item, conditional_list
+from app.bulk import run_batch_get, run_bulk
+from app.pagination import (
+    InvalidCursor, PageParams, SortParams, encode_cursor, invalid_cursor, page_params, sort_params
+)
+from app.export import export_response
+from app.fields import Fields, fields_param, page_include, sparse_model
+from app.responses import fast_json
 import uuid
 
 router = APIRouter(prefix='/emails', tags=['emails'])
-db = DynamoDBHelper('NccEmails')
+db = DynamoDBRepository('NccEmails', EmailAccount)
 
-@router.get('/', response_model=List[EmailAccount])
+def _new_email(email_data: EmailCreate) -> dict:
+    """Assign a fresh ID and server-side defaults to validated create data"""
+    email_dict = email_data.model_dump()
+    email_dict['id'] = f"email-{str(uuid.uuid4())[:8]}"
+    email_dict['quotaUsed'] = 0
+    return email_dict
+
+@router.get('/', response_model=Page[EmailAccount])
 async def list_emails(
+    request: Request,
     status: Optional[str] = Query(None),
     provider: Optional[str] = Query(None),
-    department: Optional[str] = Query(None)
+    department: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params),
+    sort: SortParams = Depends(sort_params(EmailAccount)),
+    fields: Fields = Depends(fields_param(EmailAccount))
 ):
-    """List all email accounts with optional filtering"""
+    """List email accounts with optional filtering, one page at a time"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
     try:
-        emails = db.scan()
-        if status:
-            emails = [e for e in emails if e.get('status') == status]
-        if provider:
-            emails = [e for e in emails if e.get('provider') == provider]
-        if department:
-            emails = [e for e in emails if e.get('department') == department]
-        return emails
+        emails, last_key = await db.list_page(
+            page.limit, page.start_key,
+            filters={'status': status, 'provider': provider, 'department': department},
+            fields=fields,
+            order_by=sort.order_by,
+            descending=sort.descending
+        )
+        return fast_json(
+            Page[sparse_model(EmailAccount, fields)],
+            {'items': emails, 'next_cursor': encode_cursor(last_key)},
+            headers=headers,
+            include=page_include(fields)
+        )
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/', response_model=EmailAccount, status_code=201)
-async def create_email(email_data: EmailCreate):
+async def create_email(email_data: EmailCreate, response: Response):
     """Create a new email account"""
     try:
-        email_id = f"email-{str(uuid.uuid4())[:8]}"
-        email_dict = email_data.model_dump()
-        email_dict['id'] = email_id
-        email_dict['quotaUsed'] = 0
-        db.put_item(email_dict)
+        email_dict = _new_email(email_data)
+        await db.put_item(email_dict)
+        response.headers['ETag'] = make_etag(email_dict.get('version'))
         return email_dict
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/bulk', response_model=BulkResult)
+async def bulk_write_emails(request: BulkRequest):
+    """Create, replace and delete many email accounts in one call"""
+    try:
+        return await run_bulk(request, EmailCreate, EmailAccount, _new_email, db.batch_write)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post('/batch-get', response_model=BatchGetResult[EmailAccount])
+async def batch_get_emails(request: BatchGetRequest):
+    """Fetch many email accounts by ID, in request order"""
+    try:
+        return fast_json(BatchGetResult[EmailAccount], await run_batch_get(request, db.batch_get))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get('/summary', response_model=ResourceSummary)
+async def get_email_summary(request: Request):
+    """Email account counts by status and provider, plus quotaUsed / quotaLimit totals (precomputed, no scan)"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
+    return fast_json(ResourceSummary, await db.get_summary(), headers=headers)
+
+@router.get('/export')
+async def export_emails(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson (one JSON object per line) or csv")
+):
+    """Stream every email account as NDJSON or CSV, gzipped when the client accepts it"""
+    return export_response(db, 'emails', format, request)
+
 @router.get('/{email_id}', response_model=EmailAccount)
-async def get_email(email_id: str):
+async def get_email(email_id: str, request: Request, response: Response):
     """Get email account by ID"""
-    email = db.get_item({'id': email_id})
+    email = await db.get_item({'id': email_id})
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
+    unchanged, headers = conditional_item(db.table_name, request, email.get('version'))
+    if unchanged:
+        return unchanged
+    response.headers.update(headers)
     return email
 
 @router.put('/{email_id}', response_model=EmailAccount)
-async def update_email(email_id: str, email_update: EmailUpdate):
+async def update_email(
+    email_id: str,
+    email_update: EmailUpdate,
+    response: Response,
+    expected: Optional[List[int]] = Depends(if_match)
+):
     """Update email account"""
-    existing = db.get_item({'id': email_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Email not found")
-    
     updates = email_update.model_dump(exclude_unset=True)
-    updated = db.update_item({'id': email_id}, updates)
+    try:
+        updated = await db.update_item({'id': email_id}, updates, expected)
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    
+    if not updated:
+        raise HTTPException(status_code=404, detail="Email not found")
+    response.headers['ETag'] = make_etag(updated.get('version'))
     return updated
 
 @router.delete('/{email_id}', status_code=204)
-async def delete_email(email_id: str):
+async def delete_email(email_id: str, expected: Optional[List[int]] = Depends(if_match)):
     """Delete email account"""
-    existing = db.get_item({'id': email_id})
-    if not existing:
+    try:
+        deleted = await db.delete_item({'id': email_id}, expected)
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Email not found")
-    db.delete_item({'id': email_id})
     return None
@@ -0,0 +1,43 @@
+"""
+Change Event Stream Route
+"""
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import List, Optional
+from app.events import TABLE_RESOURCES, event_log
+
+router = APIRouter(prefix='/events', tags=['events'])
+
+@router.get('/')
+async def stream_events(
+    resource: Optional[List[str]] = Query(None, description="Only these resources (servers, domains, dns, emails, repositories, storage)"),
+    since: Optional[str] = Query(None, description="Resume after this event id (the Last-Event-ID header takes precedence)"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of create / update / delete events
+
+    Each event is named after its type and carries
+    `{"type", "resource", "id", "item"}` (`domainId` too for DNS records;
+    no `item` on deletes). A `reset` event means events were missed and
+    local state should be reloaded. Browsers resume automatically through
+    Last-Event-ID after a reconnect.
+    """
+    resources = None
+    if resource:
+        known = set(TABLE_RESOURCES.values())
+        unknown = [name for name in resource if name not in known]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown resource: {', '.join(unknown)}")
+        resources = set(resource)
+    release = event_log.subscribe()
+    if release is None:
+        raise HTTPException(status_code=503, detail="Too many event subscribers", headers={'Retry-After': '30'})
+    return StreamingResponse(
+        event_log.stream(resources, last_event_id or since, release),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        # Also after the response, for a client that left before the stream started
+        background=BackgroundTask(release)
+    )
@@ -0,0 +1,141 @@
+"""
+Bulk Import API Route
+"""
+import multiprocessing
+import tempfile
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.config import settings
+from app.db_helper import CapacityLimiter
+from app.executor import run_sync
+from app.importer import ImportSpec, ImportTotals, iter_rows, run_import
+from app.models import (
+    DomainCreate, DomainExport, EmailAccount, EmailCreate, ExportFormat, ImportResult,
+    Repository, RepositoryCreate, ServerCreate, Server, StorageBucket, StorageCreate
+)
+from app.responses import fast_json
+from app.routers import servers, domains, emails, repositories, storage
+
+router = APIRouter(prefix='/import', tags=['import'])
+
+# Rows are validated like POST /{resource} (create) or a bulk replace (rows
+# with an id) and written like POST /{resource}/bulk; domain rows keep the
+# `dnsRecords` the export embeds
+IMPORT_SPECS: Dict[str, ImportSpec] = {
+    'servers': ImportSpec('servers', ServerCreate, Server, servers._new_server, servers.db.batch_write),
+    'domains': ImportSpec('domains', DomainCreate, DomainExport, domains._new_domain, domains._write_domains),
+    'emails': ImportSpec('emails', EmailCreate, EmailAccount, emails._new_email, emails.db.batch_write),
+    'repositories': ImportSpec('repositories', RepositoryCreate, Repository, repositories._new_repository, repositories.db.batch_write),
+    'storage': ImportSpec('storage', StorageCreate, StorageBucket, storage._new_storage, storage.db.batch_write),
+}
+
+# Uploads larger than this are spooled to disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Most a gzip body is inflated by in one step, so a small upload cannot
+# expand past IMPORT_MAX_BYTES in memory before it is counted
+INFLATE_STEP_BYTES = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def validation_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared validation processes, started on first use (spawned: forking a threaded server is unsafe)"""
+    global _pool
+    if _pool is None and settings.IMPORT_WORKERS > 0:
+        _pool = ProcessPoolExecutor(settings.IMPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def shutdown_validation_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+def inflate(decompressor, block: bytes) -> Iterator[bytes]:
+    """Decompress one body block, at most INFLATE_STEP_BYTES at a time"""
+    data = decompressor.decompress(block, INFLATE_STEP_BYTES)
+    while True:
+        yield data
+        if not decompressor.unconsumed_tail:
+            return
+        data = decompressor.decompress(decompressor.unconsumed_tail, INFLATE_STEP_BYTES)
+
+@router.post('/{resource}', response_model=ImportResult)
+async def import_rows(
+    resource: str,
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Body format: ndjson or csv (as /export writes them)"),
+    job: Optional[str] = Query(None, description="Job id of an interrupted import to resume (new one by default)"),
+    skip: int = Query(0, ge=0, description="Rows already committed (the interrupted import's checkpoint)"),
+    dry_run: bool = Query(False, description="Validate only")
+):
+    """
+    Import an NDJSON or CSV file sent as the request body (gzip
+    Content-Encoding accepted)
+
+    Rows with an id replace that item; rows without one are created. Bad
+    rows are reported and skipped. Bodies over IMPORT_MAX_BYTES (after
+    gzip decoding) are refused with 413. The body is spooled to disk (on
+    the thread pool: decoding and file writes block) and then validated and written a chunk at a time with bounded concurrency. To
+    resume after an error, resend the file with the same `job` and
+    `skip` set to the reported checkpoint.
+    """
+    spec = IMPORT_SPECS.get(resource)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown resource: {resource}")
+    job = job or uuid.uuid4().hex[:8]
+    gzipped = request.headers.get('content-encoding', '').lower() == 'gzip'
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    totals = ImportTotals(skip)
+    rejects = []
+
+    def on_commit(problems, _totals):
+        room = settings.IMPORT_MAX_REPORTED_REJECTS - len(rejects)
+        rejects.extend({'row': row, 'error': error} for row, error, _ in problems[:max(room, 0)])
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        def spool_write(data: bytes) -> None:
+            if spool.tell() + len(data) > settings.IMPORT_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Import body is larger than {settings.IMPORT_MAX_BYTES} bytes (after gzip decoding)"
+                )
+            spool.write(data)
+
+        def spool_block(block: bytes) -> None:
+            for data in (inflate(decompressor, block) if decompressor else [block]):
+                spool_write(data)
+
+        try:
+            async for block in request.stream():
+                if block:
+                    await run_sync(spool_block, block)
+            if decompressor:
+                await run_sync(spool_write, decompressor.flush())
+        except zlib.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid gzip body: {str(e)}")
+        spool.seek(0)
+        try:
+            header, rows = iter_rows(spool, format, skip)
+            await run_import(
+                spec, format, header, rows,
+                job=job,
+                totals=totals,
+                executor=validation_pool(),
+                chunk_size=settings.IMPORT_CHUNK_SIZE,
+                concurrency=settings.IMPORT_CONCURRENCY,
+                limiter=CapacityLimiter(settings.IMPORT_MAX_WRITE_UNITS),
+                dry_run=dry_run,
+                on_commit=on_commit
+            )
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Body is not UTF-8: {str(e)}")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Import {job} stopped; resume with skip={totals.checkpoint}: {str(e)}"
+            )
+    return fast_json(ImportResult, {'job': job, **totals.as_dict(), 'rejects': rejects})
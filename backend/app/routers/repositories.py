@@ -1,74 +1,155 @@
 """
 Version Control (Repository) Management API Routes
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import List, Optional
-from app.models import Repository, RepositoryCreate, RepositoryUpdate
-from app.db_helper import DynamoDBHelper
+from app.models import (
+    BatchGetRequest, BatchGetResult, BulkRequest, BulkResult, ExportFormat, ResourceSummary,
+    Page, Repository, RepositoryCreate, RepositoryUpdate
+)
+from app.database import DynamoDBRepository
+from app.concurrency import VersionConflict, if_match, make_etag, precondition_failed
+from app.changes import conditional_item, conditional_list
+from app.bulk import run_batch_get, run_bulk
+from app.pagination import (
+    InvalidCursor, PageParams, SortParams, encode_cursor, invalid_cursor, page_params, sort_params
+)
+from app.export import export_response
+from app.fields import Fields, fields_param, page_include, sparse_model
+from app.responses import fast_json
 import uuid
 
 router = APIRouter(prefix='/repositories', tags=['repositories'])
-db = DynamoDBHelper('NccRepositories')
+db = DynamoDBRepository('NccRepositories', Repository)
 
-@router.get('/', response_model=List[Repository])
+def _new_repository(repo_data: RepositoryCreate) -> dict:
+    """Assign a fresh ID and server-side defaults to validated create data"""
+    repo_dict = repo_data.model_dump()
+    repo_dict['id'] = f"repo-{str(uuid.uuid4())[:8]}"
+    if 'branches' not in repo_dict:
+        repo_dict['branches'] = 1
+    if 'openIssues' not in repo_dict:
+        repo_dict['openIssues'] = 0
+    return repo_dict
+
+@router.get('/', response_model=Page[Repository])
 async def list_repositories(
+    request: Request,
     provider: Optional[str] = Query(None),
     language: Optional[str] = Query(None),
-    visibility: Optional[str] = Query(None)
+    visibility: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params),
+    sort: SortParams = Depends(sort_params(Repository)),
+    fields: Fields = Depends(fields_param(Repository))
 ):
-    """List all repositories with optional filtering"""
+    """List repositories with optional filtering, one page at a time"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
     try:
-        repos = db.scan()
-        if provider:
-            repos = [r for r in repos if r.get('provider') == provider]
-        if language:
-            repos = [r for r in repos if r.get('language') == language]
-        if visibility:
-            repos = [r for r in repos if r.get('visibility') == visibility]
-        return repos
+        repos, last_key = await db.list_page(
+            page.limit, page.start_key,
+            filters={'provider': provider, 'language': language, 'visibility': visibility},
+            fields=fields,
+            order_by=sort.order_by,
+            descending=sort.descending
+        )
+        return fast_json(
+            Page[sparse_model(Repository, fields)],
+            {'items': repos, 'next_cursor': encode_cursor(last_key)},
+            headers=headers,
+            include=page_include(fields)
+        )
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/', response_model=Repository, status_code=201)
-async def create_repository(repo_data: RepositoryCreate):
+async def create_repository(repo_data: RepositoryCreate, response: Response):
     """Create a new repository"""
     try:
-        repo_id = f"repo-{str(uuid.uuid4())[:8]}"
-        repo_dict = repo_data.model_dump()
-        repo_dict['id'] = repo_id
-        if 'branches' not in repo_dict:
-            repo_dict['branches'] = 1
-        if 'openIssues' not in repo_dict:
-            repo_dict['openIssues'] = 0
-        db.put_item(repo_dict)
+        repo_dict = _new_repository(repo_data)
+        await db.put_item(repo_dict)
+        response.headers['ETag'] = make_etag(repo_dict.get('version'))
         return repo_dict
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/bulk', response_model=BulkResult)
+async def bulk_write_repositories(request: BulkRequest):
+    """Create, replace and delete many repositories in one call"""
+    try:
+        return await run_bulk(request, RepositoryCreate, Repository, _new_repository, db.batch_write)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post('/batch-get', response_model=BatchGetResult[Repository])
+async def batch_get_repositories(request: BatchGetRequest):
+    """Fetch many repositories by ID, in request order"""
+    try:
+        return fast_json(BatchGetResult[Repository], await run_batch_get(request, db.batch_get))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get('/summary', response_model=ResourceSummary)
+async def get_repository_summary(request: Request):
+    """Repository counts by provider, visibility and CI status, plus open issues (precomputed, no scan)"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
+    return fast_json(ResourceSummary, await db.get_summary(), headers=headers)
+
+@router.get('/export')
+async def export_repositories(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson (one JSON object per line) or csv")
+):
+    """Stream every repository as NDJSON or CSV, gzipped when the client accepts it"""
+    return export_response(db, 'repositories', format, request)
+
 @router.get('/{repo_id}', response_model=Repository)
-async def get_repository(repo_id: str):
+async def get_repository(repo_id: str, request: Request, response: Response):
     """Get repository by ID"""
-    repo = db.get_item({'id': repo_id})
+    repo = await db.get_item({'id': repo_id})
     if not repo:
         raise HTTPException(status_code=404, detail="Repository not found")
+    unchanged, headers = conditional_item(db.table_name, request, repo.get('version'))
+    if unchanged:
+        return unchanged
+    response.headers.update(headers)
     return repo
 
 @router.put('/{repo_id}', response_model=Repository)
-async def update_repository(repo_id: str, repo_update: RepositoryUpdate):
+async def update_repository(
+    repo_id: str,
+    repo_update: RepositoryUpdate,
+    response: Response,
+    expected: Optional[List[int]] = Depends(if_match)
+):
     """Update repository"""
-    existing = db.get_item({'id': repo_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Repository not found")
-    
     updates = repo_update.model_dump(exclude_unset=True)
-    updated = db.update_item({'id': repo_id}, updates)
+    try:
+        updated = await db.update_item({'id': repo_id}, updates, expected)
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    
+    if not updated:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    response.headers['ETag'] = make_etag(updated.get('version'))
     return updated
 
 @router.delete('/{repo_id}', status_code=204)
-async def delete_repository(repo_id: str):
+async def delete_repository(repo_id: str, expected: Optional[List[int]] = Depends(if_match)):
     """Delete repository"""
-    existing = db.get_item({'id': repo_id})
-    if not existing:
+    try:
+        deleted = await db.delete_item({'id': repo_id}, expected)
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Repository not found")
-    db.delete_item({'id': repo_id})
     return None
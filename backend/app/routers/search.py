@@ -0,0 +1,43 @@
+"""
+Search API Route
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from app.models import SearchResult
+from app.responses import fast_json
+from app.search import search_index
+from app.routers import servers, domains, emails, repositories, storage
+
+router = APIRouter(prefix='/search', tags=['search'])
+
+# Repositories the index is built from
+REPOSITORIES = [servers.db, domains.db, emails.db, repositories.db, storage.db]
+
+MAX_SEARCH_RESULTS = 100
+
+@router.get('/', response_model=SearchResult)
+async def search(
+    q: str = Query(..., min_length=1, description="Search text; every word must prefix a word of the item"),
+    resource: Optional[List[str]] = Query(None, description="Limit to resources (servers, domains, emails, repositories, storage)"),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS, description="Number of hits")
+):
+    """
+    Ranked prefix search across every resource
+    
+    Matches server name / IP address / tags, domain name, email address /
+    display name, and repository and storage names. Served from an
+    in-process index, so no table is scanned per request.
+    """
+    tables = None
+    if resource:
+        by_resource = {spec.resource: table for table, spec in search_index.specs.items()}
+        unknown = [name for name in resource if name not in by_resource]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown resource: {', '.join(unknown)}")
+        tables = {by_resource[name] for name in resource}
+    try:
+        await search_index.ready(REPOSITORIES)
+        hits, total = search_index.search(q, limit, tables)
+        return fast_json(SearchResult, {'items': hits, 'total': total})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching: {str(e)}")
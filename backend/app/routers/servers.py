@@ -1,60 +1,160 @@
 """
 Server Management API Routes
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import List, Optional
-from app.models import Server, ServerCreate, ServerUpdate
-from app.database import db_client
+from app.models import (
+    BatchGetRequest, BatchGetResult, BulkRequest, BulkResult, ExportFormat, ResourceSummary,
+    Page, Server, ServerCreate, ServerUpdate
+)
+from app.database import ServerRepository
+from app.concurrency import VersionConflict, if_match, make_etag, precondition_failed
+from app.changes import conditional_item, conditional_list
+from app.config import settings
+from app.bulk import run_batch_get, run_bulk
+from app.pagination import (
+    InvalidCursor, PageParams, SortParams, encode_cursor, invalid_cursor, page_params, sort_params
+)
+from app.export import export_response
+from app.fields import Fields, fields_param, page_include, sparse_model
+from app.responses import fast_json
 import uuid
 
 router = APIRouter(prefix='/servers', tags=['servers'])
+db = ServerRepository(settings.DYNAMODB_TABLE, Server)
 
-@router.get('/', response_model=List[Server])
+def _new_server(server_data: ServerCreate) -> dict:
+    """Assign a fresh ID to validated create data"""
+    server_dict = server_data.model_dump()
+    server_dict['id'] = f"srv-{str(uuid.uuid4())[:8]}"
+    return server_dict
+
+@router.get('/', response_model=Page[Server])
 async def list_servers(
+    request: Request,
     status: Optional[str] = Query(None, description="Filter by status"),
-    category: Optional[str] = Query(None, description="Filter by category")
+    category: Optional[str] = Query(None, description="Filter by category"),
+    page: PageParams = Depends(page_params),
+    sort: SortParams = Depends(sort_params(Server)),
+    fields: Fields = Depends(fields_param(Server))
 ):
     """
-    List all servers with optional filtering
+    List servers with optional filtering, one page at a time
     
     - **status**: Filter by server status (online, offline, maintenance, warning)
     - **category**: Filter by category (production, staging, development, testing)
+    - **limit** / **cursor**: Page size and the `next_cursor` of the previous page
+    - **order_by** / **direction**: Sort order, e.g. `order_by=name` (served by GSI_Category)
+    - **fields**: Only these attributes, e.g. `name,status,ipAddress`
     """
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
     try:
-        servers = await db_client.list_servers(status=status, category=category)
-        return servers
+        servers, last_key = await db.list_page(
+            page.limit, page.start_key,
+            filters={'status': status, 'category': category},
+            fields=fields,
+            order_by=sort.order_by,
+            descending=sort.descending
+        )
+        return fast_json(
+            Page[sparse_model(Server, fields)],
+            {'items': servers, 'next_cursor': encode_cursor(last_key)},
+            headers=headers,
+            include=page_include(fields)
+        )
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching servers: {str(e)}")
 
 @router.post('/', response_model=Server, status_code=201)
-async def create_server(server_data: ServerCreate):
+async def create_server(server_data: ServerCreate, response: Response):
     """
     Create a new server
     
     Generates a unique ID and stores the server in DynamoDB
     """
     try:
-        # Generate unique ID
-        server_id = f"srv-{str(uuid.uuid4())[:8]}"
-        
-        # Create Server instance with ID
-        server = Server(id=server_id, **server_data.model_dump())
-        
-        # Save to database
-        created_server = await db_client.create_server(server)
-        return created_server
+        # Generate unique ID and save to database
+        server_dict = _new_server(server_data)
+        await db.put_item(server_dict)
+        response.headers['ETag'] = make_etag(server_dict.get('version'))
+        return server_dict
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating server: {str(e)}")
 
+@router.post('/bulk', response_model=BulkResult)
+async def bulk_write_servers(request: BulkRequest):
+    """
+    Create, replace and delete many servers in one call
+    
+    Rows are validated individually and written in 25-item BatchWriteItem
+    chunks; the response reports the outcome of every row.
+    """
+    try:
+        return await run_bulk(request, ServerCreate, Server, _new_server, db.batch_write)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in bulk server write: {str(e)}")
+
+@router.post('/batch-get', response_model=BatchGetResult[Server])
+async def batch_get_servers(request: BatchGetRequest):
+    """
+    Fetch many servers by ID in one call
+    
+    IDs are read with parallel 100-key BatchGetItem calls (cache hits are
+    served locally) and returned in request order; unknown IDs are listed
+    under `missing`.
+    """
+    try:
+        return fast_json(BatchGetResult[Server], await run_batch_get(request, db.batch_get))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching servers: {str(e)}")
+
+@router.get('/summary', response_model=ResourceSummary)
+async def get_server_summary(request: Request):
+    """
+    Server counts by status and category
+    
+    Read from one precomputed stats item that every write keeps current,
+    so a dashboard never scans the table. Revalidates like the list route.
+    """
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
+    try:
+        return fast_json(ResourceSummary, await db.get_summary(), headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching server summary: {str(e)}")
+
+@router.get('/export')
+async def export_servers(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson (one JSON object per line) or csv")
+):
+    """Stream every server as NDJSON or CSV, gzipped when the client accepts it"""
+    return export_response(db, 'servers', format, request)
+
 @router.get('/{server_id}', response_model=Server)
-async def get_server(server_id: str):
+async def get_server(server_id: str, request: Request, response: Response):
     """
     Get server details by ID
+    
+    The `ETag` header carries the server's version, for use in `If-Match`
     """
     try:
-        server = await db_client.get_server(server_id)
+        server = await db.get_item({'id': server_id})
         if not server:
             raise HTTPException(status_code=404, detail=f"Server {server_id} not found")
+        unchanged, headers = conditional_item(db.table_name, request, server.get('version'))
+        if unchanged:
+            return unchanged
+        response.headers.update(headers)
         return server
     except HTTPException:
         raise
@@ -62,47 +162,49 @@ async def get_server(server_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching server: {str(e)}")
 
 @router.put('/{server_id}', response_model=Server)
-async def update_server(server_id: str, server_update: ServerUpdate):
+async def update_server(
+    server_id: str,
+    server_update: ServerUpdate,
+    response: Response,
+    expected: Optional[List[int]] = Depends(if_match)
+):
     """
     Update server details
     
-    Only provided fields will be updated
+    Only provided fields will be updated. With `If-Match`, the update only
+    applies if the server is still at that version (412 otherwise).
     """
     try:
-        # Check if server exists
-        existing_server = await db_client.get_server(server_id)
-        if not existing_server:
-            raise HTTPException(status_code=404, detail=f"Server {server_id} not found")
-        
         # Get non-None fields
         updates = server_update.model_dump(exclude_unset=True)
         
-        if not updates:
-            return existing_server
+        # Single conditional write; None means the server does not exist
+        updated_server = await db.update_item({'id': server_id}, updates, expected)
         
-        # Update server
-        updated_server = await db_client.update_server(server_id, updates)
+        if not updated_server:
+            raise HTTPException(status_code=404, detail=f"Server {server_id} not found")
+        response.headers['ETag'] = make_etag(updated_server.get('version'))
         return updated_server
     except HTTPException:
         raise
+    except VersionConflict as e:
+        raise precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating server: {str(e)}")
 
 @router.delete('/{server_id}', status_code=204)
-async def delete_server(server_id: str):
+async def delete_server(server_id: str, expected: Optional[List[int]] = Depends(if_match)):
     """
-    Delete a server
+    Delete a server (only at the `If-Match` version, when given)
     """
     try:
-        # Check if server exists
-        existing_server = await db_client.get_server(server_id)
-        if not existing_server:
+        # Single conditional delete; False means the server does not exist
+        if not await db.delete_item({'id': server_id}, expected):
             raise HTTPException(status_code=404, detail=f"Server {server_id} not found")
-        
-        # Delete server
-        await db_client.delete_server(server_id)
         return None
     except HTTPException:
         raise
+    except VersionConflict as e:
+        raise precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting server: {str(e)}")
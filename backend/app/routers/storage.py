@@ -1,73 +1,154 @@
 """
 Storage Management API Routes
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import List, Optional
-from app.models import StorageBucket, StorageCreate, StorageUpdate
-from app.db_helper import DynamoDBHelper
+from app.models import (
+    BatchGetRequest, BatchGetResult, BulkRequest, BulkResult, ExportFormat, ResourceSummary,
+    Page, StorageBucket, StorageCreate, StorageUpdate
+)
+from app.database import DynamoDBRepository
+from app.concurrency import VersionConflict, if_match, make_etag, precondition_failed
+from app.changes import conditional_item, conditional_list
+from app.bulk import run_batch_get, run_bulk
+from app.pagination import (
+    InvalidCursor, PageParams, SortParams, encode_cursor, invalid_cursor, page_params, sort_params
+)
+from app.export import export_response
+from app.fields import Fields, fields_param, page_include, sparse_model
+from app.responses import fast_json
 import uuid
 from datetime import date
 
 router = APIRouter(prefix='/storage', tags=['storage'])
-db = DynamoDBHelper('NccStorage')
+db = DynamoDBRepository('NccStorage', StorageBucket)
 
-@router.get('/', response_model=List[StorageBucket])
+def _new_storage(storage_data: StorageCreate) -> dict:
+    """Assign a fresh ID and server-side defaults to validated create data"""
+    storage_dict = storage_data.model_dump()
+    storage_dict['id'] = f"storage-{str(uuid.uuid4())[:8]}"
+    storage_dict['usageBytes'] = 0
+    storage_dict['createdDate'] = str(date.today())
+    return storage_dict
+
+@router.get('/', response_model=Page[StorageBucket])
 async def list_storage(
+    request: Request,
     provider: Optional[str] = Query(None),
     type: Optional[str] = Query(None),
-    region: Optional[str] = Query(None)
+    region: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params),
+    sort: SortParams = Depends(sort_params(StorageBucket)),
+    fields: Fields = Depends(fields_param(StorageBucket))
 ):
-    """List all storage buckets/volumes with optional filtering"""
+    """List storage buckets/volumes with optional filtering, one page at a time"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
     try:
-        items = db.scan()
-        if provider:
-            items = [s for s in items if s.get('provider') == provider]
-        if type:
-            items = [s for s in items if s.get('type') == type]
-        if region:
-            items = [s for s in items if s.get('region') == region]
-        return items
+        items, last_key = await db.list_page(
+            page.limit, page.start_key,
+            filters={'provider': provider, 'type': type, 'region': region},
+            fields=fields,
+            order_by=sort.order_by,
+            descending=sort.descending
+        )
+        return fast_json(
+            Page[sparse_model(StorageBucket, fields)],
+            {'items': items, 'next_cursor': encode_cursor(last_key)},
+            headers=headers,
+            include=page_include(fields)
+        )
+    except InvalidCursor as e:
+        raise invalid_cursor(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/', response_model=StorageBucket, status_code=201)
-async def create_storage(storage_data: StorageCreate):
+async def create_storage(storage_data: StorageCreate, response: Response):
     """Create a new storage bucket/volume"""
     try:
-        storage_id = f"storage-{str(uuid.uuid4())[:8]}"
-        storage_dict = storage_data.model_dump()
-        storage_dict['id'] = storage_id
-        storage_dict['usageBytes'] = 0
-        storage_dict['createdDate'] = str(date.today())
-        db.put_item(storage_dict)
+        storage_dict = _new_storage(storage_data)
+        await db.put_item(storage_dict)
+        response.headers['ETag'] = make_etag(storage_dict.get('version'))
         return storage_dict
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/bulk', response_model=BulkResult)
+async def bulk_write_storage(request: BulkRequest):
+    """Create, replace and delete many storage buckets/volumes in one call"""
+    try:
+        return await run_bulk(request, StorageCreate, StorageBucket, _new_storage, db.batch_write)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post('/batch-get', response_model=BatchGetResult[StorageBucket])
+async def batch_get_storage(request: BatchGetRequest):
+    """Fetch many storage buckets/volumes by ID, in request order"""
+    try:
+        return fast_json(BatchGetResult[StorageBucket], await run_batch_get(request, db.batch_get))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get('/summary', response_model=ResourceSummary)
+async def get_storage_summary(request: Request):
+    """Storage counts by provider and type, plus usageBytes / capacityBytes totals (precomputed, no scan)"""
+    unchanged, headers = conditional_list(db.table_name, request)
+    if unchanged:
+        return unchanged
+    return fast_json(ResourceSummary, await db.get_summary(), headers=headers)
+
+@router.get('/export')
+async def export_storage(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson (one JSON object per line) or csv")
+):
+    """Stream every storage bucket as NDJSON or CSV, gzipped when the client accepts it"""
+    return export_response(db, 'storage', format, request)
+
 @router.get('/{storage_id}', response_model=StorageBucket)
-async def get_storage(storage_id: str):
+async def get_storage(storage_id: str, request: Request, response: Response):
     """Get storage bucket by ID"""
-    storage = db.get_item({'id': storage_id})
+    storage = await db.get_item({'id': storage_id})
     if not storage:
         raise HTTPException(status_code=404, detail="Storage not found")
+    unchanged, headers = conditional_item(db.table_name, request, storage.get('version'))
+    if unchanged:
+        return unchanged
+    response.headers.update(headers)
     return storage
 
 @router.put('/{storage_id}', response_model=StorageBucket)
-async def update_storage(storage_id: str, storage_update: StorageUpdate):
+async def update_storage(
+    storage_id: str,
+    storage_update: StorageUpdate,
+    response: Response,
+    expected: Optional[List[int]] = Depends(if_match)
+):
     """Update storage bucket"""
-    existing = db.get_item({'id': storage_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Storage not found")
-    
     updates = storage_update.model_dump(exclude_unset=True)
-    updated = db.update_item({'id': storage_id}, updates)
+    try:
+        updated = await db.update_item({'id': storage_id}, updates, expected)
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    
+    if not updated:
+        raise HTTPException(status_code=404, detail="Storage not found")
+    response.headers['ETag'] = make_etag(updated.get('version'))
     return updated
 
 @router.delete('/{storage_id}', status_code=204)
-async def delete_storage(storage_id: str):
+async def delete_storage(storage_id: str, expected: Optional[List[int]] = Depends(if_match)):
     """Delete storage bucket"""
-    existing = db.get_item({'id': storage_id})
-    if not existing:
+    try:
+        deleted = await db.delete_item({'id': storage_id}, expected)
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Storage not found")
-    db.delete_item({'id': storage_id})
     return None
@@ -0,0 +1,36 @@
+"""
+Dashboard Summary API Route
+"""
+from fastapi import APIRouter, HTTPException
+from typing import Dict
+from app.models import ResourceSummary
+from app.database import read_summaries
+from app.responses import fast_json
+from app.routers import servers, domains, emails, repositories, storage
+
+router = APIRouter(prefix='/summary', tags=['summary'])
+
+# Response key -> table
+RESOURCES = {
+    'servers': servers.db.table_name,
+    'domains': domains.db.table_name,
+    'emails': emails.db.table_name,
+    'repositories': repositories.db.table_name,
+    'storage': storage.db.table_name,
+}
+
+@router.get('/', response_model=Dict[str, ResourceSummary])
+async def get_summary():
+    """
+    Counters for every resource in one BatchGetItem
+    
+    Each entry matches `GET /{resource}/summary`.
+    """
+    try:
+        summaries = await read_summaries(list(RESOURCES.values()))
+        return fast_json(
+            Dict[str, ResourceSummary],
+            {resource: summaries[table] for resource, table in RESOURCES.items()}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching summary: {str(e)}")
@@ -0,0 +1,376 @@
+"""
+In-Process Search Index
+Inverted index over the name-like attributes of every resource, with
+prefix lookups through a sorted token list. Built by one projected
+parallel scan per table in the background, then kept current by the repository layer
+on every write. In a worker cluster each worker builds its own, and the
+cache server passes every write on to the other workers' indexes.
+"""
+import asyncio
+import bisect
+import heapq
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.cluster import cluster
+from app.config import settings
+from app.db_helper import parallel_scan
+
+DocKey = Tuple[str, str]  # (table, id)
+
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+def tokenize(value: Any) -> List[str]:
+    """The whole lower-cased value, then its alphanumeric parts ('web-prod-01' -> web-prod-01, web, prod, 01)"""
+    if not isinstance(value, str):
+        return []
+    value = value.strip().lower()
+    if not value:
+        return []
+    parts = [part for part in _SEPARATORS.split(value) if part and part != value]
+    return [value] + parts
+
+class SearchSpec:
+    """Which attributes of a table are searchable, how much each counts, and what a hit shows"""
+
+    def __init__(self, resource: str, fields: Dict[str, float], title: str, subtitle: Optional[str] = None):
+        self.resource = resource
+        self.fields = fields
+        self.title = title
+        self.subtitle = subtitle
+
+    @property
+    def attributes(self) -> List[str]:
+        """Every attribute the index reads"""
+        names = ['id'] + list(self.fields) + [self.title] + ([self.subtitle] if self.subtitle else [])
+        return list(dict.fromkeys(names))
+
+    def tokens(self, item: Dict[str, Any]) -> Dict[str, float]:
+        """Token -> weight of the heaviest field it occurs in"""
+        weights: Dict[str, float] = {}
+        for field, weight in self.fields.items():
+            value = item.get(field)
+            for element in value if isinstance(value, list) else [value]:
+                for token in tokenize(element):
+                    if weights.get(token, 0) < weight:
+                        weights[token] = weight
+        return weights
+
+# Searchable attributes per table; identifiers outweigh descriptive fields
+TABLE_SEARCH: Dict[str, SearchSpec] = {
+    'NccServers': SearchSpec('servers', {'name': 3, 'ipAddress': 3, 'tags': 1}, 'name', 'ipAddress'),
+    'NccDomains': SearchSpec('domains', {'name': 3}, 'name', 'registrar'),
+    'NccEmails': SearchSpec('emails', {'email': 3, 'displayName': 2}, 'email', 'displayName'),
+    'NccRepositories': SearchSpec('repositories', {'name': 3}, 'name', 'provider'),
+    'NccStorage': SearchSpec('storage', {'name': 3}, 'name', 'provider'),
+}
+
+# Rough tokens per document, to weigh reading postings against reading documents
+TOKENS_PER_DOCUMENT = 8
+
+# Most candidates scored per query. Candidates are visited closest match
+# first, so this only trims the tail of very broad queries ('a', 'prod');
+# the reported total is always exact.
+MAX_SCORED = 250
+
+class SearchIndex:
+    """
+    Thread-safe inverted index of (table, id) documents
+
+    Documents get small integer numbers; postings map each token to the
+    numbers of the documents containing it, and each document keeps its
+    tokens with their weight per character for scoring.
+    Separator-free tokens are also kept sorted in `_terms`, so every
+    document matching a query word is a bisect range away; whole values
+    with separators ('10.0.1.5', 'web-prod-01') are kept sorted apart in
+    `_values` and only rank matches, so they never widen a word's range.
+    Writes that land while the initial scan runs are recorded, and the scan
+    never overwrites them with older data. After reconnecting to the cache
+    server (updates sent meanwhile never arrived) the next search rebuilds
+    the index.
+    """
+
+    def __init__(self, specs: Dict[str, SearchSpec]):
+        self.specs = specs
+        self._max_weight = max(weight for spec in specs.values() for weight in spec.fields.values())
+        self._numbers: Dict[DocKey, int] = {}
+        self._docs: Dict[int, Tuple[DocKey, Dict[str, float], str, Optional[str]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._terms: List[str] = []
+        self._values: List[str] = []
+        self._next_number = 0
+        self._lock = threading.Lock()
+        self._building = False
+        self._touched: Set[DocKey] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stale = False
+        cluster.on('search', self._apply)
+        cluster.on_connect(self._rejoined)
+
+    # ----- maintenance (callers hold the lock) -----
+
+    def _sorted_for(self, token: str) -> List[str]:
+        return self._values if _SEPARATORS.search(token) else self._terms
+
+    def _add(self, key: DocKey, spec: SearchSpec, item: Dict[str, Any]) -> None:
+        self._discard(key)
+        number = self._next_number
+        self._next_number += 1
+        densities = {token: weight / len(token) for token, weight in spec.tokens(item).items()}
+        subtitle = item.get(spec.subtitle) if spec.subtitle else None
+        self._numbers[key] = number
+        self._docs[number] = (key, densities, str(item.get(spec.title) or key[1]), subtitle)
+        for token in densities:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                # The initial build sorts all tokens once at the end
+                if not self._building:
+                    bisect.insort(self._sorted_for(token), token)
+            posting.add(number)
+
+    def _discard(self, key: DocKey) -> None:
+        number = self._numbers.pop(key, None)
+        if number is None:
+            return
+        for token in self._docs.pop(number)[1]:
+            posting = self._postings[token]
+            posting.discard(number)
+            if not posting:
+                del self._postings[token]
+                if not self._building:
+                    ordered = self._sorted_for(token)
+                    del ordered[bisect.bisect_left(ordered, token)]
+
+    def _sort_tokens(self) -> None:
+        self._terms = sorted(token for token in self._postings if not _SEPARATORS.search(token))
+        self._values = sorted(token for token in self._postings if _SEPARATORS.search(token))
+
+    # ----- write hooks -----
+
+    def update(self, table_name: str, items: Iterable[Dict[str, Any]]) -> None:
+        """(Re)index API-shaped items just written to `table_name`, here and in the other workers"""
+        spec = self.specs.get(table_name)
+        if spec is None:
+            return
+        items = list(items)
+        if items and cluster.connected:
+            cluster.send('search', table_name, 'update', [{name: item.get(name) for name in spec.attributes} for item in items])
+        self._update(table_name, items)
+
+    def remove(self, table_name: str, ids: Iterable[str]) -> None:
+        """Drop items just deleted from `table_name`, here and in the other workers"""
+        if table_name not in self.specs:
+            return
+        ids = list(ids)
+        if ids and cluster.connected:
+            cluster.send('search', table_name, 'remove', ids)
+        self._remove(table_name, ids)
+
+    def _apply(self, table_name: str, action: str, payload: List[Any]) -> None:
+        """Another worker's `update` or `remove`"""
+        if action == 'update':
+            self._update(table_name, payload)
+        else:
+            self._remove(table_name, payload)
+
+    def _rejoined(self, snapshot: Dict[str, Any]) -> None:
+        if self._task is not None:
+            self._stale = True
+
+    def _update(self, table_name: str, items: Iterable[Dict[str, Any]]) -> None:
+        spec = self.specs.get(table_name)
+        # Before the build starts there is nothing to maintain: its scan will see the write
+        if spec is None or self._task is None:
+            return
+        with self._lock:
+            for item in items:
+                key = (table_name, item['id'])
+                if self._building:
+                    self._touched.add(key)
+                self._add(key, spec, item)
+
+    def _remove(self, table_name: str, ids: Iterable[str]) -> None:
+        if table_name not in self.specs or self._task is None:
+            return
+        with self._lock:
+            for item_id in ids:
+                key = (table_name, item_id)
+                if self._building:
+                    self._touched.add(key)
+                self._discard(key)
+
+    # ----- initial build -----
+
+    async def _build(self, repositories: List[Any]) -> None:
+        """Index every item of every searchable repository's table (projected parallel scans)"""
+        with self._lock:
+            self._building = True
+            self._touched.clear()
+            # A rebuild starts from nothing, so items deleted meanwhile go too
+            self._numbers.clear()
+            self._docs.clear()
+            self._postings.clear()
+        try:
+            for repository in repositories:
+                spec = self.specs.get(repository.table_name)
+                if spec is None:
+                    continue
+                attributes = spec.attributes
+                params = {
+                    'ProjectionExpression': ', '.join(f'#a{i}' for i in range(len(attributes))),
+                    'ExpressionAttributeNames': {f'#a{i}': name for i, name in enumerate(attributes)}
+                }
+                async for page in parallel_scan(repository.table, settings.SCAN_SEGMENTS, params, repository.scan_limiter):
+                    with self._lock:
+                        for item in page:
+                            key = (repository.table_name, item['id'])
+                            if key not in self._touched:
+                                self._add(key, spec, item)
+        finally:
+            with self._lock:
+                self._sort_tokens()
+                self._building = False
+                self._touched.clear()
+
+    def start(self, repositories: List[Any]) -> asyncio.Task:
+        """Start (or restart after a failure, or when stale) the background build; returns its task"""
+        if self._task is None or (self._task.done() and (self._task.exception() is not None or self._stale)):
+            self._stale = False
+            self._task = asyncio.create_task(self._build(repositories))
+        return self._task
+
+    async def ready(self, repositories: List[Any]) -> None:
+        """Wait until the initial build has finished, starting it if needed; raises if it failed"""
+        task = self.start(repositories)
+        if not task.done():
+            await asyncio.shield(task)
+        task.result()
+
+    # ----- queries (callers hold the lock) -----
+
+    @staticmethod
+    def _prefixed(ordered: List[str], prefix: str) -> List[str]:
+        start = bisect.bisect_left(ordered, prefix)
+        return ordered[start:bisect.bisect_right(ordered, prefix + '\uffff', start)]
+
+    def _volume(self, tokens: List[str], cap: float) -> float:
+        """Postings behind `tokens`, counted only up to `cap`"""
+        volume = 0
+        for token in tokens:
+            volume += len(self._postings[token])
+            if volume >= cap:
+                break
+        return volume
+
+    def _matching(self, tokens: List[str]) -> Set[int]:
+        """Documents holding any of `tokens` (the union runs in C)"""
+        if len(tokens) == 1:
+            return set(self._postings[tokens[0]])
+        return set().union(*(self._postings[token] for token in tokens))
+
+    def _score(self, number: int, prefixes: List[str]) -> float:
+        """
+        Sum over `prefixes` of the best token each one starts: the token's
+        weight, scaled by how much of the token the prefix covers
+        """
+        total = 0.0
+        densities = self._docs[number][1].items()
+        for prefix in prefixes:
+            best = 0.0
+            for token, density in densities:
+                if density > best and token.startswith(prefix):
+                    best = density
+            total += best * len(prefix)
+        return total
+
+    def search(self, query: str, limit: int, tables: Optional[Set[str]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Documents where every word of `query` prefixes one of their words
+
+        Ranked by summed word scores, plus a bonus when the whole query
+        prefixes a whole value (an IP, an address, a hyphenated name).
+        Returns the top `limit` hits and the number of matches.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+        phrase, words = tokens[0], tokens[1:] or tokens[:1]
+        with self._lock:
+            ranges = {word: self._prefixed(self._terms, word) for word in words}
+            if not all(ranges.values()):
+                return [], 0
+            # Start from the word with the fewest postings; narrow with the
+            # others through their postings, or through the remaining
+            # documents' own tokens when those are fewer
+            driver, fewest = words[0], float('inf')
+            for word in sorted(words, key=lambda word: len(ranges[word])):
+                volume = self._volume(ranges[word], fewest)
+                if volume < fewest:
+                    driver, fewest = word, volume
+            matches = self._matching(ranges[driver])
+            for word in words:
+                if word == driver or not matches:
+                    continue
+                budget = len(matches) * TOKENS_PER_DOCUMENT
+                if self._volume(ranges[word], budget) < budget:
+                    matches &= self._matching(ranges[word])
+                else:
+                    matches = {
+                        number for number in matches
+                        if any(token.startswith(word) for token in self._docs[number][1])
+                    }
+            if tables is not None:
+                matches = {number for number in matches if self._docs[number][0][0] in tables}
+            if not matches:
+                return [], 0
+
+            prefixes = list(words)
+            if len(tokens) > 1 and self._prefixed(self._values, phrase):
+                prefixes.append(phrase)
+            # Walk the driver's tokens from the closest match outwards and
+            # stop once no later document can beat the current top `limit`
+            # (or MAX_SCORED documents have been scored)
+            headroom = self._max_weight * (len(prefixes) - 1)
+            top: List[Tuple[float, int]] = []  # min-heap of (score, -number)
+            seen: Set[int] = set()
+            for token in sorted(ranges[driver], key=len):
+                ceiling = self._max_weight * len(driver) / len(token) + headroom
+                if len(top) >= limit and top[0][0] >= ceiling:
+                    break
+                if len(seen) >= MAX_SCORED:
+                    break
+                for number in self._postings[token]:
+                    if number in seen or number not in matches:
+                        continue
+                    if (len(top) >= limit and top[0][0] >= ceiling) or len(seen) >= MAX_SCORED:
+                        break
+                    seen.add(number)
+                    entry = (self._score(number, prefixes), -number)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+
+            hits = []
+            for score, number in sorted(top, reverse=True):
+                (table_name, item_id), _, title, subtitle = self._docs[-number]
+                hits.append({
+                    'resource': self.specs[table_name].resource,
+                    'id': item_id,
+                    'title': title,
+                    'subtitle': subtitle,
+                    'score': round(score, 3),
+                })
+        return hits, len(matches)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size, for sizing and health checks"""
+        with self._lock:
+            return {
+                'documents': len(self._docs),
+                'tokens': len(self._postings),
+                'building': self._building,
+            }
+
+search_index = SearchIndex(TABLE_SEARCH)
@@ -0,0 +1,175 @@
+"""
+Production Server
+Runs the API in WORKERS processes (one per CPU by default) that accept
+from one shared listening socket. The app is imported once, here, and the
+workers are forked from this process, so each starts with every module,
+model and route already loaded; what belongs to one worker (its event
+loop, DynamoDB thread pool and search index) is created after the fork.
+A worker that exits is replaced; SIGTERM or SIGINT stops the workers
+gracefully.
+
+With CACHE_BACKEND=socket and no CACHE_ADDRESS this also forks the cache
+server (app/cache_server.py) on a Unix socket before the workers, and
+replaces it too if it exits. See app/cluster.py for what workers share.
+
+Usage:
+    python -m app.serve
+    CACHE_BACKEND=socket python -m app.serve --workers 8 --port 8000
+"""
+import argparse
+import logging
+import os
+import random
+import secrets
+import signal
+import tempfile
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from typing import Callable, Dict, Tuple
+import uvicorn
+from app.cache_server import CacheServer
+from app.config import settings
+from app.executor import configure_executor
+from app.main import app
+
+logger = logging.getLogger('app.serve')
+
+WORKER, CACHE_SERVER = 'worker', 'cache server'
+
+# Pause before replacing a process that exited, so a crash loop does not spin
+RESTART_DELAY_SECONDS = 1.0
+
+# How long to wait for a cache server this process started to accept connections
+CACHE_SERVER_STARTUP_SECONDS = 10.0
+
+def worker_count() -> int:
+    """WORKERS, or one per CPU this process may run on"""
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available outside Linux
+        return os.cpu_count() or 1
+
+class Supervisor:
+    """Forks the cache server and the workers, replaces any that exit, and stops them all on SIGTERM / SIGINT"""
+
+    def __init__(self):
+        self.children: Dict[int, Tuple[str, Callable[[], None]]] = {}  # pid -> (role, what it runs)
+        self.stopping = False
+
+    def spawn(self, role: str, run: Callable[[], None]) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                # A process group of its own, so a terminal's Ctrl+C reaches only
+                # the supervisor, which stops the workers before the cache server
+                os.setpgid(0, 0)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                random.seed()
+                run()
+                code = 0
+            except BaseException:
+                logger.exception("%s failed", role)
+            finally:
+                os._exit(code)
+        self.children[pid] = (role, run)
+        logger.info("Started %s (pid %d)", role, pid)
+        return pid
+
+    def _signal(self, role: str, signum: int) -> None:
+        for pid, (child_role, _) in list(self.children.items()):
+            if child_role == role:
+                try:
+                    os.kill(pid, signum)
+                except ProcessLookupError:
+                    pass
+
+    def stop(self, signum=None, frame=None) -> None:
+        if not self.stopping:
+            logger.info("Stopping workers")
+        self.stopping = True
+        self._signal(WORKER, signal.SIGTERM)
+
+    def run(self) -> None:
+        """Supervise until stopped and every child has exited"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.children:
+            if self.stopping and all(role == CACHE_SERVER for role, _ in self.children.values()):
+                # The workers are done with it
+                self._signal(CACHE_SERVER, signal.SIGTERM)
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            role, run = self.children.pop(pid, (None, None))
+            if role is None or self.stopping:
+                continue
+            logger.warning("%s (pid %d) exited with status %d; replacing it", role, pid, os.waitstatus_to_exitcode(status))
+            time.sleep(RESTART_DELAY_SECONDS)
+            self.spawn(role, run)
+
+def wait_for_cache_server(address: str, authkey: bytes) -> None:
+    deadline = time.monotonic() + CACHE_SERVER_STARTUP_SECONDS
+    while True:
+        try:
+            Client(address, authkey=authkey).close()
+            return
+        except (OSError, EOFError, AuthenticationError):
+            if time.monotonic() > deadline:
+                raise SystemExit(f"The cache server did not start listening on {address}")
+            time.sleep(0.05)
+
+def serve(host: str, port: int, workers: int) -> None:
+    """Run `workers` forked workers (and the cache server, when needed) until SIGTERM / SIGINT"""
+    supervisor = Supervisor()
+    own_address = None
+    if settings.CACHE_BACKEND == 'socket' and not settings.CACHE_ADDRESS:
+        # Set before forking, so every worker inherits them
+        own_address = settings.CACHE_ADDRESS = os.path.join(tempfile.gettempdir(), f'ncc-cache-{os.getpid()}.sock')
+        settings.CACHE_AUTHKEY = settings.CACHE_AUTHKEY or secrets.token_hex(16)
+        authkey = settings.CACHE_AUTHKEY.encode()
+        supervisor.spawn(CACHE_SERVER, lambda: CacheServer(own_address, authkey).serve_forever())
+        wait_for_cache_server(own_address, authkey)
+    elif settings.CACHE_BACKEND != 'socket' and workers > 1:
+        logger.warning(
+            "CACHE_BACKEND=local with %d workers: each keeps its own entity cache, change markers, "
+            "events and search index (set CACHE_BACKEND=socket to share them)", workers
+        )
+    if settings.DB_BACKEND == 'memory' and workers > 1:
+        logger.warning("DB_BACKEND=memory with %d workers: each writes to its own copy of the tables", workers)
+
+    # Built once here rather than by every worker on its first /docs request
+    app.openapi()
+    config = uvicorn.Config(app, host=host, port=port, log_level=settings.LOG_LEVEL.lower())
+    sock = config.bind_socket()
+
+    def run_worker():
+        # Threads do not survive a fork: give the worker a DynamoDB pool of its own
+        configure_executor(settings.DB_EXECUTOR_WORKERS)
+        uvicorn.Server(config).run(sockets=[sock])
+
+    for _ in range(workers):
+        supervisor.spawn(WORKER, run_worker)
+    logger.info("Serving on http://%s:%d with %d workers", host, port, workers)
+    try:
+        supervisor.run()
+    finally:
+        sock.close()
+        if own_address and os.path.exists(own_address):
+            os.unlink(own_address)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=worker_count(), help="Worker processes (default: WORKERS, else one per CPU)")
+    args = parser.parse_args()
+    serve(args.host, args.port, max(1, args.workers))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Precomputed Resource Summaries
+Counts by enum-like attributes and sums of numeric attributes, kept in one
+stats item per table (NccStats) and adjusted with atomic ADDs on every
+write, so a dashboard reads a handful of items instead of scanning tables
+"""
+from collections import defaultdict
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+STATS_TABLE = 'NccStats'
+
+class SummarySpec:
+    """Which attributes of a table are counted by value and which are summed"""
+
+    def __init__(self, count_by: List[str], sum_of: Optional[List[str]] = None):
+        self.count_by = count_by
+        self.sum_of = sum_of or []
+
+    def contributions(self, item: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """What one API-shaped item adds to the stats item"""
+        if not item:
+            return {}
+        counters: Dict[str, Any] = {'total': 1}
+        for field in self.count_by:
+            value = item.get(field)
+            if value is None:
+                continue
+            if isinstance(value, Enum):
+                value = value.value
+            counters[f'count:{field}:{value}'] = 1
+        for field in self.sum_of:
+            value = item.get(field)
+            if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                counters[f'sum:{field}'] = value
+        return counters
+
+    def delta(self, changes: Iterable[Tuple[Optional[Dict], Optional[Dict]]]) -> Dict[str, Any]:
+        """Net counter changes for a set of (old, new) item pairs; None means absent"""
+        totals: Dict[str, Any] = defaultdict(int)
+        for old, new in changes:
+            for name, value in self.contributions(new).items():
+                totals[name] += value
+            for name, value in self.contributions(old).items():
+                totals[name] -= value
+        # Round float sums so repeated +x/-x does not accumulate noise
+        return {
+            name: round(value, 6) if isinstance(value, float) else value
+            for name, value in totals.items() if value
+        }
+
+    def summarize(self, stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Shape a stats item (already converted from Decimal) as a ResourceSummary"""
+        stats = stats or {}
+        counts: Dict[str, Dict[str, int]] = {field: {} for field in self.count_by}
+        sums: Dict[str, Any] = {field: 0 for field in self.sum_of}
+        for name, value in stats.items():
+            kind, _, rest = name.partition(':')
+            if kind == 'count' and value:
+                field, _, bucket = rest.partition(':')
+                if field in counts:
+                    counts[field][bucket] = value
+            elif kind == 'sum' and rest in sums:
+                sums[rest] = value
+        return {'total': stats.get('total', 0), 'counts': counts, 'sums': sums}
+
+# Counters kept per table
+TABLE_SUMMARIES: Dict[str, SummarySpec] = {
+    'NccServers': SummarySpec(['status', 'category']),
+    'NccDomains': SummarySpec(['status', 'registrar'], ['cost']),
+    'NccEmails': SummarySpec(['status', 'provider'], ['quotaUsed', 'quotaLimit']),
+    'NccRepositories': SummarySpec(['provider', 'visibility', 'ciStatus'], ['openIssues']),
+    'NccStorage': SummarySpec(['provider', 'type'], ['usageBytes', 'capacityBytes']),
+}
@@ -0,0 +1,99 @@
+"""
+Backfill Script - Populate GSI_SslExpiry on existing domains
+
+Domains now also store their certificate's `ssl.status` / `ssl.validTo` as
+top-level sslStatus / sslValidTo, the keys of GSI_SslExpiry behind
+GET /domains/ssl/expiring. This adds the index to an existing NccDomains
+table if it is missing, then copies the two attributes onto every domain
+that has a certificate with a validTo date. Safe to re-run.
+
+Usage:
+    python scripts/backfill_ssl_index.py [--dry-run]
+"""
+import argparse
+import boto3
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+INDEX_NAME = 'GSI_SslExpiry'
+
+def ensure_index(client, dry_run=False):
+    """Create GSI_SslExpiry on NccDomains unless it already exists"""
+    table = client.describe_table(TableName='NccDomains')['Table']
+    if any(index['IndexName'] == INDEX_NAME for index in table.get('GlobalSecondaryIndexes', [])):
+        print(f"✓ Index '{INDEX_NAME}' already exists")
+        return
+    print(f"{'Would create' if dry_run else 'Creating'} index '{INDEX_NAME}'...")
+    if dry_run:
+        return
+    index = {
+        'IndexName': INDEX_NAME,
+        'KeySchema': [{'AttributeName': 'sslStatus', 'KeyType': 'HASH'}, {'AttributeName': 'sslValidTo', 'KeyType': 'RANGE'}],
+        'Projection': {'ProjectionType': 'ALL'}
+    }
+    if table.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+        index['ProvisionedThroughput'] = {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    client.update_table(
+        TableName='NccDomains',
+        AttributeDefinitions=[
+            {'AttributeName': 'sslStatus', 'AttributeType': 'S'},
+            {'AttributeName': 'sslValidTo', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexUpdates=[{'Create': index}]
+    )
+    print(f"✓ Index '{INDEX_NAME}' requested (it backfills in the background)")
+
+def backfill_ssl_index(dry_run=False):
+    """Copy ssl.status / ssl.validTo to the index keys of every domain with a certificate"""
+    dynamodb = boto3.resource('dynamodb',
+                              region_name=os.getenv('AWS_DEFAULT_REGION'),
+                              aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                              aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
+    ensure_index(dynamodb.meta.client, dry_run)
+    domains = dynamodb.Table('NccDomains')
+
+    params = {
+        'FilterExpression': 'attribute_exists(ssl)',
+        'ProjectionExpression': 'id, ssl, sslStatus, sslValidTo'
+    }
+    updated = 0
+    current = 0
+    while True:
+        response = domains.scan(**params)
+        for domain in response.get('Items', []):
+            ssl = domain.get('ssl')
+            if not isinstance(ssl, dict) or not ssl.get('status') or not ssl.get('validTo'):
+                # Index keys cannot be empty strings: leave the domain out of the index
+                if 'sslStatus' in domain or 'sslValidTo' in domain:
+                    print(f"  {domain['id']}: no validTo date, removing from the index")
+                    if not dry_run:
+                        domains.update_item(Key={'id': domain['id']}, UpdateExpression='REMOVE sslStatus, sslValidTo')
+                    updated += 1
+                continue
+            if domain.get('sslStatus') == ssl['status'] and domain.get('sslValidTo') == ssl['validTo']:
+                current += 1
+                continue
+            print(f"  {domain['id']}: {ssl['status']} until {ssl['validTo']}")
+            if not dry_run:
+                domains.update_item(
+                    Key={'id': domain['id']},
+                    UpdateExpression='SET sslStatus = :status, sslValidTo = :valid_to',
+                    ExpressionAttributeValues={':status': ssl['status'], ':valid_to': ssl['validTo']}
+                )
+            updated += 1
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    action = 'Would update' if dry_run else 'Updated'
+    print(f"\n✅ {action} {updated} domains ({current} already current)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing")
+    backfill_ssl_index(parser.parse_args().dry_run)
@@ -0,0 +1,341 @@
+"""
+API Benchmark - throughput and p50/p95/p99 per endpoint, fully offline
+
+Seeds the in-memory DynamoDB stand-in (DB_BACKEND=memory) with --rows
+items per resource, then drives every route in-process (list, filtered
+list, get, create, update, delete, bulk, batch-get, summary, export,
+search, expiring domains / certificates, DNS records and import) with a
+weighted random mix from --concurrency closed-loop clients. The seed and
+request mix are fixed by --seed, so runs are comparable.
+
+Usage:
+    python scripts/benchmark_api.py --rows 2000 --requests 5000 --concurrency 1 16 64
+    python scripts/benchmark_api.py --json results.json
+    python scripts/benchmark_api.py --baseline results.json --tolerance 20
+
+With --baseline, endpoints whose p95 grew by more than --tolerance
+percent (and at least 1 ms) are listed and the exit status is 1, so the
+script can gate CI. --latency-ms adds a simulated DynamoDB round trip to
+every call. GET /events (long-lived streams) is not part of the mix.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ['DB_BACKEND'] = 'memory'
+# httpx logs every request at INFO, which would be timed too
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import httpx
+from app import database
+from app.cache import entity_cache
+from app.config import settings
+from app.executor import configure_executor
+from app.main import app
+from app.models import (
+    CIStatus, DomainStatus, DomainCreate, EmailCreate, EmailStatus, RepoVisibility, RepositoryCreate,
+    ServerCategory, ServerCreate, ServerStatus, SSLStatus, StorageCreate, StorageType
+)
+from app.routers import domains, emails, repositories, servers, storage
+
+PREFIX = settings.API_V1_PREFIX
+TODAY = date.today()
+
+def _day(offset: int) -> str:
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+def new_server(rng: random.Random, n: int) -> dict:
+    return {
+        'name': f'bench-srv-{n:06d}', 'ipAddress': f'10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}',
+        'os': rng.choice(['Ubuntu 22.04 LTS', 'Debian 12', 'Windows Server 2022']),
+        'specs': {'cpu': rng.choice(['2 vCPU', '4 vCPU', '8 vCPU']), 'ram': '16GB', 'storage': '250GB SSD'},
+        'location': rng.choice(['ap-south-1', 'ap-south-2', 'us-east-1']), 'provider': rng.choice(['AWS', 'Azure', 'GCP']),
+        'status': rng.choice(list(ServerStatus)).value, 'category': rng.choice(list(ServerCategory)).value,
+        'responsibleTeam': rng.choice(['Platform', 'QA', 'Backend']), 'lastPatchDate': _day(-rng.randrange(180)),
+        'tags': rng.sample(['web', 'api', 'db', 'cache', 'batch'], 2)
+    }
+
+def new_domain(rng: random.Random, n: int) -> dict:
+    domain = {
+        'name': f'bench-{n:06d}.example.com', 'registrar': rng.choice(['GoDaddy', 'Namecheap', 'Cloudflare']),
+        'registrationDate': _day(-rng.randrange(2000)), 'expiryDate': _day(rng.randrange(-30, 730)),
+        'autoRenew': rng.random() < 0.5, 'owner': 'IT', 'status': rng.choice(list(DomainStatus)).value,
+        'cost': round(rng.uniform(5, 50), 2),
+        'dnsRecords': [{'type': 'A', 'name': '@', 'value': f'203.0.113.{n % 256}', 'ttl': 300}]
+    }
+    if rng.random() < 0.8:
+        domain['ssl'] = {'issuer': "Let's Encrypt", 'validFrom': _day(-60), 'validTo': _day(rng.randrange(-10, 365)),
+                         'status': rng.choice(list(SSLStatus)).value}
+    return domain
+
+def new_email(rng: random.Random, n: int) -> dict:
+    return {
+        'email': f'bench.user{n:06d}@ncc-tech.com', 'displayName': f'Bench User {n}',
+        'provider': rng.choice(['Zoho Mail', 'Google Workspace', 'Microsoft 365']),
+        'status': rng.choice(list(EmailStatus)).value, 'department': rng.choice(['IT', 'HR', 'Sales']),
+        'quotaLimit': rng.choice([5120, 10240, 51200]), 'createdDate': _day(-rng.randrange(1000))
+    }
+
+def new_repository(rng: random.Random, n: int) -> dict:
+    return {
+        'name': f'bench-repo-{n:06d}', 'url': f'https://github.com/ncc/bench-repo-{n:06d}',
+        'provider': rng.choice(['GitHub', 'GitLab', 'Bitbucket']), 'language': rng.choice(['Python', 'TypeScript', 'Go', 'Java']),
+        'visibility': rng.choice(list(RepoVisibility)).value, 'ownerTeam': rng.choice(['Backend', 'Frontend', 'Platform']),
+        'ciStatus': rng.choice(list(CIStatus)).value
+    }
+
+def new_storage(rng: random.Random, n: int) -> dict:
+    return {
+        'name': f'bench-bucket-{n:06d}', 'provider': rng.choice(['AWS S3', 'GCP', 'Azure Blob']),
+        'type': rng.choice(list(StorageType)).value, 'region': rng.choice(['ap-south-1', 'us-east-1']),
+        'capacityBytes': rng.choice([10 ** 9, 10 ** 10, 10 ** 11])
+    }
+
+# resource -> (sample builder, create model, repository builder, batch writer, GSI filter, partial update)
+RESOURCES = {
+    'servers': (new_server, ServerCreate, servers._new_server, servers.db.batch_write,
+                lambda rng: {'status': rng.choice(list(ServerStatus)).value}, lambda rng: {'status': rng.choice(list(ServerStatus)).value}),
+    'domains': (new_domain, DomainCreate, domains._new_domain, domains._write_domains,
+                lambda rng: {'registrar': rng.choice(['GoDaddy', 'Namecheap', 'Cloudflare'])}, lambda rng: {'autoRenew': rng.random() < 0.5}),
+    'emails': (new_email, EmailCreate, emails._new_email, emails.db.batch_write,
+               lambda rng: {'provider': rng.choice(['Zoho Mail', 'Google Workspace'])}, lambda rng: {'department': rng.choice(['IT', 'HR'])}),
+    'repositories': (new_repository, RepositoryCreate, repositories._new_repository, repositories.db.batch_write,
+                     lambda rng: {'language': rng.choice(['Python', 'Go'])}, lambda rng: {'ciStatus': rng.choice(list(CIStatus)).value}),
+    'storage': (new_storage, StorageCreate, storage._new_storage, storage.db.batch_write,
+                lambda rng: {'type': rng.choice(list(StorageType)).value}, lambda rng: {'region': rng.choice(['ap-south-1', 'us-east-1'])}),
+}
+
+class State:
+    """Ids the request mix draws on: seeded items (never deleted) and items created during the run"""
+
+    def __init__(self):
+        self.seeded = {resource: [] for resource in RESOURCES}
+        self.created = {resource: [] for resource in RESOURCES}
+        self.dns_records = []  # (domain id, record id) added during the run
+        self.serial = 10 ** 6
+
+    def next_serial(self) -> int:
+        self.serial += 1
+        return self.serial
+
+async def seed(state: State, rows: int, rng: random.Random) -> None:
+    """Write `rows` items per resource through the repositories (so summaries and DNS items exist too)"""
+    for resource, (sample, create_model, build, write, _, _) in RESOURCES.items():
+        for start in range(0, rows, 500):
+            items = [build(create_model.model_validate(sample(rng, n))) for n in range(start, min(start + 500, rows))]
+            state.seeded[resource].extend(item['id'] for item in items)
+            failed = await write(items, [])
+            if failed:
+                raise RuntimeError(f"Seeding {resource} left {len(failed)} items unwritten")
+
+# A required field per resource for the order_by mix
+SORT_FIELDS = {'servers': 'name', 'domains': 'name', 'emails': 'email', 'repositories': 'name', 'storage': 'name'}
+
+def build_mix(state: State):
+    """(endpoint, weight, request builder) for every route; builders return (method, path, kwargs) or None"""
+    mix = []
+
+    def add(name, weight):
+        def register(builder):
+            mix.append((name, weight, builder))
+            return builder
+        return register
+
+    for resource, (sample, _, _, _, gsi_filter, update) in RESOURCES.items():
+        base = f'{PREFIX}/{resource}'
+
+        def some_id(rng, resource=resource):
+            return rng.choice(state.seeded[resource])
+
+        add(f'GET /{resource}/', 4)(lambda rng, base=base: ('GET', f'{base}/', {'params': {'limit': 50}}))
+        add(f'GET /{resource}/?filter', 3)(
+            lambda rng, base=base, gsi_filter=gsi_filter: ('GET', f'{base}/', {'params': {**gsi_filter(rng), 'limit': 50}}))
+        add(f'GET /{resource}/?order_by', 2)(
+            lambda rng, base=base, order_by=SORT_FIELDS[resource]: ('GET', f'{base}/', {
+                'params': {'order_by': order_by, 'direction': rng.choice(['asc', 'desc']), 'limit': 50}}))
+        add(f'GET /{resource}/{{id}}', 8)(lambda rng, base=base, some_id=some_id: ('GET', f'{base}/{some_id(rng)}', {}))
+        add(f'POST /{resource}/', 2)(
+            lambda rng, base=base, sample=sample: ('POST', f'{base}/', {'json': sample(rng, state.next_serial())}))
+        add(f'PUT /{resource}/{{id}}', 2)(
+            lambda rng, base=base, some_id=some_id, update=update: ('PUT', f'{base}/{some_id(rng)}', {'json': update(rng)}))
+
+        @add(f'DELETE /{resource}/{{id}}', 1)
+        def delete(rng, base=base, resource=resource):
+            created = state.created[resource]
+            return ('DELETE', f'{base}/{created.pop(rng.randrange(len(created)))}', {}) if created else None
+
+        add(f'POST /{resource}/batch-get', 1)(
+            lambda rng, base=base, resource=resource: ('POST', f'{base}/batch-get', {'json': {'ids': rng.sample(state.seeded[resource], 20)}}))
+        add(f'POST /{resource}/bulk', 0.5)(
+            lambda rng, base=base, sample=sample: ('POST', f'{base}/bulk', {'json': {'create': [sample(rng, state.next_serial()) for _ in range(10)]}}))
+        add(f'GET /{resource}/summary', 1)(lambda rng, base=base: ('GET', f'{base}/summary', {}))
+        add(f'GET /{resource}/export', 0.05)(
+            lambda rng, base=base: ('GET', f'{base}/export', {'headers': {'Accept-Encoding': 'identity'}}))
+        add(f'POST /import/{resource}', 0.1)(
+            lambda rng, resource=resource, sample=sample: ('POST', f'{PREFIX}/import/{resource}', {
+                'content': '\n'.join(json.dumps(sample(rng, state.next_serial())) for _ in range(20)).encode()}))
+
+    add('GET /summary/', 1)(lambda rng: ('GET', f'{PREFIX}/summary/', {}))
+    add('GET /search/', 4)(lambda rng: ('GET', f'{PREFIX}/search/', {'params': {'q': rng.choice(['bench', 'web', 'api', 'python', 'bucket'])}}))
+    add('GET /domains/expiring', 1)(lambda rng: ('GET', f'{PREFIX}/domains/expiring', {'params': {'within': '90d'}}))
+    add('GET /domains/ssl/expiring', 1)(lambda rng: ('GET', f'{PREFIX}/domains/ssl/expiring', {'params': {'within': '30d'}}))
+    add('GET /domains/{id}/dns', 2)(lambda rng: ('GET', f"{PREFIX}/domains/{rng.choice(state.seeded['domains'])}/dns", {}))
+    add('POST /domains/{id}/dns', 1)(lambda rng: ('POST', f"{PREFIX}/domains/{rng.choice(state.seeded['domains'])}/dns", {
+        'json': {'type': 'TXT', 'name': '@', 'value': f'bench-{rng.randrange(10 ** 6)}', 'ttl': 300}}))
+
+    @add('PUT /domains/{id}/dns/{record_id}', 0.5)
+    def update_record(rng):
+        if not state.dns_records:
+            return None
+        domain_id, record_id = rng.choice(state.dns_records)
+        return ('PUT', f'{PREFIX}/domains/{domain_id}/dns/{record_id}', {'json': {'ttl': rng.choice([60, 300, 3600])}})
+
+    @add('DELETE /domains/{id}/dns/{record_id}', 0.5)
+    def delete_record(rng):
+        if not state.dns_records:
+            return None
+        domain_id, record_id = state.dns_records.pop(rng.randrange(len(state.dns_records)))
+        return ('DELETE', f'{PREFIX}/domains/{domain_id}/dns/{record_id}', {})
+
+    return mix
+
+def remember(state: State, name: str, path: str, response: httpx.Response) -> None:
+    """Keep ids of created items for the deletes and DNS record updates that follow"""
+    if response.status_code != 201:
+        return
+    if name == 'POST /domains/{id}/dns':
+        state.dns_records.append((path.split('/')[-2], response.json()['id']))
+    elif name.startswith('POST /') and name.endswith('/'):
+        state.created[name[len('POST /'):-1]].append(response.json()['id'])
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+async def run_level(client: httpx.AsyncClient, state: State, mix, total: int, concurrency: int, rng: random.Random) -> dict:
+    """`concurrency` clients send `total` requests between them; returns overall and per-endpoint stats"""
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    builders = {name: builder for name, _, builder in mix}
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    remaining = total
+
+    async def client_loop():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            request = None
+            while request is None:
+                name = rng.choices(names, weights)[0]
+                request = builders[name](rng)
+            method, path, kwargs = request
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            samples[name].append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors[name] += 1
+            remember(state, name, path, response)
+
+    entity_cache.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        if samples[name]:
+            p50, p95, p99 = percentiles(samples[name])
+            endpoints[name] = {'count': len(samples[name]), 'rps': len(samples[name]) / elapsed, 'errors': errors[name],
+                               'p50': p50, 'p95': p95, 'p99': p99}
+    p50, p95, p99 = percentiles([latency for values in samples.values() for latency in values])
+    return {'concurrency': concurrency, 'requests': total, 'seconds': elapsed, 'rps': total / elapsed,
+            'p50': p50, 'p95': p95, 'p99': p99, 'endpoints': endpoints}
+
+def print_level(result: dict) -> None:
+    print(f"\nconcurrency {result['concurrency']}: {result['requests']} requests in {result['seconds']:.1f}s, "
+          f"{result['rps']:.0f} req/s, p50 {result['p50']:.1f} / p95 {result['p95']:.1f} / p99 {result['p99']:.1f} ms")
+    print(f"{'endpoint':<40}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, stats in sorted(result['endpoints'].items()):
+        print(f"{name:<40}{stats['count']:>7}{stats['rps']:>9.1f}{stats['p50']:>9.2f}"
+              f"{stats['p95']:>9.2f}{stats['p99']:>9.2f}{stats['errors']:>8}")
+
+def regressions(results: list, baseline: dict, tolerance: float) -> list:
+    """(concurrency, endpoint, baseline p95, p95) where p95 grew past the tolerance"""
+    previous = {run['concurrency']: run['endpoints'] for run in baseline['runs']}
+    found = []
+    for run in results:
+        for name, stats in run['endpoints'].items():
+            before = previous.get(run['concurrency'], {}).get(name)
+            if not before or min(before['count'], stats['count']) < 20:
+                continue
+            if stats['p95'] > before['p95'] * (1 + tolerance / 100) and stats['p95'] - before['p95'] >= 1:
+                found.append((run['concurrency'], name, before['p95'], stats['p95']))
+    return found
+
+async def benchmark(args) -> list:
+    rng = random.Random(args.seed)
+    state = State()
+    database.dynamodb.latency = 0
+    started = time.perf_counter()
+    await seed(state, args.rows, rng)
+    print(f"Seeded {args.rows} rows per resource in {time.perf_counter() - started:.1f}s; "
+          f"{args.latency_ms:g} ms simulated round trip, {args.workers} DB threads")
+    database.dynamodb.latency = args.latency_ms / 1000
+
+    mix = build_mix(state)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        # One request per route first, so one-off costs (search index build, imports' process pool) stay out of the numbers
+        for name, _, builder in mix:
+            request = builder(rng)
+            if request:
+                method, path, kwargs = request
+                remember(state, name, path, await client.request(method, path, **kwargs))
+        for concurrency in args.concurrency:
+            result = await run_level(client, state, mix, args.requests, concurrency, rng)
+            print_level(result)
+            results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help="Items seeded per resource")
+    parser.add_argument('--requests', type=int, default=5000, help="Requests per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64], help="Concurrent clients")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Simulated DynamoDB round trip per call")
+    parser.add_argument('--workers', type=int, default=settings.DB_EXECUTOR_WORKERS, help="DB thread pool size")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, help="Write the results here")
+    parser.add_argument('--baseline', type=Path, help="Compare p95 per endpoint with an earlier --json file")
+    parser.add_argument('--tolerance', type=float, default=20, help="Allowed p95 growth over the baseline, percent")
+    args = parser.parse_args()
+
+    configure_executor(args.workers)
+    results = asyncio.run(benchmark(args))
+    if args.json:
+        config = {name: getattr(args, name) for name in ('rows', 'requests', 'latency_ms', 'workers', 'seed')}
+        args.json.write_text(json.dumps({'config': config, 'runs': results}, indent=2))
+        print(f"\n✅ Results written to {args.json}")
+    if args.baseline:
+        found = regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for concurrency, name, before, after in found:
+            print(f"❌ {name} at concurrency {concurrency}: p95 {before:.2f} -> {after:.2f} ms")
+        if found:
+            sys.exit(1)
+        print(f"\n✅ No endpoint's p95 grew more than {args.tolerance:g}% over {args.baseline}")
+
+if __name__ == '__main__':
+    main()
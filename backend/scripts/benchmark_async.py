@@ -0,0 +1,148 @@
+"""
+Event Loop Benchmark - p99 latency under concurrent mixed traffic
+
+Runs the FastAPI app in-process against the in-memory DynamoDB stand-in
+(DB_BACKEND=memory), which blocks every call for a fixed round-trip time
+(--latency-ms, as MEMORY_LATENCY_MS), first with boto3 calls running
+inline on the event loop (the old behaviour) and then on the DynamoDB
+thread pool.
+
+Usage:
+    python scripts/benchmark_async.py --requests 400 --rate 200 --latency-ms 20
+
+Requests arrive on a fixed schedule (open loop), and latency is measured
+from each request's scheduled arrival, so queueing behind a blocked event
+loop shows up in the percentiles.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ['DB_BACKEND'] = 'memory'
+# httpx logs every request at INFO, which would be timed too
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import httpx
+from app import database
+from app.cache import entity_cache
+from app.config import settings
+from app.executor import configure_executor
+from app.main import app
+from app.models import DomainCreate, EmailCreate, RepositoryCreate, ServerCreate, StorageCreate
+from app.routers import domains, emails, repositories, servers, storage
+
+SAMPLES = {
+    'servers': {
+        'name': 'bench-srv', 'ipAddress': '10.0.0.1', 'os': 'Ubuntu 22.04 LTS',
+        'specs': {'cpu': '4 vCPU', 'ram': '16GB', 'storage': '250GB SSD'},
+        'location': 'ap-south-2', 'provider': 'AWS', 'status': 'online',
+        'category': 'testing', 'responsibleTeam': 'QA', 'lastPatchDate': '2024-12-07', 'tags': ['bench']
+    },
+    'domains': {
+        'name': 'bench.example.com', 'registrar': 'GoDaddy', 'registrationDate': '2023-01-01',
+        'expiryDate': '2026-01-01', 'autoRenew': True, 'owner': 'IT', 'status': 'active'
+    },
+    'emails': {
+        'email': 'bench@ncc-tech.com', 'displayName': 'Bench', 'provider': 'Zoho Mail',
+        'status': 'active', 'department': 'IT', 'quotaLimit': 10240, 'createdDate': '2024-01-01'
+    },
+    'repositories': {
+        'name': 'bench-repo', 'url': 'https://github.com/ncc/bench', 'provider': 'GitHub',
+        'language': 'Python', 'visibility': 'private', 'ownerTeam': 'Backend'
+    },
+    'storage': {
+        'name': 'bench-bucket', 'provider': 'AWS S3', 'type': 'object',
+        'region': 'ap-south-1', 'capacityBytes': 1073741824
+    },
+}
+
+# resource -> (create model, repository builder, batch writer)
+BUILDERS = {
+    'servers': (ServerCreate, servers._new_server, servers.db.batch_write),
+    'domains': (DomainCreate, domains._new_domain, domains._write_domains),
+    'emails': (EmailCreate, emails._new_email, emails.db.batch_write),
+    'repositories': (RepositoryCreate, repositories._new_repository, repositories.db.batch_write),
+    'storage': (StorageCreate, storage._new_storage, storage.db.batch_write),
+}
+
+async def install_tables(latency: float, rows: int) -> None:
+    """Empty the stand-in, seed `rows` items per resource, then turn on the round-trip delay"""
+    database.dynamodb.latency = 0
+    database.dynamodb.clear()
+    entity_cache.clear()
+    for name, (create_model, build, write) in BUILDERS.items():
+        items = []
+        for i in range(rows):
+            item = build(create_model.model_validate(SAMPLES[name]))
+            item['id'] = f'{name}-{i:05d}'
+            items.append(item)
+        if await write(items, []):
+            raise RuntimeError(f"Seeding {name} left items unwritten")
+    database.dynamodb.latency = latency
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_load(total: int, rate: float, rows: int) -> dict:
+    """Fire a mix of list/get/create requests and collect latencies"""
+    prefix = settings.API_V1_PREFIX
+    rng = random.Random(42)
+    latencies = []
+
+    def next_request():
+        resource = rng.choice(list(SAMPLES))
+        kind = rng.choices(['get', 'list', 'create'], weights=[6, 2, 2])[0]
+        if kind == 'get':
+            return 'GET', f'{prefix}/{resource}/{resource}-{rng.randrange(rows):05d}', None
+        if kind == 'list':
+            return 'GET', f'{prefix}/{resource}/', None
+        return 'POST', f'{prefix}/{resource}/', SAMPLES[resource]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        started = time.perf_counter()
+
+        async def one(index, method, url, body):
+            scheduled = started + index / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            response.raise_for_status()
+
+        await asyncio.gather(*(one(i, *next_request()) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': percentile(latencies, 99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--rate', type=float, default=200.0, help='arrivals per second')
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=settings.DB_EXECUTOR_WORKERS)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests at {args.rate:.0f} req/s, "
+          f"{args.latency_ms:.0f} ms simulated DynamoDB round trip\n")
+    print(f"{'mode':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, workers in [('inline (before)', 0), (f'thread pool ({args.workers})', args.workers)]:
+        configure_executor(workers)
+        asyncio.run(install_tables(args.latency_ms / 1000, args.rows))
+        result = asyncio.run(run_load(args.requests, args.rate, args.rows))
+        print(f"{label:<22}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p99']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
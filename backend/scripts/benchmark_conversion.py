@@ -0,0 +1,94 @@
+"""
+Decimal Conversion Benchmark - recursive vs. schema-driven, on seeded domains
+
+Converts the items as they are stored: each domain in NccDomains, and its
+DNS records as their own items in NccDnsRecords (keyed by domainId, id).
+Reads convert items exactly as boto3 returns them (Decimal numbers); writes
+convert API-shaped dicts. Reports wall time and the bytes each path leaves
+allocated (tracemalloc) for the whole batch.
+
+Usage:
+    python scripts/benchmark_conversion.py --domains 10000 --dns-records 20
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db_helper import dynamodb_to_python, numeric_schema, python_to_dynamodb
+from app.models import DNSRecord, Domain
+
+def stored_domain(i):
+    """A domain as boto3's resource API returns it"""
+    return {
+        'id': f'dom-{i:06d}', 'name': f'site-{i}.example.com', 'registrar': 'GoDaddy',
+        'registrationDate': '2020-01-15', 'expiryDate': '2026-01-15', 'autoRenew': True,
+        'owner': 'IT', 'status': 'active', 'cost': Decimal('12.99'), 'version': Decimal(1),
+        'ssl': {'issuer': "Let's Encrypt", 'validFrom': '2025-01-01', 'validTo': '2025-04-01', 'status': 'valid'},
+        'sslStatus': 'valid', 'sslValidTo': '2025-04-01'
+    }
+
+def stored_dns_record(i, n):
+    """One of a domain's DNS records, as its own NccDnsRecords item"""
+    return {
+        'domainId': f'dom-{i:06d}', 'id': f'dns-{i}-{n}', 'type': 'A', 'name': f'host{n}',
+        'value': '192.0.2.1', 'ttl': Decimal(3600), 'version': Decimal(1)
+    }
+
+def measure(label, func, make_input):
+    """Time `func` over a fresh input, then re-run it under tracemalloc"""
+    data = make_input()
+    start = time.perf_counter()
+    func(data)
+    elapsed = time.perf_counter() - start
+
+    data = make_input()
+    tracemalloc.start()
+    result = func(data)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"  {label:<16}{elapsed * 1000:>10.1f} ms{retained / 2**20:>12.1f} MiB{peak / 2**20:>12.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--domains', type=int, default=10000)
+    parser.add_argument('--dns-records', type=int, default=20)
+    args = parser.parse_args()
+
+    domain_schema = numeric_schema(Domain)
+    record_schema = numeric_schema(DNSRecord)
+
+    def stored():
+        return (
+            [stored_domain(i) for i in range(args.domains)],
+            [stored_dns_record(i, n) for i in range(args.domains) for n in range(args.dns_records)]
+        )
+
+    def api_shaped():
+        return tuple([dynamodb_to_python(item) for item in items] for items in stored())
+
+    def recursive(convert):
+        return lambda tables: [[convert(item) for item in items] for items in tables]
+
+    def with_schema(method):
+        return lambda tables: [
+            [getattr(schema, method)(item) for item in items]
+            for schema, items in zip((domain_schema, record_schema), tables)
+        ]
+
+    print(f"{args.domains} domains + {args.domains * args.dns_records} DNS record items")
+    print(f"  {'':<16}{'time':>13}{'retained':>16}{'peak':>16}")
+    print("read (Decimal -> int/float)")
+    measure('recursive', recursive(dynamodb_to_python), stored)
+    measure('schema', with_schema('to_python'), stored)
+    print("write (float -> Decimal)")
+    measure('recursive', recursive(python_to_dynamodb), api_shaped)
+    measure('schema', with_schema('to_dynamodb'), api_shaped)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Scan Benchmark - full-table read time, sequential vs. parallel segments
+
+Reads a synthetic table through `parallel_scan` with 1 segment (the old
+page-after-page scan) and with more segments, against a DynamoDB stand-in
+that sleeps per page like a real round trip and reports consumed capacity
+like a real scan (0.5 RCU per 4 KB, eventually consistent).
+
+Usage:
+    python scripts/benchmark_scan.py --rows 200000 --page-rows 1000 --latency-ms 50 --segments 1 4 8 16
+
+--max-read-units adds a run capped at that many RCU per second.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db_helper import CapacityLimiter, parallel_scan
+from app.executor import configure_executor
+
+class SegmentedTable:
+    """Synthetic table: `rows` items of `item_bytes`, served `page_rows` per scan page"""
+
+    def __init__(self, rows: int, page_rows: int, latency: float, item_bytes: int):
+        self.ids = [f'srv-{n:08d}' for n in range(rows)]
+        self.page_rows = page_rows
+        self.latency = latency
+        self.item_bytes = item_bytes
+        self._segments = {}
+
+    def _segment(self, segment: int, total: int):
+        # DynamoDB splits by key hash; crc32 of the id stands in for it
+        if (segment, total) not in self._segments:
+            self._segments[(segment, total)] = [i for i in self.ids if zlib.crc32(i.encode()) % total == segment]
+        return self._segments[(segment, total)]
+
+    def scan(self, Segment=0, TotalSegments=1, ExclusiveStartKey=None, **kwargs):
+        time.sleep(self.latency)
+        ids = self._segment(Segment, TotalSegments)
+        start = int(ExclusiveStartKey['n']) if ExclusiveStartKey else 0
+        page = ids[start:start + self.page_rows]
+        response = {
+            'Items': [{'id': item_id} for item_id in page],
+            'ConsumedCapacity': {'CapacityUnits': len(page) * self.item_bytes / 4096 / 2},
+        }
+        if start + self.page_rows < len(ids):
+            response['LastEvaluatedKey'] = {'n': start + self.page_rows}
+        return response
+
+async def read_all(table, segments: int, max_read_units: float):
+    started = time.perf_counter()
+    rows = 0
+    async for page in parallel_scan(table, segments, limiter=CapacityLimiter(max_read_units)):
+        rows += len(page)
+    return rows, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--page-rows', type=int, default=1000, help="Rows per scan page (1 MB / item size)")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Round trip per scan page")
+    parser.add_argument('--item-bytes', type=int, default=1024)
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--max-read-units', type=float, default=0, help="Also run the largest segment count under this RCU/s cap")
+    args = parser.parse_args()
+
+    configure_executor(max(args.segments))
+    table = SegmentedTable(args.rows, args.page_rows, args.latency_ms / 1000, args.item_bytes)
+    runs = [(segments, 0) for segments in args.segments]
+    if args.max_read_units:
+        runs.append((max(args.segments), args.max_read_units))
+
+    print(f"{args.rows} rows, {args.page_rows} rows/page, {args.latency_ms:.0f} ms/page\n")
+    print(f"{'segments':>8} {'RCU/s cap':>10} {'seconds':>9} {'rows/s':>10} {'RCU/s':>8}")
+    for segments, cap in runs:
+        for segment in range(segments):  # split outside the timing
+            table._segment(segment, segments)
+        rows, elapsed = asyncio.run(read_all(table, segments, cap))
+        rcu = rows * args.item_bytes / 4096 / 2 / elapsed
+        print(f"{segments:>8} {cap or '-':>10} {elapsed:>9.2f} {rows / elapsed:>10.0f} {rcu:>8.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Search Index Benchmark - build time and query latency at inventory scale
+
+Indexes synthetic servers, domains, email accounts, repositories and
+storage buckets straight into app.search.SearchIndex (no DynamoDB), then
+times a mix of name, IP, address and single-letter queries, and
+incremental re-indexing of single items.
+
+Usage:
+    python scripts/benchmark_search.py --items 100000 --queries 2000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.search import TABLE_SEARCH, SearchIndex
+
+WORDS = ['web', 'api', 'db', 'cache', 'auth', 'billing', 'search', 'queue', 'edge', 'mail', 'media', 'report']
+ENVS = ['prod', 'staging', 'dev', 'test']
+
+def synthetic_items(count):
+    """(table, item) pairs spread over every searchable table"""
+    tables = list(TABLE_SEARCH)
+    for i in range(count):
+        table = tables[i % len(tables)]
+        word, env = WORDS[i % len(WORDS)], ENVS[i % len(ENVS)]
+        item = {'id': f'{table}-{i:07d}', 'name': f'{word}-{env}-{i:05d}'}
+        if table == 'NccServers':
+            item.update({'ipAddress': f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}', 'tags': [word, env]})
+        elif table == 'NccDomains':
+            item['name'] = f'{word}{i}.example.com'
+        elif table == 'NccEmails':
+            item.update({'email': f'{word}.{env}{i}@ncc-tech.com', 'displayName': f'{word.title()} {env.title()} {i}'})
+        yield table, item
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    index = SearchIndex(TABLE_SEARCH)
+    items = list(synthetic_items(args.items))
+    start = time.perf_counter()
+    # Same path as the background build: unsorted inserts, one sort at the end
+    index._building = True
+    for table, item in items:
+        index.update(table, [item])
+    index._sort_tokens()
+    index._building = False
+    index._touched.clear()
+    print(f"{args.items} items: built in {time.perf_counter() - start:.2f} s, {index.stats()}")
+
+    samples = {
+        'exact name': lambda: rng.choice(items)[1]['name'],
+        'name prefix': lambda: rng.choice(items)[1]['name'][:6],
+        'two words': lambda: f'{rng.choice(WORDS)} {rng.choice(ENVS)}',
+        'ip prefix': lambda: f'10.0.{rng.randrange(256)}',
+        'one letter': lambda: rng.choice('abcdefghijklmnopqrstuvwxyz'),
+    }
+    print(f"  {'query':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'avg hits':>12}")
+    for label, make_query in samples.items():
+        timings, matched = [], 0
+        for _ in range(args.queries):
+            query = make_query()
+            start = time.perf_counter()
+            _, total = index.search(query, 20)
+            timings.append((time.perf_counter() - start) * 1000)
+            matched += total
+        print(f"  {label:<14}{percentile(timings, 50):>10.3f}{percentile(timings, 95):>10.3f}"
+              f"{percentile(timings, 99):>10.3f}{matched / args.queries:>12.0f}")
+
+    timings = []
+    for _ in range(args.queries):
+        table, item = rng.choice(items)
+        renamed = {**item, 'name': f'renamed-{rng.randrange(10**6)}'}
+        start = time.perf_counter()
+        index.update(table, [renamed])
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"  {'reindex 1':<14}{percentile(timings, 50):>10.3f}{percentile(timings, 95):>10.3f}{percentile(timings, 99):>10.3f}")
+
+if __name__ == '__main__':
+    main()
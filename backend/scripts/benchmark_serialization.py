@@ -0,0 +1,107 @@
+"""
+Serialization Micro-Benchmark - ms per 1k rows for each list response
+
+Compares FastAPI's default response path (validate against
+response_model, jsonable conversion, json.dumps) with app.responses.fast_json
+(one TypeAdapter validation, JSON bytes from pydantic-core).
+
+Usage:
+    python scripts/benchmark_serialization.py --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.models import Domain, EmailAccount, Page, Repository, Server, StorageBucket
+from app.responses import fast_json
+
+def server_row(i):
+    return {
+        'id': f'srv-{i:06d}', 'name': f'NCC-Core-{i}', 'ipAddress': f'10.0.{i // 256 % 256}.{i % 256}',
+        'os': 'Ubuntu 22.04 LTS', 'specs': {'cpu': '8 vCPU', 'ram': '32GB', 'storage': '500GB SSD'},
+        'location': 'US-East-1', 'provider': 'AWS', 'status': 'online', 'category': 'production',
+        'responsibleTeam': 'DevOps', 'lastPatchDate': '2024-12-01', 'tags': ['web', 'api']
+    }
+
+def domain_row(i):
+    return {
+        'id': f'dom-{i:06d}', 'name': f'site-{i}.example.com', 'registrar': 'GoDaddy',
+        'registrationDate': '2020-01-15', 'expiryDate': '2026-01-15', 'autoRenew': True,
+        'owner': 'IT', 'status': 'active', 'cost': 12.99,
+        'ssl': {'issuer': "Let's Encrypt", 'validFrom': '2025-01-01', 'validTo': '2025-04-01', 'status': 'valid'}
+    }
+
+def email_row(i):
+    return {
+        'id': f'email-{i:06d}', 'email': f'user{i}@ncc-tech.com', 'displayName': f'User {i}',
+        'provider': 'Google Workspace', 'status': 'active', 'department': 'IT',
+        'quotaUsed': 2048, 'quotaLimit': 15360, 'createdDate': '2023-01-15'
+    }
+
+def repository_row(i):
+    return {
+        'id': f'repo-{i:06d}', 'name': f'service-{i}', 'url': f'https://github.com/ncc/service-{i}',
+        'provider': 'GitHub', 'language': 'Python', 'visibility': 'private', 'ownerTeam': 'Backend',
+        'ciStatus': 'passing', 'branches': 4, 'openIssues': 2
+    }
+
+def storage_row(i):
+    return {
+        'id': f'storage-{i:06d}', 'name': f'bucket-{i}', 'provider': 'AWS S3', 'type': 'object',
+        'region': 'ap-south-1', 'usageBytes': 53687091200, 'capacityBytes': 107374182400,
+        'createdDate': '2023-01-01', 'isPublic': False
+    }
+
+RESOURCES = [
+    ('servers', Server, server_row),
+    ('domains', Domain, domain_row),
+    ('emails', EmailAccount, email_row),
+    ('repositories', Repository, repository_row),
+    ('storage', StorageBucket, storage_row),
+]
+
+async def default_path(field, content) -> bytes:
+    """What FastAPI does with a returned dict and a response_model"""
+    serialized = await serialize_response(field=field, response_content=content)
+    return JSONResponse(serialized).body
+
+def best_of(repeat, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    per_k = 1000 / args.rows * 1000
+    print(f"{args.rows} rows per response, best of {args.repeat}; ms per 1k rows\n")
+    print(f"{'resource':<14}{'default':>10}{'fast_json':>11}{'speedup':>10}")
+    for name, model, make_row in RESOURCES:
+        content = {'items': [make_row(i) for i in range(args.rows)], 'next_cursor': None}
+        field = create_model_field(f'Response_{name}', Page[model], mode='serialization')
+
+        if loop.run_until_complete(default_path(field, content)) is None:
+            raise SystemExit("default path produced no body")
+        fast_json(Page[model], content)  # warm the adapter cache
+
+        before = best_of(args.repeat, lambda: loop.run_until_complete(default_path(field, content)))
+        after = best_of(args.repeat, lambda: fast_json(Page[model], content))
+        print(f"{name:<14}{before * per_k:>10.2f}{after * per_k:>11.2f}{before / after:>9.1f}x")
+    loop.close()
+
+if __name__ == '__main__':
+    main()
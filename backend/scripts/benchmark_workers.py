@@ -0,0 +1,159 @@
+"""
+Worker Scaling Benchmark - requests per second at 1..N worker processes
+
+Seeds the in-memory DynamoDB stand-in (DB_BACKEND=memory) with --rows
+items per resource, then for each --workers count runs `app.serve`
+forked from this process (so every worker starts with the seeded tables)
+and drives it over HTTP for --seconds from --clients load processes,
+each with --concurrency connections. The mix is reads only (get by id,
+list pages, search), since every worker holds its own copy of the
+in-memory tables. Prints req/s, latency and scaling efficiency
+(req/s per worker against one worker).
+
+Usage:
+    python scripts/benchmark_workers.py --workers 1 2 4 8 --seconds 10
+    CACHE_BACKEND=socket python scripts/benchmark_workers.py --latency-ms 5
+
+The load processes share the machine with the workers, so on N cores
+efficiency is only meaningful up to about N / 2 workers.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ['DB_BACKEND'] = 'memory'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import httpx
+from benchmark_api import PREFIX, RESOURCES, State, seed
+from app import database
+from app.config import settings
+from app.executor import configure_executor
+from app.serve import serve, worker_count
+
+def request_paths(state: State, rng: random.Random, count: int = 5000) -> list:
+    """A fixed sample of read requests over the seeded items"""
+    paths = []
+    for _ in range(count):
+        resource = rng.choice(list(RESOURCES))
+        roll = rng.random()
+        if roll < 0.6:
+            paths.append(f'{PREFIX}/{resource}/{rng.choice(state.seeded[resource])}')
+        elif roll < 0.8:
+            paths.append(f'{PREFIX}/{resource}/?limit=50')
+        else:
+            paths.append(f"{PREFIX}/search/?q={rng.choice(['bench', 'web', 'api', 'python', 'bucket'])}")
+    return paths
+
+def drive(url: str, paths: list, seconds: float, concurrency: int, seed_value: int) -> tuple:
+    """One load process: `concurrency` closed-loop clients for `seconds`; returns (latencies in ms, errors)"""
+    async def run():
+        rng = random.Random(seed_value)
+        latencies, errors = [], 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=30, limits=limits) as client:
+            deadline = time.perf_counter() + seconds
+
+            async def client_loop():
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(rng.choice(paths))
+                        failed = response.status_code >= 400
+                    except httpx.HTTPError:
+                        failed = True
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    errors += failed
+
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return latencies, errors
+    return asyncio.run(run())
+
+def measure(url: str, paths: list, args) -> dict:
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(args.clients) as pool:
+        runs = pool.starmap(drive, [(url, paths, args.seconds, args.concurrency, args.seed + n) for n in range(args.clients)])
+    latencies = [latency for run, _ in runs for latency in run]
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else [0.0] * 99
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in runs),
+        'rps': len(latencies) / args.seconds,
+        'p50': cuts[49],
+        'p99': cuts[98],
+    }
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if httpx.get(f'{url}/health', timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Server at {url} did not come up")
+        time.sleep(0.2)
+
+def with_workers(workers: int, args, paths: list) -> dict:
+    """Fork `app.serve` with `workers` workers, measure it, stop it"""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            serve('127.0.0.1', args.port, workers)
+        finally:
+            os._exit(0)
+    url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_up(url)
+        # Warm every worker (search index build, first-request costs) before measuring
+        drive(url, paths, min(2.0, args.seconds), args.concurrency, args.seed)
+        return measure(url, paths, args)
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, worker_count()}), help="Worker counts to run")
+    parser.add_argument('--rows', type=int, default=2000, help="Items seeded per resource")
+    parser.add_argument('--seconds', type=float, default=10, help="Measured time per worker count")
+    parser.add_argument('--clients', type=int, default=max(1, worker_count() // 2), help="Load processes")
+    parser.add_argument('--concurrency', type=int, default=32, help="Connections per load process")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Simulated DynamoDB round trip per call")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    state = State()
+    # Seed inline: no DynamoDB threads may be running when the server forks
+    configure_executor(0)
+    started = time.perf_counter()
+    asyncio.run(seed(state, args.rows, rng))
+    database.dynamodb.latency = args.latency_ms / 1000
+    print(f"Seeded {args.rows} rows per resource in {time.perf_counter() - started:.1f}s; "
+          f"CACHE_BACKEND={settings.CACHE_BACKEND}, {args.latency_ms:g} ms simulated round trip, "
+          f"{args.clients} load processes x {args.concurrency} connections")
+    paths = request_paths(state, rng)
+
+    print(f"\n{'workers':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'efficiency':>12}")
+    baseline = None
+    for workers in args.workers:
+        result = with_workers(workers, args, paths)
+        per_worker = result['rps'] / workers
+        baseline = baseline or per_worker
+        print(f"{workers:>8}{result['rps']:>10.0f}{result['p50']:>9.1f}{result['p99']:>9.1f}"
+              f"{result['errors']:>8}{per_worker / baseline:>11.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -75,14 +75,26 @@ def create_all_tables():
             {'AttributeName': 'id', 'AttributeType': 'S'},
             {'AttributeName': 'status', 'AttributeType': 'S'},
             {'AttributeName': 'expiryDate', 'AttributeType': 'S'},
-            {'AttributeName': 'registrar', 'AttributeType': 'S'}
+            {'AttributeName': 'registrar', 'AttributeType': 'S'},
+            {'AttributeName': 'sslStatus', 'AttributeType': 'S'},
+            {'AttributeName': 'sslValidTo', 'AttributeType': 'S'}
         ],
         [
             {'IndexName': 'GSI_Status', 'KeySchema': [{'AttributeName': 'status', 'KeyType': 'HASH'}, {'AttributeName': 'expiryDate', 'KeyType': 'RANGE'}], 'Projection': {'ProjectionType': 'ALL'}, 'ProvisionedThroughput': gsi_throughput},
-            {'IndexName': 'GSI_Registrar', 'KeySchema': [{'AttributeName': 'registrar', 'KeyType': 'HASH'}], 'Projection': {'ProjectionType': 'ALL'}, 'ProvisionedThroughput': gsi_throughput}
+            {'IndexName': 'GSI_Registrar', 'KeySchema': [{'AttributeName': 'registrar', 'KeyType': 'HASH'}], 'Projection': {'ProjectionType': 'ALL'}, 'ProvisionedThroughput': gsi_throughput},
+            {'IndexName': 'GSI_SslExpiry', 'KeySchema': [{'AttributeName': 'sslStatus', 'KeyType': 'HASH'}, {'AttributeName': 'sslValidTo', 'KeyType': 'RANGE'}], 'Projection': {'ProjectionType': 'ALL'}, 'ProvisionedThroughput': gsi_throughput}
         ]
     )
-    
+
+    # NccDnsRecords (one item per record, partitioned by domain)
+    create_table(dynamodb, 'NccDnsRecords',
+        [{'AttributeName': 'domainId', 'KeyType': 'HASH'}, {'AttributeName': 'id', 'KeyType': 'RANGE'}],
+        [
+            {'AttributeName': 'domainId', 'AttributeType': 'S'},
+            {'AttributeName': 'id', 'AttributeType': 'S'}
+        ]
+    )
+
     # NccEmails
     create_table(dynamodb, 'NccEmails',
         [{'AttributeName': 'id', 'KeyType': 'HASH'}],
@@ -125,6 +137,12 @@ def create_all_tables():
         ]
     )
     
+    # NccStats (one counters item per table, see app/summary.py)
+    create_table(dynamodb, 'NccStats',
+        [{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        [{'AttributeName': 'id', 'AttributeType': 'S'}]
+    )
+    
     print("\n✅ All tables ready!")
 
 if __name__ == '__main__':
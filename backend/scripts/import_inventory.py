@@ -0,0 +1,175 @@
+"""
+Import Inventory - load a CSV or NDJSON file into one resource's table
+
+Rows are validated like the API's create / bulk-replace requests (rows
+with an id replace that item, rows without one are created) in a pool of
+worker processes, and written in batches through the repository layer, so
+versions, summary counters and DNS record items stay consistent. At most
+--concurrency chunks are in flight, and --max-write-units caps the write
+capacity units per second.
+
+Rows that fail validation or cannot be written go to FILE.rejects.csv or
+.ndjson, in the input format plus `_row` / `_error` columns, so they can
+be fixed and imported again. Progress is checkpointed to
+FILE.checkpoint.json. After a crash, running the same command resumes
+after the last committed row (--restart starts over). .gz files are read
+transparently. /export files import as they are.
+
+Rows go straight to DynamoDB: a running API's search index, entity cache
+and /events do not see them.
+
+Usage:
+    python scripts/import_inventory.py RESOURCE FILE [--format csv|ndjson] [--workers N]
+        [--concurrency N] [--chunk-size N] [--max-write-units N] [--dry-run] [--restart]
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db_helper import CapacityLimiter
+from app.executor import configure_executor
+from app.importer import ImportTotals, iter_rows, run_import
+from app.models import ExportFormat
+from app.routers.imports import IMPORT_SPECS
+
+def detect_format(path: Path) -> ExportFormat:
+    suffixes = [suffix for suffix in path.suffixes if suffix != '.gz']
+    return ExportFormat.csv if suffixes and suffixes[-1] == '.csv' else ExportFormat.ndjson
+
+class RejectsFile:
+    """Appends rejected rows in the input format, plus `_row` and `_error`"""
+
+    def __init__(self, path: Path, export_format: ExportFormat, header, append: bool):
+        self.path = path
+        self.format = export_format
+        self.header = header
+        self.append = append
+        self._file = None
+
+    def write(self, problems):
+        if not problems:
+            return
+        if self._file is None:
+            exists = self.append and self.path.exists()
+            self._file = open(self.path, 'a' if exists else 'w', encoding='utf-8', newline='')
+            if self.format == ExportFormat.csv and not exists:
+                csv.writer(self._file).writerow(list(self.header) + ['_row', '_error'])
+        if self.format == ExportFormat.csv:
+            csv.writer(self._file).writerows(list(raw) + [row, error] for row, error, raw in problems)
+        else:
+            for row, error, raw in problems:
+                try:
+                    record = json.loads(raw)
+                    record = record if isinstance(record, dict) else {'_raw': raw.rstrip('\n')}
+                except ValueError:
+                    record = {'_raw': raw.rstrip('\n')}
+                self._file.write(json.dumps({**record, '_row': row, '_error': error}) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    """Replace the checkpoint atomically, so a crash never leaves half a file"""
+    partial = path.with_name(path.name + '.tmp')
+    partial.write_text(json.dumps(state))
+    os.replace(partial, path)
+
+def import_inventory(resource, path, export_format=None, workers=None, concurrency=settings.IMPORT_CONCURRENCY,
+                     chunk_size=settings.IMPORT_CHUNK_SIZE, max_write_units=0, dry_run=False, restart=False):
+    """Import one file, resuming from its checkpoint unless `restart`"""
+    spec = IMPORT_SPECS[resource]
+    export_format = export_format or detect_format(path)
+    checkpoint_path = path.with_name(path.name + '.checkpoint.json')
+    rejects_path = path.with_name(f"{path.name}.rejects.{export_format.value}")
+
+    state = None
+    if checkpoint_path.exists() and not restart and not dry_run:
+        state = json.loads(checkpoint_path.read_text())
+        if state['resource'] != resource:
+            sys.exit(f"{checkpoint_path} belongs to a {state['resource']} import; use --restart")
+        print(f"Resuming job {state['job']} after row {state['checkpoint']}")
+    job = state['job'] if state else uuid.uuid4().hex[:8]
+    totals = ImportTotals(state['checkpoint'] if state else 0)
+    if state:
+        for name in ('read', 'imported', 'rejected', 'failed'):
+            setattr(totals, name, state[name])
+
+    opener = gzip.open if path.suffix == '.gz' else open
+    started = time.perf_counter()
+    resumed_from = totals.read
+    with opener(path, 'rb') as source:
+        header, rows = iter_rows(source, export_format, totals.checkpoint)
+        rejects = RejectsFile(rejects_path, export_format, header, append=state is not None)
+
+        def on_commit(problems, totals):
+            rejects.write(problems)
+            if not dry_run:
+                save_checkpoint(checkpoint_path, {'resource': resource, 'job': job, **totals.as_dict()})
+            rate = (totals.read - resumed_from) / (time.perf_counter() - started)
+            print(f"\r  row {totals.checkpoint}: {totals.imported} imported, {totals.rejected} rejected, "
+                  f"{totals.failed} failed ({rate:,.0f} rows/s)", end='', flush=True)
+
+        # One core is left for parsing and writing; on a single core validating inline is fastest
+        workers = max((os.cpu_count() or 1) - 1, 0) if workers is None else workers
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) if workers > 0 else None
+        try:
+            asyncio.run(run_import(
+                spec, export_format, header, rows,
+                job=job,
+                totals=totals,
+                executor=pool,
+                chunk_size=chunk_size,
+                concurrency=concurrency,
+                limiter=CapacityLimiter(max_write_units),
+                dry_run=dry_run,
+                on_commit=on_commit
+            ))
+        except KeyboardInterrupt:
+            sys.exit(f"\nInterrupted after row {totals.checkpoint}; run the same command to resume")
+        finally:
+            rejects.close()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    print()
+
+    if not dry_run and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    action = 'Validated' if dry_run else 'Imported'
+    count = totals.imported if not dry_run else totals.read - totals.rejected
+    print(f"\n✅ {action} {count} {resource} in {time.perf_counter() - started:.1f}s "
+          f"({totals.rejected} rejected, {totals.failed} failed)")
+    if totals.rejected or totals.failed:
+        print(f"   Rejected rows: {rejects_path}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('resource', choices=sorted(IMPORT_SPECS))
+    parser.add_argument('file', type=Path)
+    parser.add_argument('--format', type=ExportFormat, choices=list(ExportFormat), help="Default: from the file extension")
+    parser.add_argument('--workers', type=int, help="Validation processes (default: CPU count - 1; 0 = inline)")
+    parser.add_argument('--concurrency', type=int, default=settings.IMPORT_CONCURRENCY, help="Chunks written at once")
+    parser.add_argument('--chunk-size', type=int, default=settings.IMPORT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument('--max-write-units', type=float, default=0, help="Write capacity units per second (0 = unlimited)")
+    parser.add_argument('--threads', type=int, default=settings.DB_EXECUTOR_WORKERS, help="Threads for DynamoDB calls")
+    parser.add_argument('--dry-run', action='store_true', help="Validate and write rejects only")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+    if not args.file.exists():
+        parser.error(f"no such file: {args.file}")
+    configure_executor(args.threads)
+    import_inventory(args.resource, args.file, args.format, args.workers, args.concurrency,
+                     args.chunk_size, args.max_write_units, args.dry_run, args.restart)
@@ -0,0 +1,58 @@
+"""
+Migration Script - Move embedded dnsRecords lists into NccDnsRecords
+
+Domains used to carry their DNS records as a `dnsRecords` list attribute.
+This copies every embedded record into NccDnsRecords (keyed by domainId,
+id) and then removes the attribute from the domain. Safe to re-run.
+
+Usage:
+    python scripts/migrate_dns_records.py [--dry-run]
+"""
+import argparse
+import boto3
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+def migrate_dns_records(dry_run=False):
+    """Copy embedded records to the child table, then drop the embedded list"""
+    dynamodb = boto3.resource('dynamodb',
+                              region_name=os.getenv('AWS_DEFAULT_REGION'),
+                              aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                              aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
+    domains = dynamodb.Table('NccDomains')
+    dns_table = dynamodb.Table('NccDnsRecords')
+
+    params = {
+        'FilterExpression': 'attribute_exists(dnsRecords)',
+        'ProjectionExpression': 'id, dnsRecords'
+    }
+    migrated_domains = 0
+    migrated_records = 0
+    while True:
+        response = domains.scan(**params)
+        for domain in response.get('Items', []):
+            records = domain.get('dnsRecords') or []
+            print(f"  {domain['id']}: {len(records)} records")
+            if not dry_run:
+                with dns_table.batch_writer(overwrite_by_pkeys=['domainId', 'id']) as batch:
+                    for record in records:
+                        batch.put_item(Item={**record, 'domainId': domain['id']})
+                domains.update_item(Key={'id': domain['id']}, UpdateExpression='REMOVE dnsRecords')
+            migrated_domains += 1
+            migrated_records += len(records)
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    action = 'Would migrate' if dry_run else 'Migrated'
+    print(f"\n✅ {action} {migrated_records} DNS records from {migrated_domains} domains")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help="Report what would move without writing")
+    migrate_dns_records(parser.parse_args().dry_run)
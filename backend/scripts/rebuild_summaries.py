@@ -0,0 +1,76 @@
+"""
+Rebuild Summaries - recompute the NccStats counters from the tables
+
+The API keeps one counters item per table in NccStats and adjusts it on
+every write. Run this once after creating NccStats (existing items are not
+counted until then) and whenever counters may have drifted, e.g. after
+writes made outside the API. Writes that land while a table is being
+scanned can be missed, so run it while writes are quiet.
+
+Tables are read with a parallel segmented scan; --segments sets the
+number of segments and --max-read-units caps the read capacity units per
+second the scan may consume (0 = unlimited).
+
+Usage:
+    python scripts/rebuild_summaries.py [--dry-run] [--segments 8] [--max-read-units 0] [TABLE ...]
+"""
+import argparse
+import asyncio
+import boto3
+import os
+import sys
+from collections import defaultdict
+from dotenv import load_dotenv
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db_helper import CapacityLimiter, parallel_scan
+from app.summary import STATS_TABLE, TABLE_SUMMARIES
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+async def count_items(table, spec, segments, max_read_units):
+    """Counters of every item of a table, from a projected parallel scan"""
+    attributes = ['id'] + spec.count_by + spec.sum_of
+    params = {
+        'ProjectionExpression': ', '.join(f'#a{i}' for i in range(len(attributes))),
+        'ExpressionAttributeNames': {f'#a{i}': name for i, name in enumerate(attributes)}
+    }
+    counters = defaultdict(int)
+    async for page in parallel_scan(table, segments, params, CapacityLimiter(max_read_units)):
+        for name, value in spec.delta((None, item) for item in page).items():
+            counters[name] += value
+    return {name: round(value, 6) if isinstance(value, float) else value for name, value in counters.items()}
+
+def rebuild_summaries(table_names, dry_run=False, segments=settings.SCAN_SEGMENTS, max_read_units=0):
+    """Scan each table and overwrite its counters item"""
+    dynamodb = boto3.resource('dynamodb',
+                              region_name=os.getenv('AWS_DEFAULT_REGION'),
+                              aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                              aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
+    stats = dynamodb.Table(STATS_TABLE)
+    for table_name in table_names:
+        spec = TABLE_SUMMARIES[table_name]
+        counters = asyncio.run(count_items(dynamodb.Table(table_name), spec, segments, max_read_units))
+        print(f"  {table_name}: {counters.get('total', 0)} items, {len(counters)} counters")
+        if not dry_run:
+            stats.put_item(Item={'id': table_name, **counters})
+
+    action = 'Would rebuild' if dry_run else 'Rebuilt'
+    print(f"\n✅ {action} summaries of {len(table_names)} tables")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('tables', nargs='*', help=f"Tables to rebuild (default: all of {', '.join(TABLE_SUMMARIES)})")
+    parser.add_argument('--dry-run', action='store_true', help="Report the counters without writing")
+    parser.add_argument('--segments', type=int, default=settings.SCAN_SEGMENTS, help="Parallel scan segments per table")
+    parser.add_argument('--max-read-units', type=float, default=0, help="Read capacity units per second to stay under (0 = unlimited)")
+    args = parser.parse_args()
+    unknown = [name for name in args.tables if name not in TABLE_SUMMARIES]
+    if unknown:
+        parser.error(f"no summary kept for: {', '.join(unknown)}")
+    rebuild_summaries(args.tables or list(TABLE_SUMMARIES), args.dry_run, args.segments, args.max_read_units)
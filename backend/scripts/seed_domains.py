@@ -117,12 +117,19 @@ def seed_domains():
         if 'cost' in domain and domain['cost'] is not None:
             domain['cost'] = Decimal(str(domain['cost']))
     
+    # DNS records are stored as their own items, keyed by (domainId, id)
+    dns_table = dynamodb.Table('NccDnsRecords')
+    
     print(f"Seeding {len(domains)} domains into table '{table_name}'...")
     
     for domain in domains:
         try:
+            records = domain.pop('dnsRecords', [])
             table.put_item(Item=domain)
-            print(f"  ✓ Added: {domain['name']} ({domain['id']})")
+            with dns_table.batch_writer() as batch:
+                for record in records:
+                    batch.put_item(Item={**record, 'domainId': domain['id']})
+            print(f"  ✓ Added: {domain['name']} ({domain['id']}, {len(records)} DNS records)")
         except Exception as e:
             print(f"  ✗ Failed to add {domain['name']}: {e}")
     
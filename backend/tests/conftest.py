@@ -0,0 +1,44 @@
+"""
+Fixtures for the offline test suite
+
+The app runs on the in-memory DynamoDB stand-in (DB_BACKEND=memory) and
+validates imports in-process, so the suite needs neither AWS nor a server.
+Every test starts from empty tables, an empty entity cache and an empty
+search index.
+"""
+import os
+
+os.environ['DB_BACKEND'] = 'memory'
+os.environ['IMPORT_WORKERS'] = '0'
+os.environ['CACHE_BACKEND'] = 'local'
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.cache import entity_cache
+from app.main import app
+from app.routers.search import REPOSITORIES
+from app.search import search_index
+
+@pytest.fixture(scope='session')
+def app_client():
+    with TestClient(app) as client:
+        yield client
+
+def stored_ids(table) -> list:
+    ids, params = [], {'ProjectionExpression': 'id'}
+    while True:
+        response = table.scan(**params)
+        ids += [item['id'] for item in response['Items']]
+        if 'LastEvaluatedKey' not in response:
+            return ids
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+@pytest.fixture
+def client(app_client):
+    for repository in REPOSITORIES:
+        search_index.remove(repository.table_name, stored_ids(repository.table))
+    database.dynamodb.clear()
+    entity_cache.clear()
+    yield app_client
@@ -0,0 +1,52 @@
+"""
+Payloads and client helpers shared by the test modules
+"""
+import base64
+import json
+
+API = '/api/v1'
+
+def make_cursor(key: dict) -> str:
+    """A cursor in the wire format, for keys the API never handed out"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def server_payload(n: int, **overrides) -> dict:
+    return {
+        'name': f'srv-{n:02d}',
+        'ipAddress': f'10.0.0.{n}',
+        'os': 'Debian 12',
+        'specs': {'cpu': '2 vCPU', 'ram': '4GB', 'storage': '50GB SSD'},
+        'location': 'ap-south-2',
+        'provider': 'AWS',
+        'status': 'online',
+        'category': 'production',
+        'responsibleTeam': 'QA Team',
+        'lastPatchDate': '2026-01-01',
+        **overrides
+    }
+
+def domain_payload(n: int, records: int = 0, **overrides) -> dict:
+    return {
+        'name': f'example-{n}.com',
+        'registrar': 'Registrar',
+        'registrationDate': '2024-01-01',
+        'expiryDate': '2027-01-01',
+        'status': 'active',
+        'autoRenew': True,
+        'owner': 'ops',
+        'dnsRecords': [
+            {'type': 'A', 'name': f'host-{i}', 'value': f'192.0.2.{i}', 'ttl': 300} for i in range(records)
+        ],
+        **overrides
+    }
+
+def walk(client, path: str, **params) -> list:
+    """Every item of a paginated list, following next_cursor to the end"""
+    items, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        items += response.json()['items']
+        cursor = response.json()['next_cursor']
+        if not cursor:
+            return items
@@ -0,0 +1,98 @@
+"""
+Bulk writes (POST /{resource}/bulk) and batch gets (POST /{resource}/batch-get)
+"""
+import pytest
+
+from app.config import settings
+from app.routers import servers
+from helpers import API, server_payload, walk
+
+SERVERS = f'{API}/servers/'
+
+def bulk(client, **rows):
+    response = client.post(f'{SERVERS}bulk', json=rows)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.fixture
+def stored(client):
+    return [client.post(SERVERS, json=server_payload(n)).json() for n in range(3)]
+
+def test_bulk_create_replace_delete(client, stored):
+    replaced = {**stored[0], 'status': 'maintenance'}
+    result = bulk(client, create=[server_payload(10), server_payload(11)], replace=[replaced], delete=[stored[1]['id']])
+    assert (result['succeeded'], result['failed']) == (4, 0)
+    assert [(row['op'], row['index']) for row in result['results']] == [
+        ('create', 0), ('create', 1), ('replace', 0), ('delete', 0)
+    ]
+
+    items = {item['id']: item for item in walk(client, SERVERS)}
+    created = [row['id'] for row in result['results'] if row['op'] == 'create']
+    assert set(items) == {stored[0]['id'], stored[2]['id'], *created}
+    assert items[stored[0]['id']]['status'] == 'maintenance'
+    assert items[stored[0]['id']]['version'] == stored[0]['version'] + 1
+    assert client.get(f"{SERVERS}{stored[1]['id']}").status_code == 404
+
+def test_bulk_reports_invalid_rows_and_writes_the_rest(client):
+    result = bulk(client, create=[server_payload(1), {'name': 'no-ip'}])
+    assert (result['succeeded'], result['failed']) == (1, 1)
+    invalid = result['results'][1]
+    assert (invalid['status'], invalid['index']) == ('invalid', 1)
+    assert 'ipAddress' in invalid['error']
+    assert len(walk(client, SERVERS)) == 1
+
+def test_bulk_rejects_an_id_used_twice(client, stored):
+    result = bulk(client, replace=[stored[0]], delete=[stored[0]['id']])
+    assert [row['status'] for row in result['results']] == ['ok', 'invalid']
+    assert client.get(f"{SERVERS}{stored[0]['id']}").status_code == 200
+
+def test_bulk_reports_unprocessed_items_as_failed(client, stored, monkeypatch):
+    async def batch_write(put_items, delete_ids):
+        return {delete_ids[0]}
+    monkeypatch.setattr(servers.db, 'batch_write', batch_write)
+
+    result = bulk(client, delete=[stored[0]['id'], stored[1]['id']])
+    assert [row['status'] for row in result['results']] == ['failed', 'ok']
+    assert result['failed'] == 1
+
+def test_bulk_over_the_limit_is_400(client, monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_BULK_ITEMS', 2)
+    response = client.post(f'{SERVERS}bulk', json={'delete': ['a', 'b', 'c']})
+    assert response.status_code == 400
+
+def batch_get(client, ids):
+    response = client.post(f'{SERVERS}batch-get', json={'ids': ids})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_batch_get_keeps_request_order_and_lists_missing_ids(client, stored):
+    ids = [stored[2]['id'], 'srv-missing', stored[0]['id']]
+    result = batch_get(client, ids)
+    assert [item['id'] for item in result['items']] == [stored[2]['id'], stored[0]['id']]
+    assert result['missing'] == ['srv-missing']
+
+def test_batch_get_repeats_items_for_repeated_ids(client, stored):
+    result = batch_get(client, [stored[0]['id'], stored[0]['id'], 'srv-missing', 'srv-missing'])
+    assert [item['id'] for item in result['items']] == [stored[0]['id']] * 2
+    assert result['missing'] == ['srv-missing']
+
+def test_batch_get_spans_several_batch_get_item_calls(client):
+    created = bulk(client, create=[server_payload(n % 250) for n in range(250)])
+    ids = [row['id'] for row in created['results']]
+    result = batch_get(client, ids)
+    assert [item['id'] for item in result['items']] == ids
+    assert result['missing'] == []
+
+def test_batch_get_does_not_serve_deleted_items_from_the_cache(client, stored):
+    assert len(batch_get(client, [stored[0]['id']])['items']) == 1
+    client.delete(f"{SERVERS}{stored[0]['id']}")
+    assert batch_get(client, [stored[0]['id']])['missing'] == [stored[0]['id']]
+
+def test_batch_get_sees_updates(client, stored):
+    batch_get(client, [stored[0]['id']])
+    client.put(f"{SERVERS}{stored[0]['id']}", json={'status': 'offline'})
+    assert batch_get(client, [stored[0]['id']])['items'][0]['status'] == 'offline'
+
+def test_batch_get_over_the_limit_is_400(client, monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_BULK_ITEMS', 2)
+    assert client.post(f'{SERVERS}batch-get', json={'ids': ['a', 'b', 'c']}).status_code == 400
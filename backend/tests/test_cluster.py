@@ -0,0 +1,233 @@
+"""
+Worker cluster state shared through the cache server (CACHE_BACKEND=socket)
+
+The cache server runs as its own process (`python -m app.cache_server`)
+so it can be killed and restarted. "This worker" is a ClusterClient of
+its own wired into fresh SharedCache / ChangeTracker / EventLog
+instances, leaving the session app on CACHE_BACKEND=local; the other
+worker is a bare connection speaking the protocol under another pid.
+"""
+import asyncio
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import pytest
+
+from app import cache, changes, cluster as cluster_module, events
+from app.cache import SharedCache, TTLCache
+from app.changes import ChangeTracker
+from app.cluster import ClusterClient
+from app.config import settings
+from app.events import EventLog
+
+AUTHKEY = 'test-authkey'
+OTHER_WORKER = 1
+
+def wait_for(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def call(connection, *request):
+    connection.send(request)
+    assert connection.poll(5)
+    return connection.recv()
+
+class CacheServerProcess:
+    def __init__(self, address: str):
+        self.address = address
+        self.process = None
+
+    def start(self) -> None:
+        env = {**os.environ, 'CACHE_ADDRESS': self.address, 'CACHE_AUTHKEY': AUTHKEY, 'LOG_LEVEL': 'WARNING'}
+        self.process = subprocess.Popen([sys.executable, '-m', 'app.cache_server'], env=env)
+        wait_for(self.answers, timeout=10)
+
+    def answers(self) -> bool:
+        try:
+            self.stats()
+        except OSError:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        """The server's stats, asked on a connection of its own"""
+        connection = Client(self.address, authkey=AUTHKEY.encode())
+        connection.send(('hello', OTHER_WORKER, False))
+        try:
+            return call(connection, 'stats')
+        finally:
+            connection.close()
+
+    def stop(self) -> None:
+        self.process.kill()
+        self.process.wait()
+
+@pytest.fixture
+def socket_dir():
+    # Unix socket paths are short; tmp_path can be too long for one
+    path = tempfile.mkdtemp(prefix='ncc-')
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+@pytest.fixture
+def cache_server(socket_dir, monkeypatch):
+    server = CacheServerProcess(os.path.join(socket_dir, 'cache.sock'))
+    monkeypatch.setattr(settings, 'CACHE_BACKEND', 'socket')
+    monkeypatch.setattr(settings, 'CACHE_ADDRESS', server.address)
+    monkeypatch.setattr(settings, 'CACHE_AUTHKEY', AUTHKEY)
+    monkeypatch.setattr(cluster_module, 'RECONNECT_SECONDS', 0.1)
+    server.start()
+    yield server
+    if server.process.poll() is None:
+        server.stop()
+
+@pytest.fixture
+def worker(monkeypatch):
+    """A ClusterClient, with the modules under test registering on it"""
+    client = ClusterClient()
+    for module in (cache, changes, events):
+        monkeypatch.setattr(module, 'cluster', client)
+    yield client
+    client.stop()
+
+@pytest.fixture
+def other_worker(cache_server):
+    """Requests from a second worker"""
+    connection = Client(cache_server.address, authkey=AUTHKEY.encode())
+    connection.send(('hello', OTHER_WORKER, False))
+    yield connection
+    connection.close()
+
+def test_entities_are_shared_between_workers(cache_server, worker, other_worker):
+    shared = SharedCache(TTLCache(100, 60))
+    worker.start()
+    assert worker.connected
+
+    shared.set(('NccServers', 'srv-1'), {'id': 'srv-1', 'name': 'web-01'})
+    wait_for(lambda: call(other_worker, 'get', [('NccServers', 'srv-1')])[0] is not None)
+    assert pickle.loads(call(other_worker, 'get', [('NccServers', 'srv-1')])[0])['name'] == 'web-01'
+
+    other_worker.send(('set', ('NccServers', 'srv-2'), pickle.dumps({'id': 'srv-2', 'name': 'web-02'})))
+    wait_for(lambda: call(other_worker, 'get', [('NccServers', 'srv-2')])[0] is not None)
+    assert asyncio.run(shared.fetch(('NccServers', 'srv-2'))) == {'id': 'srv-2', 'name': 'web-02'}
+    assert shared.shared_hits == 1
+
+def test_another_workers_write_invalidates_the_local_copy(cache_server, worker, other_worker):
+    shared = SharedCache(TTLCache(100, 60))
+    worker.start()
+    shared.set(('NccServers', 'srv-1'), {'id': 'srv-1', 'status': 'online'})
+    wait_for(lambda: call(other_worker, 'get', [('NccServers', 'srv-1')])[0] is not None)
+
+    other_worker.send(('invalidate', ('NccServers', 'srv-1')))
+    wait_for(lambda: shared.local.lookup(('NccServers', 'srv-1')) is None)
+    assert asyncio.run(shared.fetch(('NccServers', 'srv-1'))) is None
+
+def test_server_numbers_markers_and_events(cache_server, worker, other_worker):
+    tracker = ChangeTracker()
+    log = EventLog(100)
+    worker.start()
+    epoch = call(other_worker, 'stats')['epoch']
+    assert tracker.epoch == log.epoch == epoch
+
+    call(other_worker, 'mark', 'NccServers')
+    asyncio.run(tracker.mark('NccServers'))
+    assert tracker.marker('NccServers')[0] == 2
+
+    other_worker.send(('event', 'servers', 'created', b'{}'))
+    log.publish('NccServers', 'deleted', {'id': 'srv-1'})
+    wait_for(lambda: log._seq == 2)
+    frames = [frame for _, _, frame in log._frames]
+    assert [frame.split(b'\n')[0] for frame in frames] == [f'id: {epoch}-1'.encode(), f'id: {epoch}-2'.encode()]
+
+def test_falls_back_to_local_state_while_the_server_is_down(cache_server, worker):
+    shared = SharedCache(TTLCache(100, 60))
+    tracker = ChangeTracker()
+    log = EventLog(100)
+    worker.start()
+    assert worker.connected
+    cluster_epoch = tracker.epoch
+    shared.set(('NccServers', 'srv-1'), {'id': 'srv-1'})
+
+    cache_server.stop()
+    # Each falls back to an epoch of this process's own
+    wait_for(lambda: tracker.epoch != cluster_epoch and log.epoch != cluster_epoch)
+    assert not worker.connected
+
+    # Served from the local level, counted and numbered in-process
+    assert asyncio.run(shared.fetch(('NccServers', 'srv-1'))) == {'id': 'srv-1'}
+    assert asyncio.run(shared.fetch(('NccServers', 'srv-2'))) is None
+    asyncio.run(tracker.mark('NccServers'))
+    assert tracker.marker('NccServers')[0] == 1
+    log.publish('NccServers', 'created', {'id': 'srv-3'})
+    assert log._seq == 1
+
+    # Back on the (new) server's numbering, with the local level dropped
+    cache_server.start()
+    wait_for(lambda: worker.connected)
+    assert tracker.epoch == log.epoch == cache_server.stats()['epoch']
+    assert shared.local.lookup(('NccServers', 'srv-1')) is None
+
+def test_unreachable_server_at_start(socket_dir, worker, monkeypatch):
+    monkeypatch.setattr(settings, 'CACHE_BACKEND', 'socket')
+    monkeypatch.setattr(settings, 'CACHE_ADDRESS', os.path.join(socket_dir, 'nobody.sock'))
+    monkeypatch.setattr(settings, 'CACHE_AUTHKEY', AUTHKEY)
+    shared = SharedCache(TTLCache(100, 60))
+    tracker = ChangeTracker()
+    worker.start()
+    assert not worker.connected
+
+    shared.set(('NccServers', 'srv-1'), {'id': 'srv-1'})
+    assert asyncio.run(shared.fetch(('NccServers', 'srv-1'))) == {'id': 'srv-1'}
+    asyncio.run(tracker.mark('NccServers'))
+    assert tracker.marker('NccServers')[0] == 1
+
+def test_a_stalled_server_does_not_block_the_event_loop(socket_dir, worker, monkeypatch):
+    """A server that accepts but never replies: requests time out off the loop and the worker falls back"""
+    address = os.path.join(socket_dir, 'stalled.sock')
+    listener = Listener(address, authkey=AUTHKEY.encode())
+    connections = []
+
+    def accept():
+        for _ in range(2):
+            connection = listener.accept()
+            connections.append(connection)
+            if connection.recv()[2]:
+                connection.send(('snapshot', {'epoch': 'stalled', 'started': time.time(), 'markers': {}, 'sequence': 0}))
+    threading.Thread(target=accept, daemon=True).start()
+
+    monkeypatch.setattr(settings, 'CACHE_BACKEND', 'socket')
+    monkeypatch.setattr(settings, 'CACHE_ADDRESS', address)
+    monkeypatch.setattr(settings, 'CACHE_AUTHKEY', AUTHKEY)
+    monkeypatch.setattr(settings, 'CACHE_TIMEOUT_SECONDS', 0.5)
+    shared = SharedCache(TTLCache(100, 60))
+    worker.start()
+    assert worker.connected
+
+    async def fetch_while_ticking():
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        ticker = asyncio.create_task(tick())
+        value = await shared.fetch(('NccServers', 'srv-1'))
+        ticker.cancel()
+        return value, ticks
+
+    value, ticks = asyncio.run(fetch_while_ticking())
+    assert value is None
+    assert ticks >= 10
+    assert not worker.connected
+    listener.close()
+    for connection in connections:
+        connection.close()
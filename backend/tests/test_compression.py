@@ -0,0 +1,87 @@
+"""
+Response compression and `fields=` sparse fieldsets on list routes
+"""
+import gzip
+import json
+
+import pytest
+
+from app.compression import brotli, preferred_encoding
+from helpers import API, domain_payload, server_payload, walk
+
+SERVERS = f'{API}/servers/'
+
+@pytest.fixture
+def servers(client):
+    return [client.post(SERVERS, json=server_payload(n, tags=['web', 'api'])).json() for n in range(30)]
+
+def raw_get(client, path: str, accept_encoding: str, **params):
+    """The response with its body exactly as sent (not decoded)"""
+    with client.stream('GET', path, params=params, headers={'Accept-Encoding': accept_encoding}) as response:
+        return response, b''.join(response.iter_raw())
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip, br', 'br' if brotli else 'gzip'),
+    ('br;q=0.5, gzip', 'gzip'),
+    ('gzip;q=0, br;q=0', None),
+    ('identity', None),
+    ('*', 'br' if brotli else 'gzip'),
+    ('gzip;q=0, *;q=0.1', 'br' if brotli else None),
+])
+def test_preferred_encoding(accept, expected):
+    available = ['br', 'gzip'] if brotli else ['gzip']
+    assert preferred_encoding(accept, available) == expected
+
+def test_large_list_is_gzipped(client, servers):
+    plain, body = raw_get(client, SERVERS, 'identity')
+    assert 'content-encoding' not in plain.headers
+
+    response, compressed = raw_get(client, SERVERS, 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'accept-encoding' in response.headers['vary'].lower()
+    assert len(compressed) < len(body)
+    assert json.loads(gzip.decompress(compressed)) == json.loads(body)
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_when_preferred(client, servers):
+    response, compressed = raw_get(client, SERVERS, 'gzip;q=0.8, br')
+    assert response.headers['content-encoding'] == 'br'
+    assert json.loads(brotli.decompress(compressed)) == json.loads(raw_get(client, SERVERS, 'identity')[1])
+
+def test_small_responses_are_not_compressed(client):
+    response, _ = raw_get(client, '/health', 'gzip')
+    assert 'content-encoding' not in response.headers
+
+def test_gzipped_export_is_not_compressed_twice(client, servers):
+    response, body = raw_get(client, f'{SERVERS}export', 'gzip, br', format='ndjson')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert len(gzip.decompress(body).splitlines()) == len(servers)
+
+def test_fields_limit_list_items(client, servers):
+    response = client.get(SERVERS, params={'fields': 'name,status', 'limit': 5})
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [set(item) for item in page['items']] == [{'id', 'name', 'status'}] * 5
+    assert page['next_cursor']
+    rest = walk(client, SERVERS, fields='name', limit=10, cursor=page['next_cursor'])
+    assert len(rest) == len(servers) - 5
+    assert all(set(item) == {'id', 'name'} for item in rest)
+
+def test_fields_with_a_nested_attribute(client, servers):
+    by_id = {server['id']: server for server in servers}
+    item = client.get(SERVERS, params={'fields': 'specs', 'limit': 1}).json()['items'][0]
+    assert item == {'id': item['id'], 'specs': by_id[item['id']]['specs']}
+
+def test_fields_on_filtered_sorted_and_child_lists(client, servers):
+    items = client.get(SERVERS, params={'fields': 'name', 'status': 'online', 'order_by': 'name'}).json()['items']
+    assert [item['name'] for item in items] == sorted(server['name'] for server in servers)
+    assert all(set(item) == {'id', 'name'} for item in items)
+
+    domain = client.post(f'{API}/domains/', json=domain_payload(1, records=2)).json()
+    records = client.get(f"{API}/domains/{domain['id']}/dns", params={'fields': 'value'}).json()['items']
+    assert [set(record) for record in records] == [{'id', 'value'}] * 2
+
+def test_unknown_field_is_400(client):
+    response = client.get(SERVERS, params={'fields': 'name,password'})
+    assert response.status_code == 400
+    assert 'password' in response.json()['detail']
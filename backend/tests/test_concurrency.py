@@ -0,0 +1,69 @@
+"""
+Optimistic concurrency (If-Match / 412) and conditional GETs (ETag / 304)
+"""
+import pytest
+
+from helpers import API, server_payload
+
+SERVERS = f'{API}/servers/'
+
+@pytest.fixture
+def server(client):
+    response = client.post(SERVERS, json=server_payload(1))
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def test_get_returns_a_strong_etag(client, server):
+    response = client.get(f"{SERVERS}{server['id']}")
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('"')
+
+def test_update_with_the_current_etag_succeeds(client, server):
+    etag = client.get(f"{SERVERS}{server['id']}").headers['ETag']
+    response = client.put(f"{SERVERS}{server['id']}", json={'status': 'maintenance'}, headers={'If-Match': etag})
+    assert response.status_code == 200, response.text
+    assert response.json()['status'] == 'maintenance'
+    assert response.headers['ETag'] != etag
+
+def test_update_with_a_stale_etag_is_412(client, server):
+    stale = client.get(f"{SERVERS}{server['id']}").headers['ETag']
+    assert client.put(f"{SERVERS}{server['id']}", json={'status': 'offline'}).status_code == 200
+    response = client.put(f"{SERVERS}{server['id']}", json={'status': 'online'}, headers={'If-Match': stale})
+    assert response.status_code == 412
+    assert client.get(f"{SERVERS}{server['id']}").json()['status'] == 'offline'
+
+def test_weak_etag_never_matches(client, server):
+    etag = client.get(f"{SERVERS}{server['id']}").headers['ETag']
+    response = client.put(f"{SERVERS}{server['id']}", json={'status': 'offline'}, headers={'If-Match': f'W/{etag}'})
+    assert response.status_code == 412
+
+def test_delete_with_a_stale_etag_is_412(client, server):
+    stale = client.get(f"{SERVERS}{server['id']}").headers['ETag']
+    client.put(f"{SERVERS}{server['id']}", json={'status': 'offline'})
+    assert client.delete(f"{SERVERS}{server['id']}", headers={'If-Match': stale}).status_code == 412
+    current = client.get(f"{SERVERS}{server['id']}").headers['ETag']
+    assert client.delete(f"{SERVERS}{server['id']}", headers={'If-Match': current}).status_code == 204
+
+def test_if_match_on_a_missing_item_is_404(client):
+    assert client.put(f'{SERVERS}srv-missing', json={'status': 'offline'}, headers={'If-Match': '"1"'}).status_code == 404
+    assert client.delete(f'{SERVERS}srv-missing', headers={'If-Match': '"1"'}).status_code == 404
+
+def test_unchanged_item_is_304(client, server):
+    first = client.get(f"{SERVERS}{server['id']}")
+    response = client.get(f"{SERVERS}{server['id']}", headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304
+    assert response.content == b''
+
+def test_changed_item_is_200_again(client, server):
+    etag = client.get(f"{SERVERS}{server['id']}").headers['ETag']
+    client.put(f"{SERVERS}{server['id']}", json={'status': 'offline'})
+    response = client.get(f"{SERVERS}{server['id']}", headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json()['status'] == 'offline'
+
+def test_unchanged_list_is_304_until_a_write(client, server):
+    first = client.get(SERVERS)
+    etag = first.headers['ETag']
+    assert client.get(SERVERS, headers={'If-None-Match': etag}).status_code == 304
+    client.post(SERVERS, json=server_payload(2))
+    assert client.get(SERVERS, headers={'If-None-Match': etag}).status_code == 200
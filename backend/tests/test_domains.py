@@ -0,0 +1,88 @@
+"""
+Domains and their DNS records (NccDnsRecords child items)
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.routers import domains
+from helpers import API, domain_payload, walk
+
+DOMAINS = f'{API}/domains/'
+
+@pytest.fixture
+def domain(client):
+    response = client.post(DOMAINS, json=domain_payload(1, records=3))
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def dns(domain_id: str) -> str:
+    return f'{DOMAINS}{domain_id}/dns'
+
+def test_create_writes_records_as_children(client, domain):
+    records = walk(client, dns(domain['id']), limit=2)
+    assert sorted(record['name'] for record in records) == ['host-0', 'host-1', 'host-2']
+    assert all('domainId' not in record for record in records)
+
+def test_add_update_delete_record(client, domain):
+    added = client.post(dns(domain['id']), json={'type': 'MX', 'name': '@', 'value': 'mail.example-1.com', 'ttl': 3600, 'priority': 10})
+    assert added.status_code == 201, added.text
+    record = added.json()
+
+    updated = client.put(f"{dns(domain['id'])}/{record['id']}", json={'ttl': 600}, headers={'If-Match': added.headers['ETag']})
+    assert updated.status_code == 200, updated.text
+    assert updated.json()['ttl'] == 600
+    stale = client.put(f"{dns(domain['id'])}/{record['id']}", json={'ttl': 60}, headers={'If-Match': added.headers['ETag']})
+    assert stale.status_code == 412
+
+    assert client.delete(f"{dns(domain['id'])}/{record['id']}").status_code == 204
+    assert client.delete(f"{dns(domain['id'])}/{record['id']}").status_code == 404
+    assert len(walk(client, dns(domain['id']))) == 3
+
+def test_records_of_a_missing_domain_are_404(client):
+    assert client.get(dns('dom-missing')).status_code == 404
+    assert client.post(dns('dom-missing'), json={'type': 'A', 'name': 'www', 'value': '192.0.2.1', 'ttl': 300}).status_code == 404
+
+def test_record_is_scoped_to_its_domain(client, domain):
+    other = client.post(DOMAINS, json=domain_payload(2)).json()
+    record_id = walk(client, dns(domain['id']))[0]['id']
+    assert client.put(f"{dns(other['id'])}/{record_id}", json={'ttl': 60}).status_code == 404
+    assert client.delete(f"{dns(other['id'])}/{record_id}").status_code == 404
+
+def test_deleting_a_domain_deletes_its_records(client, domain):
+    assert client.delete(f"{DOMAINS}{domain['id']}").status_code == 204
+    assert domains.dns_db.table.scan()['Items'] == []
+
+def test_create_reports_unwritten_records_as_503(client, monkeypatch):
+    async def put_children(parent_id, records):
+        return {records[0]['id']}
+    monkeypatch.setattr(domains.dns_db, 'put_children', put_children)
+
+    response = client.post(DOMAINS, json=domain_payload(1, records=2))
+    assert response.status_code == 503, response.text
+    assert 'DNS records' in response.json()['detail']
+
+def certificate(valid_to: str) -> dict:
+    return {'issuer': "Let's Encrypt", 'validFrom': '2026-01-01', 'validTo': valid_to, 'status': 'valid'}
+
+def test_certificate_without_valid_to_stays_out_of_the_ssl_index(client):
+    response = client.post(DOMAINS, json=domain_payload(1, ssl=certificate('')))
+    assert response.status_code == 201, response.text
+    assert response.json()['ssl']['validTo'] == ''
+    stored = domains.db.table.get_item(Key={'id': response.json()['id']})['Item']
+    assert 'sslStatus' not in stored and 'sslValidTo' not in stored
+
+def test_ssl_index_follows_certificate_updates(client):
+    soon = (date.today() + timedelta(days=10)).isoformat()
+    domain = client.post(DOMAINS, json=domain_payload(1, ssl=certificate(soon))).json()
+    expiring = lambda: [item['id'] for item in client.get(f'{DOMAINS}ssl/expiring', params={'within': '30d'}).json()]
+    assert expiring() == [domain['id']]
+
+    response = client.put(f"{DOMAINS}{domain['id']}", json={'ssl': certificate('')})
+    assert response.status_code == 200, response.text
+    assert expiring() == []
+
+    client.put(f"{DOMAINS}{domain['id']}", json={'ssl': certificate(soon)})
+    assert expiring() == [domain['id']]
+    client.put(f"{DOMAINS}{domain['id']}", json={'ssl': None})
+    assert expiring() == []
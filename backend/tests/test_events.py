@@ -0,0 +1,133 @@
+"""
+Server-Sent Events change feed (GET /events)
+
+TestClient buffers whole responses, so streams are read from the app
+served by uvicorn on a background thread; writes still go through the
+`client` fixture and reach the stream through the shared event log.
+"""
+import json
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from app.config import settings
+from app.events import event_log
+from app.main import app
+from helpers import API, domain_payload, server_payload
+
+@pytest.fixture(scope='module')
+def server_url():
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=0, lifespan='off', log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "uvicorn did not start"
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}'
+    server.should_exit = True
+    thread.join(10)
+
+@pytest.fixture(autouse=True)
+def quick_heartbeats(monkeypatch):
+    monkeypatch.setattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 0.2)
+
+class Subscriber:
+    """One open stream, read an event at a time"""
+
+    def __init__(self, response: httpx.Response):
+        self.lines = response.iter_lines()
+
+    def next_event(self) -> dict:
+        """The next named event (skipping the retry hint and heartbeats)"""
+        event = {}
+        for line in self.lines:
+            if line:
+                field, _, value = line.partition(': ')
+                event[field] = value
+            elif 'event' in event:
+                if 'data' in event:
+                    event['data'] = json.loads(event['data'])
+                return event
+            else:
+                event = {}
+        raise AssertionError("stream ended")
+
+def subscribe(server_url: str, **params):
+    headers = params.pop('headers', {})
+    return httpx.stream('GET', f'{server_url}{API}/events/', params=params, headers=headers, timeout=5)
+
+def wait_for_subscribers(count: int) -> None:
+    deadline = time.monotonic() + 5
+    while event_log.stats()['subscribers'] != count:
+        assert time.monotonic() < deadline, f"{event_log.stats()['subscribers']} subscribers, expected {count}"
+        time.sleep(0.01)
+
+def test_writes_stream_as_events(client, server_url):
+    with subscribe(server_url) as response:
+        assert response.headers['content-type'].startswith('text/event-stream')
+        events = Subscriber(response)
+        server = client.post(f'{API}/servers/', json=server_payload(1)).json()
+        client.put(f"{API}/servers/{server['id']}", json={'status': 'offline'})
+        client.delete(f"{API}/servers/{server['id']}")
+
+        created, updated, deleted = (events.next_event() for _ in range(3))
+    assert [created['event'], updated['event'], deleted['event']] == ['created', 'updated', 'deleted']
+    assert created['data']['item']['name'] == 'srv-01'
+    assert updated['data']['item']['status'] == 'offline'
+    assert deleted['data'] == {'type': 'deleted', 'resource': 'servers', 'id': server['id']}
+    sequence = [int(event['id'].rpartition('-')[2]) for event in (created, updated, deleted)]
+    assert sequence == list(range(sequence[0], sequence[0] + 3))
+
+def test_resource_filter(client, server_url):
+    with subscribe(server_url, resource='dns') as response:
+        events = Subscriber(response)
+        client.post(f'{API}/servers/', json=server_payload(1))
+        domain = client.post(f'{API}/domains/', json=domain_payload(1)).json()
+        client.post(f"{API}/domains/{domain['id']}/dns", json={'type': 'A', 'name': 'www', 'value': '192.0.2.1', 'ttl': 300})
+        event = events.next_event()
+    assert (event['event'], event['data']['resource'], event['data']['domainId']) == ('created', 'dns', domain['id'])
+
+def test_resume_after_last_event_id(client, server_url):
+    with subscribe(server_url, resource='servers') as response:
+        events = Subscriber(response)
+        first = client.post(f'{API}/servers/', json=server_payload(1)).json()
+        token = events.next_event()['id']
+    second = client.post(f'{API}/servers/', json=server_payload(2)).json()
+    third = client.post(f'{API}/servers/', json=server_payload(3)).json()
+
+    with subscribe(server_url, resource='servers', headers={'Last-Event-ID': token}) as response:
+        events = Subscriber(response)
+        missed = [events.next_event()['data']['id'] for _ in range(2)]
+    assert first['id'] not in missed
+    assert missed == [second['id'], third['id']]
+
+def test_unresumable_token_starts_with_a_reset(client, server_url):
+    with subscribe(server_url, since='another-epoch-5') as response:
+        events = Subscriber(response)
+        assert events.next_event()['event'] == 'reset'
+        server = client.post(f'{API}/servers/', json=server_payload(1)).json()
+        assert events.next_event()['data']['id'] == server['id']
+
+def test_unknown_resource_is_400(client):
+    assert client.get(f'{API}/events/', params={'resource': 'printers'}).status_code == 400
+
+def test_subscriber_slots(client, server_url, monkeypatch):
+    monkeypatch.setattr(settings, 'EVENTS_MAX_SUBSCRIBERS', 1)
+    wait_for_subscribers(0)
+    with subscribe(server_url) as response:
+        assert response.status_code == 200
+        events = Subscriber(response)
+        next(events.lines)
+        wait_for_subscribers(1)
+        refused = httpx.get(f'{server_url}{API}/events/', timeout=5)
+        assert refused.status_code == 503
+        assert refused.headers['Retry-After'] == '30'
+    # Closing the stream frees the slot
+    wait_for_subscribers(0)
+    with subscribe(server_url) as response:
+        assert response.status_code == 200
@@ -0,0 +1,101 @@
+"""
+Streaming exports and bulk imports, and the round trip between them
+"""
+import asyncio
+import gzip
+import json
+import tempfile
+
+import pytest
+
+from app.config import settings
+from app.routers import imports
+from helpers import API, domain_payload, server_payload, walk
+
+DOMAINS = f'{API}/domains/'
+
+def export(client, resource: str, export_format: str) -> bytes:
+    response = client.get(f'{API}/{resource}/export', params={'format': export_format}, headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200, response.text
+    return response.content
+
+def import_body(client, resource: str, export_format: str, body: bytes, **headers):
+    return client.post(f'{API}/import/{resource}', params={'format': export_format}, content=body, headers=headers)
+
+def dns_names(client, domain_ids) -> dict:
+    return {
+        domain_id: sorted(record['name'] for record in walk(client, f'{DOMAINS}{domain_id}/dns'))
+        for domain_id in domain_ids
+    }
+
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+def test_server_round_trip(client, export_format):
+    for n in range(5):
+        client.post(f'{API}/servers/', json=server_payload(n))
+    before = walk(client, f'{API}/servers/')
+    body = export(client, 'servers', export_format)
+    for server in before:
+        assert client.delete(f"{API}/servers/{server['id']}").status_code == 204
+
+    result = import_body(client, 'servers', export_format, body).json()
+    assert (result['imported'], result['rejected'], result['failed']) == (5, 0, 0)
+    key = lambda server: server['id']
+    assert sorted(walk(client, f'{API}/servers/'), key=key) == sorted(before, key=key)
+
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+def test_domain_round_trip_keeps_dns_records(client, export_format):
+    ids = [client.post(DOMAINS, json=domain_payload(n, records=n)).json()['id'] for n in range(4)]
+    before = dns_names(client, ids)
+    body = export(client, 'domains', export_format)
+    for domain_id in ids:
+        assert client.delete(f'{DOMAINS}{domain_id}').status_code == 204
+
+    result = import_body(client, 'domains', export_format, body).json()
+    assert (result['imported'], result['rejected'], result['failed']) == (4, 0, 0)
+    assert dns_names(client, ids) == before
+    assert [len(names) for names in before.values()] == [0, 1, 2, 3]
+
+def test_export_lists_dns_records(client):
+    client.post(DOMAINS, json=domain_payload(1, records=2))
+    rows = [json.loads(line) for line in export(client, 'domains', 'ndjson').splitlines()]
+    assert [sorted(record['name'] for record in row['dnsRecords']) for row in rows] == [['host-0', 'host-1']]
+
+def test_gzip_import(client):
+    body = b''.join(json.dumps(server_payload(n)).encode() + b'\n' for n in range(50))
+    result = import_body(client, 'servers', 'ndjson', gzip.compress(body), **{'Content-Encoding': 'gzip'}).json()
+    assert (result['read'], result['imported']) == (50, 50)
+
+def test_invalid_gzip_is_400(client):
+    response = import_body(client, 'servers', 'ndjson', b'\x1f\x8bnot gzip', **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 400
+
+def test_body_over_the_cap_is_413(client, monkeypatch):
+    monkeypatch.setattr(settings, 'IMPORT_MAX_BYTES', 64 * 1024)
+    response = import_body(client, 'servers', 'ndjson', b' ' * (65 * 1024))
+    assert response.status_code == 413
+
+def test_gzip_bomb_is_413(client, monkeypatch):
+    monkeypatch.setattr(settings, 'IMPORT_MAX_BYTES', 64 * 1024)
+    bomb = gzip.compress(b' ' * (16 * 1024 * 1024))
+    assert len(bomb) < 64 * 1024
+    response = import_body(client, 'servers', 'ndjson', bomb, **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 413
+
+def test_spool_writes_run_off_the_event_loop(client, monkeypatch):
+    writes_on_loop = []
+
+    class Spool(tempfile.SpooledTemporaryFile):
+        def write(self, data):
+            try:
+                asyncio.get_running_loop()
+                writes_on_loop.append(len(data))
+            except RuntimeError:
+                pass
+            return super().write(data)
+
+    monkeypatch.setattr(imports, 'SPOOL_MAX_BYTES', 1024)
+    monkeypatch.setattr(imports.tempfile, 'SpooledTemporaryFile', Spool)
+    body = b''.join(json.dumps(server_payload(n)).encode() + b'\n' for n in range(200))
+    result = import_body(client, 'servers', 'ndjson', gzip.compress(body), **{'Content-Encoding': 'gzip'}).json()
+    assert (result['read'], result['imported']) == (200, 200)
+    assert writes_on_loop == []
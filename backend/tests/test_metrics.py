@@ -0,0 +1,102 @@
+"""
+Prometheus metrics (app/metrics.py) and GET /metrics
+"""
+import pytest
+from botocore.exceptions import ClientError
+
+from app.metrics import Counter, Metric
+from app.routers import servers
+from helpers import API, server_payload
+
+def test_incomplete_metric_fails_when_created():
+    class Gauge(Metric):
+        kind = 'gauge'
+
+        def state(self):
+            return {}
+
+    with pytest.raises(TypeError):
+        Gauge('ncc_test_gauge', 'A metric without merge or samples', ())
+
+def test_counter_renders_merged_states():
+    counter = Counter('ncc_test_total', 'Test counter', ['route'])
+    counter.inc(('/a',), 2)
+    lines = counter.render([{('/a',): 3, ('/b',): 1}])
+    assert lines == [
+        '# HELP ncc_test_total Test counter',
+        '# TYPE ncc_test_total counter',
+        'ncc_test_total{route="/a"} 5',
+        'ncc_test_total{route="/b"} 1',
+    ]
+
+def scrape(client) -> dict:
+    """Every sample of GET /metrics, by series"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith('#'):
+            series, _, value = line.rpartition(' ')
+            samples[series] = float(value)
+    return samples
+
+def growth(before: dict, after: dict) -> dict:
+    """Series that changed between two scrapes, and by how much"""
+    return {series: value - before.get(series, 0) for series, value in after.items() if value != before.get(series, 0)}
+
+def test_requests_are_counted_under_their_route_template(client):
+    server = client.post(f'{API}/servers/', json=server_payload(1)).json()
+    before = scrape(client)
+    client.get(f"{API}/servers/{server['id']}")
+    client.get(f'{API}/servers/srv-missing')
+    client.get('/no-such-page')
+    changed = growth(before, scrape(client))
+
+    route = f'{API}/servers/{{server_id}}'
+    assert changed[f'ncc_http_requests_total{{method="GET",route="{route}",status="200"}}'] == 1
+    assert changed[f'ncc_http_requests_total{{method="GET",route="{route}",status="404"}}'] == 1
+    assert changed['ncc_http_requests_total{method="GET",route="unmatched",status="404"}'] == 1
+    assert changed[f'ncc_http_request_duration_seconds_count{{method="GET",route="{route}"}}'] == 2
+    assert not any(server['id'] in series for series in changed)
+
+def test_dynamodb_calls_capacity_and_cache_per_route(client):
+    server = client.post(f'{API}/servers/', json=server_payload(1)).json()
+    route = f'{API}/servers/{{server_id}}'
+    before = scrape(client)
+    client.get(f"{API}/servers/{server['id']}")
+    changed = growth(before, scrape(client))
+
+    # POST already cached the item, so the read is a hit and costs no call
+    assert changed[f'ncc_cache_lookups_total{{route="{route}",result="hit"}}'] == 1
+    assert not any(series.startswith(f'ncc_dynamodb_calls_total{{route="{route}"') for series in changed)
+
+    before = scrape(client)
+    client.get(f'{API}/servers/srv-missing')
+    changed = growth(before, scrape(client))
+    assert changed[f'ncc_cache_lookups_total{{route="{route}",result="miss"}}'] == 1
+    assert changed[f'ncc_dynamodb_calls_total{{route="{route}",table="NccServers",operation="get_item"}}'] == 1
+    assert changed[f'ncc_dynamodb_consumed_capacity_units_total{{route="{route}",table="NccServers",capacity="read"}}'] > 0
+
+def test_scanned_and_returned_items(client):
+    for n in range(4):
+        client.post(f'{API}/servers/', json=server_payload(n, status='online' if n % 2 else 'offline'))
+    before = scrape(client)
+    client.get(f'{API}/servers/', params={'status': 'online'})
+    changed = growth(before, scrape(client))
+    returned = [value for series, value in changed.items() if series.startswith(f'ncc_dynamodb_items_returned_total{{route="{API}/servers/"')]
+    scanned = [value for series, value in changed.items() if series.startswith(f'ncc_dynamodb_items_scanned_total{{route="{API}/servers/"')]
+    assert sum(returned) == 2
+    assert sum(scanned) >= sum(returned)
+
+def test_dynamodb_errors_by_code(client, monkeypatch):
+    def throttled(**kwargs):
+        raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Slow down'}}, 'GetItem')
+    monkeypatch.setattr(servers.db.table, 'get_item', throttled)
+    before = scrape(client)
+    assert client.get(f'{API}/servers/srv-1').status_code == 500
+    changed = growth(before, scrape(client))
+    route = f'{API}/servers/{{server_id}}'
+    series = (f'ncc_dynamodb_errors_total{{route="{route}",table="NccServers",'
+              f'operation="get_item",code="ProvisionedThroughputExceededException"}}')
+    assert changed[series] == 1
@@ -0,0 +1,89 @@
+"""
+Cursor pagination and order_by on the list routes
+"""
+import pytest
+
+from helpers import API, domain_payload, make_cursor, server_payload, walk
+
+SERVERS = f'{API}/servers/'
+
+@pytest.fixture
+def servers(client):
+    created = []
+    for n in range(9):
+        response = client.post(SERVERS, json=server_payload(
+            n,
+            status='online' if n % 2 else 'offline',
+            category='staging' if n % 3 == 0 else 'production'
+        ))
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+    return created
+
+def test_scan_pages_cover_every_item_once(client, servers):
+    ids = [item['id'] for item in walk(client, SERVERS, limit=2)]
+    assert sorted(ids) == sorted(server['id'] for server in servers)
+
+def test_index_pages_keep_the_filter(client, servers):
+    items = walk(client, SERVERS, limit=2, status='online')
+    assert {item['status'] for item in items} == {'online'}
+    assert len(items) == sum(server['status'] == 'online' for server in servers)
+
+def test_last_page_has_no_cursor(client, servers):
+    response = client.get(SERVERS, params={'limit': 100})
+    assert len(response.json()['items']) == len(servers)
+    assert response.json()['next_cursor'] is None
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 json!',
+    make_cursor({'foo': 'bar'}),
+    make_cursor({'id': 5}),
+    make_cursor({'id': ''}),
+    make_cursor({'id': 'srv', 'extra': 'x'}),
+])
+def test_malformed_or_foreign_cursor_is_400(client, servers, cursor):
+    response = client.get(SERVERS, params={'cursor': cursor})
+    assert response.status_code == 400, response.text
+    assert 'cursor' in response.json()['detail'].lower()
+
+def test_cursor_from_another_filter_is_400(client, servers):
+    cursor = client.get(SERVERS, params={'limit': 1, 'status': 'online'}).json()['next_cursor']
+    assert client.get(SERVERS, params={'status': 'offline', 'cursor': cursor}).status_code == 400
+    assert client.get(SERVERS, params={'cursor': cursor}).status_code == 400
+
+def test_cursor_from_another_table_is_400(client, servers):
+    domain = client.post(f'{API}/domains/', json=domain_payload(1, records=3)).json()
+    cursor = client.get(f"{API}/domains/{domain['id']}/dns", params={'limit': 1}).json()['next_cursor']
+    assert client.get(SERVERS, params={'cursor': cursor}).status_code == 400
+
+def test_dns_cursor_from_another_domain_is_400(client):
+    first = client.post(f'{API}/domains/', json=domain_payload(1, records=3)).json()
+    second = client.post(f'{API}/domains/', json=domain_payload(2)).json()
+    cursor = client.get(f"{API}/domains/{first['id']}/dns", params={'limit': 1}).json()['next_cursor']
+    assert cursor
+    assert client.get(f"{API}/domains/{second['id']}/dns", params={'cursor': cursor}).status_code == 400
+
+def test_order_by_merges_index_partitions(client, servers):
+    names = [item['name'] for item in walk(client, SERVERS, limit=2, order_by='name')]
+    assert names == sorted(server['name'] for server in servers)
+
+def test_order_by_descending_within_a_filter(client, servers):
+    names = [item['name'] for item in walk(client, SERVERS, limit=2, order_by='name', category='staging', direction='desc')]
+    assert names == sorted((server['name'] for server in servers if server['category'] == 'staging'), reverse=True)
+
+def test_order_by_on_an_unindexed_field(client, servers):
+    addresses = [item['ipAddress'] for item in walk(client, SERVERS, limit=4, order_by='ipAddress', direction='desc')]
+    assert addresses == sorted((server['ipAddress'] for server in servers), reverse=True)
+
+def test_cursor_from_another_order_by_is_400(client, servers):
+    by_name = client.get(SERVERS, params={'limit': 2, 'order_by': 'name'}).json()['next_cursor']
+    staging = client.get(SERVERS, params={'limit': 1, 'order_by': 'name', 'category': 'staging'}).json()['next_cursor']
+    assert client.get(SERVERS, params={'order_by': 'ipAddress', 'cursor': by_name}).status_code == 400
+    assert client.get(SERVERS, params={'cursor': by_name}).status_code == 400
+    assert client.get(SERVERS, params={'order_by': 'name', 'category': 'staging', 'cursor': by_name}).status_code == 400
+    assert client.get(SERVERS, params={'order_by': 'name', 'category': 'production', 'cursor': staging}).status_code == 400
+
+def test_order_by_cursor_with_a_wrong_value_type_is_400(client, servers):
+    cursor = make_cursor({'orderBy': 'name', 'value': 5, 'id': 'srv'})
+    assert client.get(SERVERS, params={'order_by': 'name', 'cursor': cursor}).status_code == 400
+    assert client.get(SERVERS, params={'order_by': 'name', 'cursor': make_cursor({'id': 'srv'})}).status_code == 400
@@ -0,0 +1,68 @@
+"""
+Ranked prefix search across resources (GET /search)
+"""
+import pytest
+
+from helpers import API, domain_payload, server_payload
+
+SEARCH = f'{API}/search/'
+
+def search(client, q: str, **params) -> dict:
+    response = client.get(SEARCH, params={'q': q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def titles(result: dict) -> list:
+    return [hit['title'] for hit in result['items']]
+
+@pytest.fixture
+def inventory(client):
+    servers = [
+        client.post(f'{API}/servers/', json=server_payload(1, name='web-prod-01', ipAddress='10.0.1.5', tags=['nginx'])).json(),
+        client.post(f'{API}/servers/', json=server_payload(2, name='web-prod-02', ipAddress='10.0.1.6')).json(),
+        client.post(f'{API}/servers/', json=server_payload(3, name='db-staging', ipAddress='10.0.2.5', tags=['webhooks'])).json(),
+    ]
+    domains = [client.post(f'{API}/domains/', json=domain_payload(1, name='webshop.example.com')).json()]
+    return {'servers': servers, 'domains': domains}
+
+def test_every_word_must_prefix_a_word(client, inventory):
+    assert sorted(titles(search(client, 'web prod'))) == ['web-prod-01', 'web-prod-02']
+    assert titles(search(client, 'prod 02')) == ['web-prod-02']
+    assert search(client, 'prod nothing') == {'items': [], 'total': 0}
+
+def test_hits_span_resources_and_name_outranks_tags(client, inventory):
+    result = search(client, 'web')
+    assert result['total'] == 4
+    assert {hit['resource'] for hit in result['items']} == {'servers', 'domains'}
+    assert titles(result)[-1] == 'db-staging'
+
+def test_whole_value_prefix_ranks_first(client, inventory):
+    # 10.0.2.5 has words starting 10, 0 and 1 too, but does not start with 10.0.1
+    result = search(client, '10.0.1')
+    assert sorted(titles(result)[:2]) == ['web-prod-01', 'web-prod-02']
+    assert [hit['subtitle'][:7] for hit in result['items']] == ['10.0.1.', '10.0.1.', '10.0.2.']
+
+def test_resource_filter_and_limit(client, inventory):
+    result = search(client, 'web', resource='domains')
+    assert titles(result) == ['webshop.example.com']
+    limited = search(client, 'web', limit=2)
+    assert (len(limited['items']), limited['total']) == (2, 4)
+
+def test_unknown_resource_is_400(client, inventory):
+    assert client.get(SEARCH, params={'q': 'web', 'resource': 'printers'}).status_code == 400
+
+def test_empty_query_is_422(client):
+    assert client.get(SEARCH, params={'q': ''}).status_code == 422
+
+def test_index_follows_writes(client, inventory):
+    server = inventory['servers'][0]
+    client.put(f"{API}/servers/{server['id']}", json={'name': 'cache-prod-01'})
+    assert 'web-prod-01' not in titles(search(client, 'web'))
+    assert titles(search(client, 'cache')) == ['cache-prod-01']
+
+    client.delete(f"{API}/servers/{server['id']}")
+    assert search(client, 'cache')['total'] == 0
+
+def test_bulk_writes_are_indexed(client):
+    client.post(f'{API}/servers/bulk', json={'create': [server_payload(n, name=f'batch-node-{n}') for n in range(5)]})
+    assert search(client, 'batch node')['total'] == 5
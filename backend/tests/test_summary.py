@@ -0,0 +1,91 @@
+"""
+Precomputed summaries (NccStats) behind GET /{resource}/summary
+"""
+import random
+from collections import Counter
+
+from helpers import API, domain_payload, server_payload, walk
+
+SERVERS = f'{API}/servers/'
+DOMAINS = f'{API}/domains/'
+
+def summary(client, path: str) -> dict:
+    response = client.get(f'{path}summary')
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def recount(client, path: str, fields) -> dict:
+    """The summary a full scan gives"""
+    items = walk(client, path)
+    return {
+        'total': len(items),
+        'counts': {field: dict(Counter(item[field] for item in items)) for field in fields}
+    }
+
+def test_empty_table(client):
+    assert summary(client, SERVERS) == {'total': 0, 'counts': {'status': {}, 'category': {}}, 'sums': {}}
+
+def test_create_update_delete_adjust_the_counters(client):
+    first = client.post(SERVERS, json=server_payload(1)).json()
+    client.post(SERVERS, json=server_payload(2, category='staging'))
+    client.put(f"{SERVERS}{first['id']}", json={'status': 'maintenance'})
+    assert summary(client, SERVERS)['counts'] == {
+        'status': {'online': 1, 'maintenance': 1},
+        'category': {'production': 1, 'staging': 1}
+    }
+    client.delete(f"{SERVERS}{first['id']}")
+    result = summary(client, SERVERS)
+    assert result['total'] == 1
+    assert result['counts']['status'] == {'online': 1}
+
+def test_rejected_writes_leave_the_counters_alone(client):
+    server = client.post(SERVERS, json=server_payload(1)).json()
+    before = summary(client, SERVERS)
+    stale = client.put(f"{SERVERS}{server['id']}", json={'status': 'offline'}, headers={'If-Match': '"99"'})
+    assert stale.status_code == 412
+    assert client.delete(f'{SERVERS}srv-missing').status_code == 404
+    assert summary(client, SERVERS) == before
+
+def test_sums_follow_numeric_attributes(client):
+    first = client.post(DOMAINS, json=domain_payload(1, cost=10.5)).json()
+    client.post(DOMAINS, json=domain_payload(2, cost=4.25))
+    assert summary(client, DOMAINS)['sums'] == {'cost': 14.75}
+    client.put(f"{DOMAINS}{first['id']}", json={'cost': 1.0})
+    assert summary(client, DOMAINS)['sums'] == {'cost': 5.25}
+
+def test_counters_match_a_recount_after_mixed_writes(client):
+    rng = random.Random(7)
+    statuses = ['online', 'offline', 'maintenance']
+    ids = [client.post(SERVERS, json=server_payload(n, status=rng.choice(statuses))).json()['id'] for n in range(30)]
+    for server_id in rng.sample(ids, 10):
+        client.put(f'{SERVERS}{server_id}', json={'status': rng.choice(statuses), 'category': 'staging'})
+    bulk = client.post(f'{SERVERS}bulk', json={
+        'create': [server_payload(n, status='offline') for n in range(40, 45)],
+        'delete': rng.sample(ids, 8)
+    })
+    assert bulk.json()['failed'] == 0
+
+    result = summary(client, SERVERS)
+    expected = recount(client, SERVERS, ['status', 'category'])
+    assert result['total'] == expected['total'] == 27
+    assert result['counts'] == expected['counts']
+
+def test_summary_revalidates_with_an_etag(client):
+    client.post(SERVERS, json=server_payload(1))
+    etag = client.get(f'{SERVERS}summary').headers['ETag']
+    assert client.get(f'{SERVERS}summary', headers={'If-None-Match': etag}).status_code == 304
+    client.post(SERVERS, json=server_payload(2))
+    response = client.get(f'{SERVERS}summary', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json()['total'] == 2
+
+def test_fleet_summary_matches_each_resource(client):
+    client.post(SERVERS, json=server_payload(1))
+    client.post(DOMAINS, json=domain_payload(1, cost=3.5))
+    response = client.get(f'{API}/summary/')
+    assert response.status_code == 200, response.text
+    fleet = response.json()
+    assert set(fleet) == {'servers', 'domains', 'emails', 'repositories', 'storage'}
+    assert fleet['servers'] == summary(client, SERVERS)
+    assert fleet['domains'] == summary(client, DOMAINS)
+    assert fleet['emails']['total'] == 0
@@ -5,12 +5,13 @@ import { DomainStatusBadge } from '../features/domains/DomainStatusBadge';
 import { ExpiryIndicator } from '../features/domains/ExpiryIndicator';
 import { DNSRecordsTable } from '../features/domains/DNSRecordsTable';
 import { ArrowLeft, Lock } from 'lucide-react';
-import type { Domain } from '../types/domain';
+import type { DNSRecord, Domain } from '../types/domain';
 
 export const DomainDetailsPage = () => {
     const { id } = useParams<{ id: string }>();
     const navigate = useNavigate();
     const [domain, setDomain] = useState<Domain | null>(null);
+    const [dnsRecords, setDnsRecords] = useState<DNSRecord[]>([]);
     const [activeTab, setActiveTab] = useState<'overview' | 'dns'>('overview');
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
@@ -25,8 +26,12 @@ export const DomainDetailsPage = () => {
         try {
             setLoading(true);
             setError(null);
-            const data = await DomainService.getDomain(domainId);
+            const [data, records] = await Promise.all([
+                DomainService.getDomain(domainId),
+                DomainService.getDNSRecords(domainId)
+            ]);
             setDomain(data);
+            setDnsRecords(records);
         } catch (err) {
             setError(err instanceof Error ? err.message : 'Failed to load domain');
             console.error('Error loading domain:', err);
@@ -202,7 +207,7 @@ export const DomainDetailsPage = () => {
             )}
 
             {activeTab === 'dns' && (
-                <DNSRecordsTable records={domain.dnsRecords || []} />
+                <DNSRecordsTable records={dnsRecords} />
             )}
         </div>
     );
@@ -27,4 +27,45 @@ api.interceptors.response.use(
     }
 );
 
+/**
+ * One page of a list endpoint response
+ */
+export interface Page<T> {
+    items: T[];
+    next_cursor: string | null;
+}
+
+/**
+ * Follow `next_cursor` until a list endpoint is exhausted
+ */
+export async function fetchAllPages<T>(url: string, params?: URLSearchParams): Promise<T[]> {
+    const items: T[] = [];
+    let cursor: string | null = null;
+    do {
+        const pageParams = new URLSearchParams(params);
+        if (cursor) pageParams.set('cursor', cursor);
+        const response = await api.get<Page<T>>(url, { params: pageParams });
+        items.push(...response.data.items);
+        cursor = response.data.next_cursor;
+    } while (cursor);
+    return items;
+}
+
+/**
+ * Precomputed counters returned by `/{resource}/summary`
+ */
+export interface ResourceSummary {
+    total: number;
+    counts: Record<string, Record<string, number>>;
+    sums: Record<string, number>;
+}
+
+/**
+ * Counters for every resource in one request (dashboard)
+ */
+export async function fetchSummary(): Promise<Record<string, ResourceSummary>> {
+    const response = await api.get<Record<string, ResourceSummary>>('/summary/');
+    return response.data;
+}
+
 export default api;
@@ -1,5 +1,5 @@
-import api from './api';
-import type { Domain, DomainStatus } from '../types/domain';
+import api, { fetchAllPages } from './api';
+import type { DNSRecord, Domain, DomainStatus } from '../types/domain';
 
 // Domain API Service
 export class DomainService {
@@ -15,14 +15,43 @@ export class DomainService {
             if (filters?.status) params.append('status', filters.status);
             if (filters?.registrar) params.append('registrar', filters.registrar);
 
-            const response = await api.get<Domain[]>('/domains', { params });
-            return response.data;
+            return await fetchAllPages<Domain>('/domains', params);
         } catch (error) {
             console.error('Failed to fetch domains:', error);
             throw new Error('Failed to load domains. Please check your connection.');
         }
     }
 
+    /**
+     * Domains expiring within a window ('30d', '4w'), soonest first
+     */
+    static async getExpiringDomains(within = '30d', includeExpired = false): Promise<Domain[]> {
+        try {
+            const response = await api.get<Domain[]>('/domains/expiring', {
+                params: { within, include_expired: includeExpired },
+            });
+            return response.data;
+        } catch (error) {
+            console.error('Failed to fetch expiring domains:', error);
+            throw new Error('Failed to load expiring domains.');
+        }
+    }
+
+    /**
+     * Domains whose SSL certificate expires within a window, soonest first
+     */
+    static async getExpiringCertificates(within = '30d', includeExpired = false): Promise<Domain[]> {
+        try {
+            const response = await api.get<Domain[]>('/domains/ssl/expiring', {
+                params: { within, include_expired: includeExpired },
+            });
+            return response.data;
+        } catch (error) {
+            console.error('Failed to fetch expiring certificates:', error);
+            throw new Error('Failed to load expiring certificates.');
+        }
+    }
+
     /**
      * Get a single domain by ID
      */
@@ -79,6 +108,18 @@ export class DomainService {
         }
     }
 
+    /**
+     * Fetch all DNS records of a domain (stored and paginated separately)
+     */
+    static async getDNSRecords(domainId: string): Promise<DNSRecord[]> {
+        try {
+            return await fetchAllPages<DNSRecord>(`/domains/${domainId}/dns`);
+        } catch (error) {
+            console.error(`Failed to fetch DNS records for domain ${domainId}:`, error);
+            throw new Error('Failed to load DNS records.');
+        }
+    }
+
     /**
      * Add a DNS record to a domain
      */
@@ -90,9 +131,9 @@ export class DomainService {
             value: string;
             ttl: number;
         }
-    ): Promise<Domain> {
+    ): Promise<DNSRecord> {
         try {
-            const response = await api.post<Domain>(`/domains/${domainId}/dns`, recordData);
+            const response = await api.post<DNSRecord>(`/domains/${domainId}/dns`, recordData);
             return response.data;
         } catch (error) {
             console.error(`Failed to add DNS record to domain ${domainId}:`, error);
@@ -112,9 +153,9 @@ export class DomainService {
             value: string;
             ttl: number;
         }>
-    ): Promise<Domain> {
+    ): Promise<DNSRecord> {
         try {
-            const response = await api.put<Domain>(`/domains/${domainId}/dns/${recordId}`, recordData);
+            const response = await api.put<DNSRecord>(`/domains/${domainId}/dns/${recordId}`, recordData);
             return response.data;
         } catch (error) {
             console.error(`Failed to update DNS record ${recordId}:`, error);
@@ -125,10 +166,9 @@ export class DomainService {
     /**
      * Delete a DNS record
      */
-    static async deleteDNSRecord(domainId: string, recordId: string): Promise<Domain> {
+    static async deleteDNSRecord(domainId: string, recordId: string): Promise<void> {
         try {
-            const response = await api.delete<Domain>(`/domains/${domainId}/dns/${recordId}`);
-            return response.data;
+            await api.delete(`/domains/${domainId}/dns/${recordId}`);
         } catch (error) {
             console.error(`Failed to delete DNS record ${recordId}:`, error);
             throw new Error('Failed to delete DNS record. Please try again.');
@@ -1,4 +1,4 @@
-import api from './api';
+import api, { fetchAllPages } from './api';
 import type { EmailAccount, EmailStatus } from '../types/email';
 
 export class EmailService {
@@ -12,8 +12,7 @@ export class EmailService {
             if (filters?.status) params.append('status', filters.status);
             if (filters?.provider) params.append('provider', filters.provider);
             if (filters?.department) params.append('department', filters.department);
-            const response = await api.get<EmailAccount[]>('/emails', { params });
-            return response.data;
+            return await fetchAllPages<EmailAccount>('/emails', params);
         } catch (error) {
             console.error('Failed to fetch emails:', error);
             throw new Error('Failed to load email accounts.');
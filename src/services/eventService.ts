@@ -0,0 +1,33 @@
+import api from './api';
+
+export type EventResource = 'servers' | 'domains' | 'dns' | 'emails' | 'repositories' | 'storage';
+
+export interface ChangeEvent<T = unknown> {
+    type: 'created' | 'updated' | 'deleted';
+    resource: EventResource;
+    id: string;
+    domainId?: string;
+    item?: T;
+}
+
+// Live change feed (Server-Sent Events)
+export class EventService {
+    /**
+     * Subscribe to create/update/delete events; the browser reconnects and
+     * resumes on its own. `onReset` fires when events were missed and local
+     * state should be reloaded. Returns an unsubscribe function.
+     */
+    static subscribe(
+        resources: EventResource[],
+        onEvent: (event: ChangeEvent) => void,
+        onReset?: () => void
+    ): () => void {
+        const params = new URLSearchParams();
+        resources.forEach((resource) => params.append('resource', resource));
+        const source = new EventSource(`${api.defaults.baseURL}/events/?${params}`);
+        const handle = (message: MessageEvent<string>) => onEvent(JSON.parse(message.data));
+        ['created', 'updated', 'deleted'].forEach((type) => source.addEventListener(type, handle));
+        source.addEventListener('reset', () => onReset?.());
+        return () => source.close();
+    }
+}
@@ -1,4 +1,4 @@
-import api from './api';
+import api, { fetchAllPages } from './api';
 import type { Repository, RepoVisibility } from '../types/repository';
 
 export class RepositoryService {
@@ -12,8 +12,7 @@ export class RepositoryService {
             if (filters?.provider) params.append('provider', filters.provider);
             if (filters?.language) params.append('language', filters.language);
             if (filters?.visibility) params.append('visibility', filters.visibility);
-            const response = await api.get<Repository[]>('/repositories', { params });
-            return response.data;
+            return await fetchAllPages<Repository>('/repositories', params);
         } catch (error) {
             console.error('Failed to fetch repositories:', error);
             throw new Error('Failed to load repositories.');
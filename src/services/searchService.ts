@@ -0,0 +1,38 @@
+import api from './api';
+
+export type SearchResource = 'servers' | 'domains' | 'emails' | 'repositories' | 'storage';
+
+export interface SearchHit {
+    resource: SearchResource;
+    id: string;
+    title: string;
+    subtitle?: string | null;
+    score: number;
+}
+
+export interface SearchResult {
+    items: SearchHit[];
+    total: number;
+}
+
+// Cross-resource search API Service
+export class SearchService {
+    /**
+     * Ranked prefix search over names, IPs, tags and email addresses
+     */
+    static async search(
+        q: string,
+        options?: { resources?: SearchResource[]; limit?: number }
+    ): Promise<SearchResult> {
+        try {
+            const params = new URLSearchParams({ q });
+            options?.resources?.forEach((resource) => params.append('resource', resource));
+            if (options?.limit) params.append('limit', String(options.limit));
+            const response = await api.get<SearchResult>('/search/', { params });
+            return response.data;
+        } catch (error) {
+            console.error('Failed to search:', error);
+            throw new Error('Search failed. Please try again.');
+        }
+    }
+}
@@ -1,4 +1,4 @@
-import api from './api';
+import api, { fetchAllPages } from './api';
 import type { Server, ServerStatus, ServerCategory } from '../types/server';
 
 // Server API Service
@@ -15,8 +15,7 @@ export class ServerService {
             if (filters?.status) params.append('status', filters.status);
             if (filters?.category) params.append('category', filters.category);
 
-            const response = await api.get<Server[]>('/servers', { params });
-            return response.data;
+            return await fetchAllPages<Server>('/servers', params);
         } catch (error) {
             console.error('Failed to fetch servers:', error);
             throw new Error('Failed to load servers. Please check your connection.');
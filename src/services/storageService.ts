@@ -1,4 +1,4 @@
-import api from './api';
+import api, { fetchAllPages } from './api';
 import type { StorageBucket, StorageType } from '../types/storage';
 
 export class StorageService {
@@ -12,8 +12,7 @@ export class StorageService {
             if (filters?.provider) params.append('provider', filters.provider);
             if (filters?.type) params.append('type', filters.type);
             if (filters?.region) params.append('region', filters.region);
-            const response = await api.get<StorageBucket[]>('/storage', { params });
-            return response.data;
+            return await fetchAllPages<StorageBucket>('/storage', params);
         } catch (error) {
             console.error('Failed to fetch storage:', error);
             throw new Error('Failed to load storage.');
@@ -7,6 +7,7 @@ export interface DNSRecord {
     name: string;
     value: string;
     ttl: number;
+    version?: number;
 }
 
 export interface SSLInfo {
@@ -26,6 +27,7 @@ export interface Domain {
     owner: string; // Client or Product name
     status: DomainStatus;
     ssl?: SSLInfo;
-    dnsRecords?: DNSRecord[];
+    dnsRecords?: DNSRecord[]; // Only sent on create; read them with DomainService.getDNSRecords
     cost?: number; // Annual cost
+    version?: number;
 }
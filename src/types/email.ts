@@ -11,4 +11,5 @@ export interface EmailAccount {
     quotaLimit: number; // in MB
     createdDate: string;
     lastLogin?: string;
+    version?: number;
 }
@@ -13,4 +13,5 @@ export interface Repository {
     lastCommit?: string;
     branches: number;
     openIssues: number;
+    version?: number;
 }
@@ -18,4 +18,5 @@ export interface Server {
     responsibleTeam: string;
     lastPatchDate: string;
     tags?: string[];
+    version?: number; // Bumped on every write; sent back as the ETag
 }
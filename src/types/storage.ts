@@ -10,4 +10,5 @@ export interface StorageBucket {
     capacityBytes: number;
     createdDate: string;
     isPublic: boolean;
+    version?: number;
 }